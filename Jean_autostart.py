@@ -2,14 +2,19 @@
 import serial
 import requests
 import time
-import sqlite3
-import json
 import os
 import logging
 from datetime import datetime
 import threading
 import signal
 import sys
+import atexit
+from vibration import WindowedClassifier, convert_to_ms2
+from accel_sampler import HighRateSampler, FakeBus, read_accel_block, summarize
+from local_database import LocalDatabase
+import wire_format
+from sync_scheduler import SyncScheduler
+from gps_reader import GpsReader
 
 # Essayer d'importer les bibliothèques matérielles, sinon utiliser le mode simulation
 try:
@@ -21,10 +26,24 @@ except ImportError:
 
 # Configuration
 DASHBOARD_URL = "http://172.20.10.3:5000/data"  # URL de votre serveur Flask
+DASHBOARD_BATCH_URL = DASHBOARD_URL + "/batch"   # Endpoint d'envoi par lot
+SERVER_RETRY_MESSAGES = {"Ingest queue full"}    # Refus par enregistrement à réessayer (app.py)
 DATABASE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sensor_data.db")
 LOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sensor_monitor.log")
-SYNC_INTERVAL = 30                              # Intervalle de synchronisation en secondes
+SYNC_INTERVAL = 30                              # Attente en secondes quand le backlog est vide
+SYNC_BASE_BACKOFF = 2                           # Première attente après un échec d'envoi (secondes)
+SYNC_MAX_BACKOFF = 300                          # Attente maximale entre deux tentatives (secondes)
+SYNC_METRICS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sync_metrics.json")
 SAMPLE_INTERVAL = 1                             # Intervalle d'échantillonnage en secondes
+COMMIT_INTERVAL = 1.0                           # Intervalle d'écriture groupée en base locale (secondes)
+SYNC_BATCH_SIZE = 500                           # Nombre d'enregistrements envoyés par requête
+WIRE_FORMAT = "packed"                          # Format des lots: "json", "msgpack" ou "packed" (voir wire_format.py)
+WIRE_COMPRESSION = "gzip"                       # Compression des lots: None, "gzip" ou "zstd"
+VIBRATION_WINDOW = 8                            # Échantillons par fenêtre de classification
+HIGH_RATE_MODE = False                          # Acquisition haute fréquence de l'accéléromètre
+HIGH_RATE_HZ = 200                              # Fréquence d'acquisition en mode haute fréquence (100-1000 Hz)
+GPS_MAX_FIX_AGE = 3                             # Âge maximal (s) d'une position GPS jointe à une lecture
+HIGH_RATE_WINDOW = 20                           # Fenêtre (échantillons) du crête-à-crête en haute fréquence
 
 # Configuration du logging
 logging.basicConfig(
@@ -38,110 +57,13 @@ MPU_ADDR = 0x68
 PWR_MGMT_1 = 0x6B
 ACCEL_XOUT_H = 0x3B
 
-# Constantes pour la conversion des valeurs brutes en m/s²
-# Le MPU-6050 a une sensibilité de 16384 LSB/g en mode ±2g
-# 1g = 9.81 m/s²
-ACCEL_SCALE_FACTOR = 16384.0  # LSB/g
-GRAVITY = 9.81  # m/s²
-
 # Variables globales
 running = True
 sync_thread = None
 data_collection_thread = None
 connection_status = False
-
-class LocalDatabase:
-    def __init__(self, db_path):
-        """Initialise la base de données SQLite locale"""
-        self.db_path = db_path
-        self.init_db()
-    
-    def init_db(self):
-        """Crée la table pour stocker les données des capteurs"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sensor_data (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                data TEXT NOT NULL,
-                synced INTEGER DEFAULT 0
-            )
-            ''')
-            
-            conn.commit()
-            conn.close()
-            logging.info("Base de données locale initialisée avec succès")
-        except Exception as e:
-            logging.error(f"Erreur lors de l'initialisation de la base de données locale: {e}")
-    
-    def save_data(self, data):
-        """Enregistre les données dans la base de données locale"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                "INSERT INTO sensor_data (timestamp, data, synced) VALUES (?, ?, ?)",
-                (data["timestamp"], json.dumps(data), 0)
-            )
-            
-            conn.commit()
-            conn.close()
-            logging.debug(f"Données enregistrées localement: {data['timestamp']}")
-            return True
-        except Exception as e:
-            logging.error(f"Erreur lors de l'enregistrement local des données: {e}")
-            return False
-    
-    def get_unsynced_data(self, limit=50):
-        """Récupère les données non synchronisées"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                "SELECT id, timestamp, data FROM sensor_data WHERE synced = 0 ORDER BY timestamp ASC LIMIT ?",
-                (limit,)
-            )
-            
-            rows = cursor.fetchall()
-            result = []
-            
-            for row in rows:
-                id, timestamp, data_json = row
-                result.append({
-                    "id": id,
-                    "timestamp": timestamp,
-                    "data": json.loads(data_json)
-                })
-            
-            conn.close()
-            return result
-        except Exception as e:
-            logging.error(f"Erreur lors de la récupération des données non synchronisées: {e}")
-            return []
-    
-    def mark_as_synced(self, ids):
-        """Marque les données comme synchronisées"""
-        if not ids:
-            return
-        
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Convertir la liste d'IDs en chaîne pour la requête SQL
-            id_str = ','.join(['?'] * len(ids))
-            cursor.execute(f"UPDATE sensor_data SET synced = 1 WHERE id IN ({id_str})", ids)
-            
-            conn.commit()
-            conn.close()
-            logging.info(f"Données marquées comme synchronisées: {len(ids)} enregistrements")
-        except Exception as e:
-            logging.error(f"Erreur lors du marquage des données synchronisées: {e}")
+wire_content_type = wire_format.FORMATS.get(WIRE_FORMAT, wire_format.JSON)
+wire_encoding = WIRE_COMPRESSION if WIRE_COMPRESSION in wire_format.COMPRESSIONS else None
 
 def mpu_init(bus):
     """
@@ -169,72 +91,95 @@ def read_raw_data(bus, addr):
         logging.error(f"Erreur lors de la lecture des données brutes: {e}")
         return 0
 
-def convert_to_ms2(raw_value):
+def wire_headers():
+    """En-têtes HTTP annonçant le format et la compression des lots envoyés."""
+    headers = {"Content-Type": wire_content_type}
+    if wire_encoding:
+        headers["Content-Encoding"] = wire_encoding
+    return headers
+
+def send_batch_to_dashboard(items, session=None):
     """
-    Convertit les valeurs brutes de l'accéléromètre en m/s².
+    Envoyer un lot d'enregistrements locaux au tableau de bord en une seule requête.
     
-    Le MPU-6050 a une sensibilité de 16384 LSB/g en mode ±2g.
-    1g = 9.81 m/s²
+    Le lot est encodé selon WIRE_FORMAT/WIRE_COMPRESSION; si le serveur
+    refuse ce format (415, ou 400 pour un corps qu'il ne sait pas décoder),
+    le lot est renvoyé en JSON et les envois suivants restent en JSON.
     
     Args:
-        raw_value: Valeur brute de l'accéléromètre
+        items: Liste d'enregistrements tels que retournés par get_unsynced_data
+        session: Session HTTP réutilisée entre les envois (optionnelle)
         
     Returns:
-        float: Valeur en m/s²
-    """
-    return (raw_value / ACCEL_SCALE_FACTOR) * GRAVITY
-
-def parse_gpgga(gpgga_string):
-    """
-    Analyser la chaîne de données NMEA $GPGGA pour en extraire les informations GPS.
-    """
-    parts = gpgga_string.split(',')
-    if len(parts) < 15:
-        return None
-    try:
-        time = parts[1][:2] + ':' + parts[1][2:4] + ':' + parts[1][4:6]
-        latitude = float(parts[2][:2]) + float(parts[2][2:]) / 60
-        if parts[3] == 'S':
-            latitude = -latitude
-        longitude = float(parts[4][:3]) + float(parts[4][3:]) / 60
-        if parts[5] == 'W':
-            longitude = -longitude
-        altitude = float(parts[9])
-        satellites = int(parts[7])
-        return {
-            "time": time,
-            "latitude": latitude,
-            "longitude": longitude,
-            "altitude": altitude,
-            "satellites": satellites
-        }
-    except (ValueError, IndexError):
-        return None
-
-def send_to_dashboard(sensor_data):
-    """
-    Envoyer les données du capteur au tableau de bord via une requête HTTP POST.
-    Retourne True si l'envoi a réussi, False sinon.
+        tuple: (IDs locaux acceptés, IDs refusés comme invalides), ou None si
+               le lot n'a pas été traité (erreur réseau ou réponse autre que 200).
+               Les enregistrements refusés temporairement (SERVER_RETRY_MESSAGES,
+               ex. file d'écriture pleine) ne figurent dans aucune des deux listes.
     """
+    global wire_content_type, wire_encoding
+    if not items:
+        return [], []
+    http = session or requests
+    
+    readings = [item["data"] for item in items]
     try:
-        response = requests.post(DASHBOARD_URL, json=sensor_data, timeout=5)
-        if response.status_code == 200:
-            logging.info("Données envoyées avec succès")
-            return True
-        else:
-            logging.warning(f"Erreur lors de l'envoi des données: {response.status_code}")
-            return False
-    except requests.RequestException as e:
+        headers = wire_headers()
+        try:
+            body = wire_format.encode_batch(readings, wire_content_type, wire_encoding)
+        except wire_format.UnrepresentableReading as e:
+            # Champs que le format compact perdrait: ce lot seulement part en JSON
+            logging.info(f"Lot envoyé en JSON ({e})")
+            body = wire_format.encode_batch(readings)
+            headers = {"Content-Type": wire_format.JSON}
+        except wire_format.UnsupportedFormat as e:
+            # Dépendance optionnelle absente sur le Pi: JSON sans compression
+            logging.warning(f"Format {wire_content_type}/{wire_encoding} indisponible ({e}), retour au JSON")
+            wire_content_type, wire_encoding = wire_format.JSON, None
+            body = wire_format.encode_batch(readings)
+            headers = wire_headers()
+        
+        response = http.post(
+            DASHBOARD_BATCH_URL,
+            data=body,
+            headers=headers,
+            timeout=30
+        )
+        if response.status_code in (400, 415) and headers["Content-Type"] != wire_format.JSON:
+            # Format refusé (415: serveur sans la dépendance; 400: corps qu'il ne sait pas
+            # décoder, ex. version packed plus récente que lui): on repasse au JSON pour
+            # la session, sinon le même lot serait renvoyé indéfiniment
+            logging.warning(f"Format {wire_content_type}/{wire_encoding} refusé par le serveur "
+                            f"({response.status_code}), retour au JSON")
+            wire_content_type, wire_encoding = wire_format.JSON, None
+            response = http.post(DASHBOARD_BATCH_URL, json=readings, timeout=30)
+        
+        if response.status_code == 429 or response.status_code >= 500:
+            logging.warning(f"Serveur indisponible: {response.status_code}")
+            return None
+        if response.status_code != 200:
+            # Refus du lot entier (proxy, 413, déploiement défectueux...): rien ne
+            # permet d'incriminer les enregistrements, on réessaiera plus tard
+            logging.warning(f"Erreur lors de l'envoi du lot: {response.status_code}")
+            return None
+        
+        result = response.json()
+        invalid_ids = []
+        for rejected in result.get("rejected", []):
+            if not isinstance(rejected, dict) or rejected.get("message") in SERVER_RETRY_MESSAGES:
+                # Refus temporaire: l'enregistrement reste dans le backlog sans compter comme refus
+                continue
+            index = rejected.get("index")
+            logging.warning(f"Enregistrement rejeté par le serveur: {rejected}")
+            if isinstance(index, int) and 0 <= index < len(items):
+                invalid_ids.append(items[index]["id"])
+        
+        # Le serveur renvoie les index acceptés dans le lot envoyé
+        accepted_ids = [items[index]["id"] for index in result.get("accepted", []) if 0 <= index < len(items)]
+        logging.info(f"Lot envoyé: {len(accepted_ids)}/{len(items)} enregistrements acceptés")
+        return accepted_ids, invalid_ids
+    except (requests.RequestException, ValueError) as e:
         logging.error(f"Erreur de connexion: {e}")
-        return False
-
-def check_connection():
-    """Vérifie si la connexion au serveur est disponible"""
-    try:
-        response = requests.get(DASHBOARD_URL, timeout=2)
-        return response.status_code == 200
-    except:
-        return False
+        return None
 
 def setup_gps():
     """
@@ -268,9 +213,33 @@ def setup_mpu():
         logging.error(f"Erreur lors de l'initialisation du MPU-6050: {e}")
         return None
 
-def collect_sensor_data(ser, bus):
+def gps_from_fix(fix):
+    """Convertit la dernière position du GpsReader au format du message capteur."""
+    gps_data = {
+        "time": fix.get("time"),
+        "latitude": fix["latitude"],
+        "longitude": fix["longitude"],
+        "altitude": fix.get("altitude"),
+        "satellites": fix.get("satellites")
+    }
+    # Vitesse et cap seulement s'ils sont aussi récents que la position
+    motion_time = fix.get("motion_time")
+    if motion_time is not None and time.time() - motion_time <= GPS_MAX_FIX_AGE:
+        gps_data["speed"] = fix.get("speed")
+        gps_data["course"] = fix.get("course")
+    return gps_data
+
+def collect_sensor_data(gps_reader, bus, sampler=None):
     """
     Collecter les données GPS et d'accéléromètre, puis les formater pour l'envoi.
+    
+    La position est la dernière publiée par le thread GpsReader (aucune
+    lecture du port série ici); elle est ignorée si elle date de plus de
+    GPS_MAX_FIX_AGE secondes.
+    
+    Avec un sampler haute fréquence, l'accéléromètre n'est pas lu ici: les
+    échantillons acquis depuis le dernier appel sont résumés en un seul
+    enregistrement avec leurs caractéristiques de vibration.
     """
     sensor_data = {
         "timestamp": datetime.now().isoformat(),
@@ -278,25 +247,27 @@ def collect_sensor_data(ser, bus):
         "accelerometer": None
     }
 
-    # Lire les données GPS
-    if ser and ser.in_waiting > 0:
-        try:
-            line = ser.readline().decode('utf-8').rstrip()
-            if line.startswith('$GPGGA'):
-                gps_data = parse_gpgga(line)
-                if gps_data:
-                    sensor_data["gps"] = gps_data
-                    logging.debug("Données GPS extraites")
-        except Exception as e:
-            logging.error(f"Erreur lors de la lecture du GPS: {e}")
+    # Dernière position GPS, sans entrée/sortie
+    fix = gps_reader.latest_fix(max_age=GPS_MAX_FIX_AGE) if gps_reader else None
+    if fix:
+        sensor_data["gps"] = gps_from_fix(fix)
+        logging.debug("Données GPS extraites")
 
     # Lire les données de l'accéléromètre
-    if bus:
+    if sampler:
+        times, samples = sampler.drain()
+        accelerometer, vibration = summarize(times, samples, HIGH_RATE_WINDOW)
+        if accelerometer:
+            accelerometer["x"] = convert_to_ms2(accelerometer["x_raw"])
+            accelerometer["y"] = convert_to_ms2(accelerometer["y_raw"])
+            accelerometer["z"] = convert_to_ms2(accelerometer["z_raw"])
+            sensor_data["accelerometer"] = accelerometer
+            sensor_data["vibration"] = vibration
+            logging.debug(f"Résumé haute fréquence: {vibration['n']} échantillons")
+    elif bus:
         try:
-            # Lire les valeurs brutes
-            accel_x_raw = read_raw_data(bus, ACCEL_XOUT_H)
-            accel_y_raw = read_raw_data(bus, ACCEL_XOUT_H + 2)
-            accel_z_raw = read_raw_data(bus, ACCEL_XOUT_H + 4)
+            # Lire les valeurs brutes en une seule transaction I2C (6 octets)
+            accel_x_raw, accel_y_raw, accel_z_raw = read_accel_block(bus)
             
             # Stocker à la fois les valeurs brutes et les valeurs converties
             sensor_data["accelerometer"] = {
@@ -344,16 +315,38 @@ def collect_sensor_data(ser, bus):
 
     return sensor_data
 
-def data_collection_loop(ser, bus, db):
+def data_collection_loop(gps_reader, bus, db):
     """Boucle de collecte des données"""
     global running
     
     logging.info("Démarrage de la collecte de données")
     
+    # Caractéristiques de vibration sur une fenêtre glissante de y
+    classifier = WindowedClassifier(VIBRATION_WINDOW)
+    
+    # Acquisition haute fréquence dans un thread dédié (bus simulé sans matériel)
+    sampler = None
+    if HIGH_RATE_MODE:
+        sampler = HighRateSampler(bus or FakeBus(), rate_hz=HIGH_RATE_HZ)
+        sampler.start()
+        logging.info(f"Acquisition haute fréquence démarrée à {HIGH_RATE_HZ} Hz")
+    
     while running:
         try:
             # Collecter les données des capteurs
-            data = collect_sensor_data(ser, bus)
+            data = collect_sensor_data(gps_reader, bus, sampler)
+            
+            # Joindre les caractéristiques de la fenêtre (classées côté serveur
+            # avec les mêmes règles, voir vibration.classify_reading)
+            if data["accelerometer"] and "vibration" not in data:
+                classifier.update(data["accelerometer"]["y_raw"])
+                features = classifier.features()
+                data["vibration"] = {
+                    "n": features["n"],
+                    "rms": features["rms"],
+                    "ptp": features["ptp"],
+                    "variance": features["variance"]
+                }
             
             # Enregistrer les données localement
             db.save_data(data)
@@ -365,41 +358,45 @@ def data_collection_loop(ser, bus, db):
             time.sleep(1)
 
 def sync_data_loop(db):
-    """Boucle de synchronisation des données"""
+    """
+    Boucle de synchronisation des données.
+    
+    Un envoi réussi tient lieu de test de connexion; voir SyncScheduler
+    pour l'enchaînement des lots et le backoff.
+    """
     global running, connection_status
     
     logging.info("Démarrage de la synchronisation des données")
     
+    scheduler = SyncScheduler(
+        db,
+        send_batch_to_dashboard,
+        batch_size=SYNC_BATCH_SIZE,
+        idle_interval=SYNC_INTERVAL,
+        base_backoff=SYNC_BASE_BACKOFF,
+        max_backoff=SYNC_MAX_BACKOFF,
+        metrics_path=SYNC_METRICS_FILE
+    )
+    
     while running:
         try:
-            # Vérifier la connexion au serveur
-            connection_status = check_connection()
-            
-            if connection_status:
-                # Récupérer les données non synchronisées
-                unsynced_data = db.get_unsynced_data()
-                
-                if unsynced_data:
-                    logging.info(f"Tentative de synchronisation de {len(unsynced_data)} enregistrements")
-                    
-                    # Envoyer les données au serveur
-                    synced_ids = []
-                    for item in unsynced_data:
-                        if send_to_dashboard(item["data"]):
-                            synced_ids.append(item["id"])
-                    
-                    # Marquer les données comme synchronisées
-                    if synced_ids:
-                        db.mark_as_synced(synced_ids)
-                        logging.info(f"Synchronisation réussie pour {len(synced_ids)} enregistrements")
-            else:
-                logging.warning("Pas de connexion au serveur, synchronisation reportée")
-            
-            # Attendre l'intervalle de synchronisation
-            time.sleep(SYNC_INTERVAL)
+            delay = scheduler.run_once()
+            connection_status = scheduler.connected
         except Exception as e:
             logging.error(f"Erreur dans la boucle de synchronisation: {e}")
-            time.sleep(SYNC_INTERVAL)
+            delay = SYNC_INTERVAL
+        
+        if delay > 0:
+            # Backlog vidé ou serveur injoignable: publier les métriques avant d'attendre
+            metrics = scheduler.write_metrics()
+            logging.info(
+                f"Synchronisation: backlog={metrics['backlog']}, "
+                f"retard={metrics['sync_lag_seconds'] or 0:.0f} s, prochain envoi dans {delay:.1f} s"
+            )
+            if scheduler.wait(delay):
+                break
+    
+    scheduler.stop()
 
 def signal_handler(sig, frame):
     """Gestionnaire de signal pour arrêter proprement le programme"""
@@ -419,15 +416,23 @@ def main():
     signal.signal(signal.SIGTERM, signal_handler)
     
     # Initialisation de la base de données locale
-    db = LocalDatabase(DATABASE_PATH)
+    db = LocalDatabase(DATABASE_PATH, commit_interval=COMMIT_INTERVAL)
+    # Écrire les échantillons en attente à l'arrêt (sys.exit dans signal_handler)
+    atexit.register(db.close)
     
     # Initialisation des capteurs
     ser = setup_gps()
     bus = setup_mpu()
     
+    # Lecture continue du port série dans un thread dédié
+    gps_reader = None
+    if ser:
+        gps_reader = GpsReader(ser)
+        gps_reader.start()
+    
     try:
         # Démarrer le thread de collecte de données
-        data_collection_thread = threading.Thread(target=data_collection_loop, args=(ser, bus, db))
+        data_collection_thread = threading.Thread(target=data_collection_loop, args=(gps_reader, bus, db))
         data_collection_thread.daemon = True
         data_collection_thread.start()
         
@@ -446,6 +451,8 @@ def main():
         logging.info("Programme arrêté par l'utilisateur")
         running = False
         
+        if gps_reader:
+            gps_reader.stop()
         if ser:
             ser.close()
         
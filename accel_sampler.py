@@ -0,0 +1,243 @@
+"""
+Acquisition haute fréquence de l'accéléromètre MPU-6050 sur le Raspberry Pi.
+
+Les 6 octets d'accélération (X, Y, Z) sont lus en une seule transaction I2C
+(lecture par bloc depuis ACCEL_XOUT_H) par un thread dédié, cadencé entre
+100 et 1000 Hz, dans un tampon circulaire préalloué. La boucle de collecte
+vide ce tampon à chaque intervalle et n'émet qu'un enregistrement résumé
+(moyennes + caractéristiques de vibration), si bien que le volume stocké et
+envoyé ne dépend pas de la fréquence d'échantillonnage.
+
+FakeBus imite le MPU-6050 pour tester l'acquisition sans matériel.
+"""
+import math
+import random
+import struct
+import threading
+import time
+import numpy as np
+from vibration import window_features
+
+# Adresses et registres du MPU-6050
+MPU_ADDR = 0x68
+SMPLRT_DIV = 0x19
+CONFIG = 0x1A
+PWR_MGMT_1 = 0x6B
+ACCEL_XOUT_H = 0x3B
+
+# Fréquence interne du MPU-6050 quand le filtre passe-bas (DLPF) est actif
+MPU_BASE_RATE = 1000
+# DLPF à 184 Hz: laisse passer les chocs brefs tout en limitant le repliement
+DLPF_184HZ = 0x01
+
+
+def configure_mpu_rate(bus, rate_hz):
+    """Règle le diviseur d'échantillonnage du MPU-6050 pour la fréquence visée."""
+    divider = max(0, min(255, int(round(MPU_BASE_RATE / rate_hz)) - 1))
+    bus.write_byte_data(MPU_ADDR, CONFIG, DLPF_184HZ)
+    bus.write_byte_data(MPU_ADDR, SMPLRT_DIV, divider)
+    return MPU_BASE_RATE / (1 + divider)
+
+
+def read_accel_block(bus):
+    """
+    Lit X, Y et Z bruts en une seule transaction I2C de 6 octets.
+
+    Returns:
+        tuple: (x, y, z) en valeurs brutes signées
+    """
+    return struct.unpack('>hhh', bytes(bus.read_i2c_block_data(MPU_ADDR, ACCEL_XOUT_H, 6)))
+
+
+class HighRateSampler:
+    """
+    Thread d'acquisition à fréquence fixe dans un tampon circulaire préalloué.
+
+    Un seul producteur (le thread) et un seul consommateur (drain()): les
+    index d'écriture/lecture suffisent, sans allocation par échantillon.
+    Si le consommateur prend trop de retard, les échantillons les plus
+    anciens sont écrasés et comptés dans `overruns`.
+    """
+
+    def __init__(self, bus, rate_hz=200, capacity_seconds=5):
+        """
+        Args:
+            bus: Bus I2C (smbus2.SMBus ou FakeBus)
+            rate_hz (float): Fréquence d'échantillonnage visée (100 à 1000 Hz)
+            capacity_seconds (float): Durée couverte par le tampon circulaire
+        """
+        self.bus = bus
+        self.rate_hz = rate_hz
+        self.capacity = int(rate_hz * capacity_seconds)
+        self._samples = np.zeros((self.capacity, 3), dtype=np.int16)
+        self._times = np.zeros(self.capacity, dtype=np.float64)
+        self._written = 0     # Nombre total d'échantillons écrits
+        self._read = 0        # Nombre total d'échantillons consommés
+        self._running = False
+        self._thread = None
+        self.overruns = 0
+        self.read_errors = 0
+
+    def start(self):
+        """Configure le capteur et démarre le thread d'acquisition."""
+        try:
+            configure_mpu_rate(self.bus, self.rate_hz)
+        except Exception:
+            # Certains bus (ou capteurs) refusent la configuration: on garde le réglage par défaut
+            pass
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="accel-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1)
+
+    def _run(self):
+        period = 1.0 / self.rate_hz
+        next_tick = time.perf_counter()
+        while self._running:
+            try:
+                sample = read_accel_block(self.bus)
+            except Exception:
+                self.read_errors += 1
+                sample = None
+
+            if sample is not None:
+                slot = self._written % self.capacity
+                self._samples[slot] = sample
+                self._times[slot] = time.time()
+                self._written += 1
+
+            # Cadence fixe; si on a pris du retard, on repart de maintenant
+            next_tick += period
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.perf_counter()
+
+    def drain(self):
+        """
+        Retourne les échantillons acquis depuis le dernier appel.
+
+        Returns:
+            tuple: (temps, échantillons) sous forme de tableaux (n,) et (n, 3)
+        """
+        written = self._written
+        start = self._read
+        if written - start > self.capacity:
+            self.overruns += written - start - self.capacity
+            start = written - self.capacity
+        self._read = written
+
+        count = written - start
+        if count == 0:
+            return np.empty(0), np.empty((0, 3), dtype=np.int16)
+        first = start % self.capacity
+        last = first + count
+        if last <= self.capacity:
+            return self._times[first:last].copy(), self._samples[first:last].copy()
+        last -= self.capacity
+        return (np.concatenate((self._times[first:], self._times[:last])),
+                np.concatenate((self._samples[first:], self._samples[:last])))
+
+
+def summarize(times, samples, window=None):
+    """
+    Résume un intervalle d'échantillons haute fréquence en un enregistrement.
+
+    Les moyennes de X/Y/Z remplacent la lecture unique de l'ancien mode; les
+    caractéristiques de vibration sont calculées sur y à pleine fréquence.
+    Pour le RMS et la variance, toute la période forme une seule fenêtre;
+    le crête-à-crête est le maximum sur des fenêtres glissantes de `window`
+    échantillons (ou sur toute la période si window est None).
+
+    Returns:
+        tuple: (accelerometer, vibration) ou (None, None) si aucun échantillon
+    """
+    if len(samples) == 0:
+        return None, None
+
+    values = samples.astype(np.float64)
+    means = values.mean(axis=0)
+    y = values[:, 1]
+    mean_sq = float(np.mean(y * y))
+    mean_y = float(means[1])
+
+    if window and len(y) >= window:
+        ptp = float(window_features(y, window)['ptp'].max())
+    else:
+        ptp = float(y.max() - y.min())
+
+    duration = float(times[-1] - times[0]) if len(times) > 1 else 0.0
+    accelerometer = {
+        "x_raw": int(round(means[0])),
+        "y_raw": int(round(means[1])),
+        "z_raw": int(round(means[2]))
+    }
+    vibration = {
+        "n": int(len(y)),
+        "rms": math.sqrt(mean_sq),
+        "ptp": ptp,
+        "variance": max(mean_sq - mean_y * mean_y, 0.0),
+        "peak": float(np.max(np.abs(y - mean_y))),
+        "rate": (len(y) - 1) / duration if duration > 0 else None
+    }
+    return accelerometer, vibration
+
+
+class FakeBus:
+    """
+    Stand-in de smbus2.SMBus qui simule un MPU-6050 sur une route.
+
+    Le signal suit les profils du simulateur (gravité sur y et bruit) et
+    ajoute des nids-de-poule: des chocs de quelques millisecondes tirés au
+    hasard, que seul un échantillonnage rapide peut voir.
+    """
+
+    def __init__(self, base=(-1200, -13800, -7400), noise=200, pothole_rate=0.2, pothole_amplitude=9000):
+        """
+        Args:
+            base (tuple): Valeurs brutes moyennes de X, Y, Z
+            noise (int): Amplitude du bruit uniforme
+            pothole_rate (float): Nombre moyen de chocs par seconde
+            pothole_amplitude (int): Amplitude brute d'un choc sur y
+        """
+        self.base = base
+        self.noise = noise
+        self.pothole_rate = pothole_rate
+        self.pothole_amplitude = pothole_amplitude
+        self.registers = {}
+        self.transactions = 0
+        self._pothole_until = 0.0
+        self._last = time.time()
+
+    def write_byte_data(self, addr, register, value):
+        self.transactions += 1
+        self.registers[register] = value
+
+    def _sample(self):
+        now = time.time()
+        elapsed, self._last = now - self._last, now
+        if now >= self._pothole_until and random.random() < self.pothole_rate * elapsed:
+            self._pothole_until = now + 0.02  # Choc de 20 ms
+        values = [b + random.randint(-self.noise, self.noise) for b in self.base]
+        if now < self._pothole_until:
+            values[1] -= self.pothole_amplitude
+        return [max(-32768, min(32767, v)) for v in values]
+
+    def read_i2c_block_data(self, addr, register, length):
+        self.transactions += 1
+        raw = struct.pack('>hhh', *self._sample())
+        offset = register - ACCEL_XOUT_H
+        return list(raw[offset:offset + length])
+
+    def read_byte_data(self, addr, register):
+        self.transactions += 1
+        raw = struct.pack('>hhh', *self._sample())
+        return raw[register - ACCEL_XOUT_H]
+
+    def close(self):
+        pass
@@ -1,12 +1,26 @@
 from flask import Flask, render_template, request, jsonify, Response
-from flask_socketio import SocketIO
+from flask_socketio import SocketIO, emit, join_room, leave_room, rooms
 import json
 import csv
+import atexit
+import functools
+import zlib
 from io import StringIO
 from datetime import datetime, timedelta
+import columnar
+import downsample
 from database import Database
+from ingest_queue import WriteBehindQueue
+from live_updates import ALL_ROOM, DEFAULT_DEVICE, LiveBroadcaster, subscription_rooms
+from pagination import MAX_PAGE_SIZE, encode_cursor, parse_cursor
+import response_cache
+from storage_tiers import MINUTE_TIER, RAW_TIER, parse_date
+from vibration import classify_reading
+import wire_format
 
 app = Flask(__name__)
+# Taille maximale d'un corps de requête (avant décompression, voir aussi wire_format.MAX_DECODED_SIZE)
+app.config['MAX_CONTENT_LENGTH'] = 4 * 1024 * 1024
 socketio = SocketIO(app, cors_allowed_origins="*")
 
 # Configuration de la base de données MySQL
@@ -14,81 +28,234 @@ DB_CONFIG = {
     'host': 'localhost',
     'user': 'admin',
     'password': 'admin',
-    'database': 'road_monitor'
+    'database': 'road_monitor',
+    'pool_size': 10,          # Connexions MySQL partagées par les threads du worker
+    'pool_timeout': 10
+}
+
+# Écriture différée: les lectures sont mises en file et écrites par lots
+# par un thread dédié, l'endpoint répond sans attendre MySQL
+WRITE_BEHIND_CONFIG = {
+    'enabled': False,
+    'max_size': 10000,        # Lectures en attente au-delà desquelles on répond 429
+    'batch_size': 500,        # Taille maximale d'un lot écrit en base
+    'flush_interval': 1.0     # Délai maximal (s) avant l'écriture d'un lot incomplet
+}
+
+# Refus temporaire d'une lecture (file pleine): l'appareil la renvoie plus tard
+# sans la compter comme invalide (Jean_autostart.SERVER_RETRY_MESSAGES)
+QUEUE_FULL_MESSAGE = "Ingest queue full"
+
+# Diffusion Socket.IO: instantané au nouveau client puis deltas groupés par room
+LIVE_CONFIG = {
+    'history_size': 100,      # Points de route conservés pour les instantanés
+    'max_rate': 4.0           # Messages par seconde et par room au maximum
+}
+
+# Cache des réponses de /api/history, /api/road-history et /api/statistics
+# (voir response_cache.py): TTL + LRU, invalidé par les insertions, ETag
+RESPONSE_CACHE_CONFIG = {
+    'enabled': True,
+    'backend': 'memory',      # 'memory' (par worker) ou 'redis' (partagé entre workers)
+    'redis_url': 'redis://localhost:6379/0',
+    'ttl': 60,                # Durée de vie d'une entrée (s), borne aussi les maintenances hors /data
+    'max_entries': 256        # Backend mémoire: entrées conservées (LRU)
 }
 
 # Initialiser la base de données
 db = Database(**DB_CONFIG)
 
-# Store the latest sensor data
-latest_sensor_data = {}
+# Initialiser le cache des réponses
+cache = None
+if RESPONSE_CACHE_CONFIG['enabled']:
+    try:
+        cache_backend = response_cache.make_backend(
+            RESPONSE_CACHE_CONFIG['backend'],
+            max_entries=RESPONSE_CACHE_CONFIG['max_entries'],
+            redis_url=RESPONSE_CACHE_CONFIG['redis_url']
+        )
+    except Exception as e:
+        print(f"Error initializing response cache backend, using memory: {e}")
+        cache_backend = response_cache.MemoryBackend(RESPONSE_CACHE_CONFIG['max_entries'])
+    cache = response_cache.ResponseCache(cache_backend, ttl=RESPONSE_CACHE_CONFIG['ttl'])
+
+def invalidate_cache(readings):
+    """Supprime du cache les réponses dont la plage contient des lectures insérées."""
+    if cache is None:
+        return
+    now = datetime.now()
+    cache.invalidate([parse_date(reading.get('timestamp')) or now for reading in readings])
 
-# Store road condition history (in-memory cache)
-road_condition_history = []
+# Initialiser la file d'écriture différée si elle est activée
+ingest_queue = None
+if WRITE_BEHIND_CONFIG['enabled']:
+    ingest_queue = WriteBehindQueue(
+        db,
+        max_size=WRITE_BEHIND_CONFIG['max_size'],
+        batch_size=WRITE_BEHIND_CONFIG['batch_size'],
+        flush_interval=WRITE_BEHIND_CONFIG['flush_interval'],
+        # Les lectures ne sont visibles qu'une fois écrites: invalider à ce moment
+        on_written=invalidate_cache
+    )
+    ingest_queue.start()
+    # Vider la file proprement à l'arrêt du serveur
+    atexit.register(ingest_queue.stop)
+
+# Dernières lectures et historique des points de route (en mémoire), diffusés par deltas
+live = LiveBroadcaster(socketio, **LIVE_CONFIG)
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/data', methods=['POST'])
-def receive_data():
-    global latest_sensor_data, road_condition_history
-    data = request.json
+def update_road_history(data):
+    """
+    Calcule l'état de la route d'une lecture et la publie aux clients
+    Socket.IO (historique en mémoire et prochain delta de ses rooms).
+    """
+    road_point = None
     
-    if not data:
-        return jsonify({"status": "error", "message": "No data received"}), 400
-    
-    latest_sensor_data = data
-    
-    # Calculer l'état de la route
-    if data.get('accelerometer'):
-        # Vérifier si les données sont déjà converties ou si ce sont des valeurs brutes
-        if 'y_raw' in data['accelerometer']:
-            # Utiliser la valeur brute pour déterminer l'état de la route
-            y_accel = abs(data['accelerometer'].get('y_raw', 0))
-        else:
-            # Utiliser la valeur y directement
-            y_accel = abs(data['accelerometer'].get('y', 0))
-            # Si c'est une valeur en m/s², la reconvertir en valeur brute pour la comparaison
-            if abs(y_accel) < 100:  # Si la valeur est petite, c'est probablement en m/s²
-                y_accel = y_accel * 16384.0 / 9.81  # Reconversion approximative
-        
-        # Déterminer l'état de la route basé sur les valeurs brutes
-        if y_accel > 15000:
-            road_condition = 'bad'
-        elif y_accel > 10000:
-            road_condition = 'fair'
-        else:
-            road_condition = 'good'
-        
+    # Calculer l'état de la route (règles partagées avec l'appareil)
+    road_condition = classify_reading(data)
+    if road_condition is not None:
         # Ajouter l'état de la route à l'historique
         if data.get('gps') and data['gps'] is not None:
             road_point = {
                 'latitude': data['gps'].get('latitude'),
                 'longitude': data['gps'].get('longitude'),
                 'condition': road_condition,
-                'timestamp': data.get('timestamp', datetime.now().isoformat())
+                'timestamp': data.get('timestamp', datetime.now().isoformat()),
+                'device': data.get('device', DEFAULT_DEVICE)
             }
-            road_condition_history.append(road_point)
-            
-            # Garder seulement les 100 derniers points en mémoire
-            road_condition_history = road_condition_history[-100:]
+    
+    live.publish(data, road_point)
+
+@app.route('/data', methods=['POST'])
+def receive_data():
+    data = request.json
+    
+    if not data:
+        return jsonify({"status": "error", "message": "No data received"}), 400
+    
+    if ingest_queue is not None:
+        # Mode écriture différée: accuser réception immédiatement
+        if not ingest_queue.submit(data):
+            return jsonify({"status": "error", "message": QUEUE_FULL_MESSAGE}), 429
+        
+        update_road_history(data)
+        return jsonify({"status": "success", "queued": True}), 200
     
     try:
         # Sauvegarder les données dans la base de données
         db.save_sensor_data(data)
+        invalidate_cache([data])
         
-        # Émettre les données à tous les clients connectés
-        socketio.emit('sensor_update', {
-            'sensor_data': data,
-            'road_condition_history': road_condition_history
-        })
+        # Publier la lecture aux clients abonnés (envoi groupé en arrière-plan)
+        update_road_history(data)
         
         return jsonify({"status": "success"}), 200
     except Exception as e:
         print(f"Error saving data: {e}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+def parse_batch_payload():
+    """
+    Extrait la liste des lectures d'une requête par lot.
+    
+    Accepte un tableau JSON, un objet {"items": [...]} ou un flux NDJSON
+    (une lecture JSON par ligne, Content-Type application/x-ndjson).
+    Les lignes NDJSON illisibles sont conservées sous forme de None pour
+    être signalées comme rejetées à leur index.
+    
+    Les formats compacts du Raspberry Pi (MessagePack, enregistrements
+    binaires, voir wire_format.py) et la compression gzip/zstd annoncée par
+    Content-Encoding sont décodés ici; un format non pris en charge lève
+    wire_format.UnsupportedFormat.
+    """
+    encoding = request.headers.get('Content-Encoding')
+    if request.mimetype in (wire_format.MSGPACK, wire_format.PACKED) or encoding:
+        try:
+            payload = wire_format.decode_batch(request.get_data(), request.mimetype, encoding)
+        except (wire_format.UnsupportedFormat, wire_format.PayloadTooLarge):
+            raise
+        except ValueError:
+            return None
+        if isinstance(payload, dict):
+            payload = payload.get('items')
+        return payload if isinstance(payload, list) else None
+    
+    if request.mimetype in ('application/x-ndjson', 'application/ndjson'):
+        items = []
+        for line in request.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                items.append(None)
+        return items
+    
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict):
+        payload = payload.get('items')
+    if not isinstance(payload, list):
+        return None
+    return payload
+
+@app.route('/data/batch', methods=['POST'])
+def receive_data_batch():
+    """Reçoit un lot de lectures (backlog d'un appareil) et l'écrit en une seule transaction."""
+    try:
+        items = parse_batch_payload()
+    except wire_format.UnsupportedFormat as e:
+        return jsonify({"status": "error", "message": str(e)}), 415
+    except wire_format.PayloadTooLarge as e:
+        return jsonify({"status": "error", "message": str(e)}), 413
+    
+    if items is None:
+        return jsonify({"status": "error", "message": "Expected a JSON array or NDJSON stream"}), 400
+    
+    accepted = []
+    rejected = []
+    valid_items = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not item:
+            rejected.append({"index": index, "message": "Invalid reading"})
+            continue
+        if ingest_queue is not None and not ingest_queue.submit(item):
+            rejected.append({"index": index, "message": QUEUE_FULL_MESSAGE})
+            continue
+        accepted.append(index)
+        valid_items.append(item)
+    
+    if ingest_queue is not None:
+        # Contre-pression: rien n'a pu être mis en file
+        if not accepted and rejected:
+            return jsonify({
+                "status": "error",
+                "message": QUEUE_FULL_MESSAGE,
+                "accepted": accepted,
+                "rejected": rejected
+            }), 429
+    else:
+        try:
+            # Une seule insertion multi-lignes pour tout le lot
+            db.save_sensor_data_batch(valid_items)
+        except Exception as e:
+            print(f"Error saving batch: {e}")
+            return jsonify({"status": "error", "message": str(e)}), 500
+        invalidate_cache(valid_items)
+    
+    # Les lectures du lot partent dans un même delta par room
+    for item in valid_items:
+        update_road_history(item)
+    
+    return jsonify({
+        "status": "success",
+        "accepted": accepted,
+        "rejected": rejected
+    }), 200
+
 @app.route('/', methods=['POST'])
 def receive_data_alt():
     """Route alternative pour recevoir les données."""
@@ -98,85 +265,300 @@ def receive_data_alt():
 def history_page():
     return render_template('history.html')
 
-@app.route('/api/history')
-def get_history():
-    limit = request.args.get('limit', 1000, type=int)
+def cached_response(defaults=None, hourly=False):
+    """
+    Met en cache les réponses 200 d'une vue de lecture (voir response_cache.py).
+    
+    Les réponses, en cache ou non, portent un ETag et Cache-Control: no-cache:
+    le navigateur revalide à chaque affichage et reçoit un 304 si rien n'a changé.
+    
+    Args:
+        defaults (dict): Valeurs par défaut des paramètres, pour la clé
+        hourly (bool): Réponse calculée par heure entière (fenêtre élargie à l'heure)
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if cache is None:
+                return view(*args, **kwargs)
+            
+            key = response_cache.cache_key(request.path, request.args, defaults)
+            entry = cache.get(key)
+            if entry is None:
+                generation = cache.generation()
+                response = view(*args, **kwargs)
+                if not isinstance(response, Response) or response.status_code != 200:
+                    return response
+                headers = {name: value for name, value in response.headers.items() if name.startswith('X-')}
+                entry = cache.put(key, response.get_data(), response.content_type, headers,
+                                  response_cache.request_window(request.args, hourly), generation)
+            
+            if request.if_none_match.contains(entry['etag']):
+                cache.record_not_modified()
+            response = Response(entry['body'], content_type=entry['content_type'], headers=entry['headers'])
+            response.set_etag(entry['etag'])
+            response.headers['Cache-Control'] = 'no-cache'
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+def paginated_history(fetch, road=False):
+    """
+    Réponse commune de /api/history et /api/road-history.
+    
+    Paramètres: limit (taille de page), start_date, end_date, condition,
+    tier (raw|minute, choisi d'après la plage si absent) et after (curseur
+    next_cursor de la page précédente; vide pour la première page).
+    
+    Sans after, la réponse reste la liste des éléments; avec after, un objet
+    {"items", "next_cursor", "tier"}. next_cursor est aussi envoyé dans
+    l'en-tête X-Next-Cursor et vaut null sur la dernière page.
+    
+    format=columnar|binary|arrow renvoie les colonnes de la requête au lieu
+    des éléments (voir columnar.py), avec next_cursor et tier inclus.
+    """
+    limit = max(1, min(request.args.get('limit', 1000, type=int), MAX_PAGE_SIZE))
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
     condition = request.args.get('condition')
     
-    history = db.get_history(limit, start_date, end_date, condition)
-    return jsonify(history)
+    # Niveau de détail: raw (lectures brutes) ou minute, choisi d'après la plage si absent
+    tier = request.args.get('tier')
+    if tier not in (RAW_TIER, MINUTE_TIER):
+        tier = db.history_tier(start_date, end_date)
+    
+    after_param = request.args.get('after')
+    after = None
+    if after_param:
+        try:
+            after = parse_cursor(after_param, tier)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+    
+    response_format = request.args.get('format')
+    if response_format:
+        return columnar_history(response_format, limit, start_date, end_date, condition, tier, after, road)
+    
+    # Une ligne de plus pour savoir s'il reste une page
+    items = fetch(limit + 1, start_date, end_date, condition, tier, after)
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(items[-1], tier)
+    
+    if after_param is None:
+        response = jsonify(items)
+    else:
+        response = jsonify({"items": items, "next_cursor": next_cursor, "tier": tier})
+    response.headers['X-Data-Tier'] = tier
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+def columnar_history(response_format, limit, start_date, end_date, condition, tier, after, road):
+    """Page d'historique en colonnes, construite depuis les tuples du curseur."""
+    if response_format not in columnar.FORMATS:
+        return jsonify({"status": "error", "message": f"Unknown format: {response_format}"}), 400
+    
+    names, rows, tier = db.get_history_rows(limit + 1, start_date, end_date, condition, tier, after, road=road)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = dict(zip(names, rows[-1]))
+        last['timestamp'] = last['timestamp'].isoformat()
+        next_cursor = encode_cursor(last, tier)
+    
+    try:
+        body, content_type = columnar.encode(response_format, names, rows, {"next_cursor": next_cursor, "tier": tier})
+    except columnar.UnsupportedFormat as e:
+        return jsonify({"status": "error", "message": str(e)}), 406
+    response = Response(body, content_type=content_type)
+    response.headers['X-Data-Tier'] = tier
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+@app.route('/api/history')
+@cached_response(defaults={'limit': '1000'})
+def get_history():
+    return paginated_history(db.get_history)
 
 @app.route('/api/road-history')
+@cached_response(defaults={'limit': '1000'})
 def get_road_history():
-    limit = request.args.get('limit', 1000, type=int)
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-    condition = request.args.get('condition')
+    return paginated_history(db.get_road_condition_history, road=True)
+
+@app.route('/api/timeseries')
+def get_timeseries():
+    """
+    Séries de l'accéléromètre sous-échantillonnées pour les graphiques.
+    
+    Paramètres: start_date et end_date (obligatoires), points (nombre de
+    points par série), method (lttb|minmax, voir downsample.py), device et
+    tier (raw|minute, choisi d'après la plage si absent). Les lignes sont
+    lues et réduites par blocs: le coût dépend de points, pas de la durée.
+    """
+    start = parse_date(request.args.get('start_date'))
+    end = parse_date(request.args.get('end_date'))
+    if start is None or end is None or end <= start:
+        return jsonify({"status": "error", "message": "start_date and end_date are required (start < end)"}), 400
+    
+    points = max(3, min(request.args.get('points', downsample.DEFAULT_POINTS, type=int), downsample.MAX_POINTS))
+    method = request.args.get('method', downsample.LTTB)
+    if method not in downsample.METHODS:
+        return jsonify({"status": "error", "message": f"Unknown method: {method}"}), 400
+    device = request.args.get('device')
+    
+    tier = request.args.get('tier')
+    if tier not in (RAW_TIER, MINUTE_TIER):
+        tier = db.history_tier(start.isoformat(), end.isoformat())
+    
+    chunks = db.iter_timeseries_rows(start, end, device, tier)
+    result = downsample.downsample(chunks, start, end, points, method)
+    result.update({
+        'start_date': start.isoformat(),
+        'end_date': end.isoformat(),
+        'method': method,
+        'tier': tier
+    })
+    response = jsonify(result)
+    response.headers['X-Data-Tier'] = tier
+    return response
+
+@app.route('/api/road-grid')
+def get_road_grid():
+    """
+    Retourne les états de route agrégés par cellule pour la carte.
+    
+    Paramètres: zoom (niveau Google Maps) et, optionnellement, l'emprise
+    visible south, west, north, east.
+    """
+    zoom = request.args.get('zoom', 12, type=int)
+    south = request.args.get('south', type=float)
+    west = request.args.get('west', type=float)
+    north = request.args.get('north', type=float)
+    east = request.args.get('east', type=float)
+    
+    grid = db.get_road_grid(zoom, south, west, north, east)
+    return jsonify(grid)
+
+@app.route('/api/segments')
+def get_segments():
+    """
+    Retourne les tronçons routiers avec leurs statistiques de rugosité.
+    
+    Paramètres optionnels: emprise visible south, west, north, east.
+    """
+    south = request.args.get('south', type=float)
+    west = request.args.get('west', type=float)
+    north = request.args.get('north', type=float)
+    east = request.args.get('east', type=float)
     
-    history = db.get_road_condition_history(limit, start_date, end_date, condition)
-    return jsonify(history)
+    segments = db.get_segments(south, west, north, east)
+    return jsonify(segments)
 
 @app.route('/api/statistics')
+@cached_response(hourly=True)
 def get_statistics():
-    stats = db.get_statistics()
-    return jsonify(stats)
-
-@app.route('/api/export-csv')
-def export_csv():
-    """Exporte l'historique des données au format CSV."""
-    limit = request.args.get('limit', 1000, type=int)
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
-    condition = request.args.get('condition')
     
-    # Récupérer les données
-    history = db.get_history(limit, start_date, end_date, condition)
+    stats = db.get_statistics(start_date, end_date)
+    return jsonify(stats)
+
+@app.route('/api/metrics')
+def get_metrics():
+    """Expose les métriques internes du serveur (pool de connexions, ...)."""
+    return jsonify({
+        'db_pool': db.pool_stats(),
+        'write_behind': ingest_queue.stats() if ingest_queue is not None else None,
+        'live_updates': live.stats(),
+        'response_cache': cache.stats() if cache is not None else None
+    })
+
+CSV_HEADER = [
+    'ID', 'Timestamp', 'Accelerometer X (m/s²)', 'Accelerometer Y (m/s²)', 'Accelerometer Z (m/s²)',
+    'Latitude', 'Longitude', 'Altitude', 'Satellites', 'Road Condition'
+]
+
+def to_ms2(value):
+    """Convertit une valeur d'accéléromètre brute en m/s² si nécessaire."""
+    if value is None:
+        return None
+    # Si la valeur est grande, c'est probablement une valeur brute
+    if abs(value) > 100:
+        value = (value / 16384.0) * 9.81
+    return round(value, 3)
+
+def generate_csv(rows, flush_every=500):
+    """
+    Génère le CSV morceau par morceau à partir des lignes de la base.
     
-    # Créer un fichier CSV en mémoire
+    Les lignes sont écrites dans un petit tampon vidé toutes les
+    `flush_every` lignes, de sorte que la mémoire reste constante.
+    """
     output = StringIO()
     writer = csv.writer(output)
+    writer.writerow(CSV_HEADER)
     
-    # Écrire l'en-tête
-    writer.writerow([
-        'ID', 'Timestamp', 'Accelerometer X (m/s²)', 'Accelerometer Y (m/s²)', 'Accelerometer Z (m/s²)',
-        'Latitude', 'Longitude', 'Altitude', 'Satellites', 'Road Condition'
-    ])
-    
-    # Écrire les données
-    for item in history:
-        # Convertir les valeurs brutes en m/s² si nécessaire
-        accel_x = item['accelerometer']['x']
-        accel_y = item['accelerometer']['y']
-        accel_z = item['accelerometer']['z']
-        
-        # Si les valeurs sont grandes, ce sont probablement des valeurs brutes
-        if abs(accel_x) > 100:
-            accel_x = (accel_x / 16384.0) * 9.81
-        if abs(accel_y) > 100:
-            accel_y = (accel_y / 16384.0) * 9.81
-        if abs(accel_z) > 100:
-            accel_z = (accel_z / 16384.0) * 9.81
-            
+    count = 0
+    for row_id, timestamp, accel_x, accel_y, accel_z, lat, lon, alt, satellites, road_condition in rows:
         writer.writerow([
-            item['id'],
-            item['timestamp'],
-            round(accel_x, 3),
-            round(accel_y, 3),
-            round(accel_z, 3),
-            item['gps']['latitude'],
-            item['gps']['longitude'],
-            item['gps']['altitude'],
-            item['gps']['satellites'],
-            item['road_condition']
+            row_id,
+            timestamp.isoformat() if timestamp else None,
+            to_ms2(accel_x),
+            to_ms2(accel_y),
+            to_ms2(accel_z),
+            lat,
+            lon,
+            alt,
+            satellites,
+            road_condition
         ])
+        count += 1
+        if count % flush_every == 0:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+    
+    yield output.getvalue()
+
+def gzip_stream(chunks):
+    """Compresse un flux de texte en gzip à la volée."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: en-tête gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+@app.route('/api/export-csv')
+def export_csv():
+    """
+    Exporte l'historique des données au format CSV en streaming.
+    
+    Sans paramètre limit, toutes les lignes correspondant aux filtres sont
+    exportées. Avec gzip=1, le fichier est compressé à la volée.
+    """
+    limit = request.args.get('limit', type=int)
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    condition = request.args.get('condition')
+    compress = request.args.get('gzip', '0') in ('1', 'true')
+    
+    # Lecture par blocs avec un curseur côté serveur
+    rows = db.iter_history_rows(start_date, end_date, condition, limit=limit)
+    body = generate_csv(rows)
     
-    # Préparer la réponse
-    output.seek(0)
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    if compress:
+        return Response(
+            gzip_stream(body),
+            mimetype="application/gzip",
+            headers={"Content-Disposition": f"attachment;filename=road_data_{timestamp}.csv.gz"}
+        )
     return Response(
-        output.getvalue(),
+        body,
         mimetype="text/csv",
         headers={"Content-Disposition": f"attachment;filename=road_data_{timestamp}.csv"}
     )
@@ -189,11 +571,23 @@ def generate_report(timestamp):
 
 @socketio.on('connect')
 def handle_connect():
-    # Envoyer les dernières données aux clients nouvellement connectés
-    socketio.emit('sensor_update', {
-        'sensor_data': latest_sensor_data,
-        'road_condition_history': road_condition_history
-    })
+    # Instantané au seul nouveau client, puis deltas de la room 'all'
+    join_room(ALL_ROOM)
+    emit('sensor_update', live.snapshot([ALL_ROOM]))
+
+@socketio.on('subscribe')
+def handle_subscribe(message):
+    """
+    Remplace les rooms du client par celles demandées
+    ({"devices": [...]} et/ou {"bbox": [sud, ouest, nord, est]}).
+    """
+    wanted = subscription_rooms(message)
+    for room in rooms():
+        if room != request.sid and room not in wanted:
+            leave_room(room)
+    for room in wanted:
+        join_room(room)
+    emit('sensor_update', live.snapshot(wanted))
 
 if __name__ == '__main__':
     socketio.run(app, host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Benchmark du sous-échantillonnage de /api/timeseries (downsample.py).
+
+Mesure le temps de réduction d'une série de lectures à 12 s d'intervalle
+(lues par blocs comme Database.iter_timeseries_rows) pour des plages d'une
+heure à un mois, avec les deux méthodes.
+
+Usage:
+    python3 bench_downsample.py [--points 500] [--chunk 10000]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import downsample
+
+RANGES = (('1 heure', timedelta(hours=1)), ('1 jour', timedelta(days=1)),
+          ('1 semaine', timedelta(days=7)), ('1 mois', timedelta(days=30)))
+INTERVAL = 12
+
+
+def sample_chunks(span, chunk, seed=1):
+    """Blocs de lignes (secondes, x, y, z) comme celles du curseur, avec quelques NULL."""
+    rng = np.random.default_rng(seed)
+    count = int(span.total_seconds() // INTERVAL)
+    seconds = np.arange(count) * INTERVAL
+    values = rng.normal((0.0, -9.8, -4.5), 0.8, size=(count, 3))
+    rows = [(int(s), float(x), float(y) if i % 97 else None, float(z))
+            for i, (s, (x, y, z)) in enumerate(zip(seconds, values))]
+    return [rows[i:i + chunk] for i in range(0, count, chunk)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du sous-échantillonnage des séries")
+    parser.add_argument('--points', type=int, default=downsample.DEFAULT_POINTS)
+    parser.add_argument('--chunk', type=int, default=10000)
+    args = parser.parse_args()
+
+    start = datetime(2024, 5, 1)
+    print(f"{'plage':<12}{'lignes':>10}" + ''.join(f"{method + ' ms':>14}" for method in downsample.METHODS))
+    for label, span in RANGES:
+        chunks = sample_chunks(span, args.chunk)
+        timings = []
+        for method in downsample.METHODS:
+            begin = time.perf_counter()
+            result = downsample.downsample(iter(chunks), start, start + span, args.points, method)
+            timings.append((time.perf_counter() - begin) * 1000)
+            assert len(result['series']['accelerometer_x']['value']) <= args.points
+        print(f"{label:<12}{result['rows']:>10}" + ''.join(f"{ms:14.1f}" for ms in timings))
+
+
+if __name__ == '__main__':
+    main()
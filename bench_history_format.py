@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark des formats de réponse de /api/history et /api/road-history.
+
+Compare, à partir des mêmes lignes de curseur (tuples), la forme actuelle
+(un dictionnaire par ligne puis JSON) aux réponses en colonnes de
+columnar.py: temps de sérialisation par ligne, taille brute et taille
+compressée gzip (telle qu'envoyée par un proxy qui compresse).
+
+Usage:
+    python3 bench_history_format.py [--rows 10000] [--repeat 5]
+"""
+import argparse
+import gzip
+import json
+import random
+import time
+from datetime import datetime, timedelta
+import columnar
+from database import history_item
+
+HISTORY_NAMES = ['id', 'timestamp', 'accelerometer_x', 'accelerometer_y', 'accelerometer_z',
+                 'latitude', 'longitude', 'altitude', 'satellites', 'road_condition', 'device']
+ROAD_NAMES = ['id', 'timestamp', 'latitude', 'longitude', 'road_condition']
+
+
+def sample_rows(count, seed=1):
+    """Lignes de donnees_routieres à 12 s d'intervalle, du plus récent au plus ancien."""
+    rng = random.Random(seed)
+    start = datetime(2024, 5, 1, 8, 0, 0)
+    lat, lon = -4.3250, 15.3100
+    rows = []
+    for i in range(count):
+        lat += rng.uniform(-0.00005, 0.00015)
+        lon += rng.uniform(-0.00005, 0.00015)
+        rows.append((
+            count - i,
+            start - timedelta(seconds=12 * i),
+            rng.uniform(-1.5, 1.5), rng.uniform(-10.5, -9.0), rng.uniform(-5.0, -4.0),
+            lat, lon, 280 + rng.uniform(-5, 5), rng.randint(4, 12),
+            rng.choice(('good', 'good', 'fair', 'bad')),
+            'default'
+        ))
+    return rows
+
+
+def current_history(names, rows):
+    """Forme actuelle de /api/history: curseur dictionary=True puis history_item."""
+    items = [history_item(dict(zip(names, row))) for row in rows]
+    return json.dumps(items, separators=(',', ':')).encode('utf-8')
+
+
+def current_road_history(names, rows):
+    """Forme actuelle de /api/road-history (get_road_condition_history)."""
+    items = []
+    for row in rows:
+        row = dict(zip(names, row))
+        items.append({
+            'timestamp': row['timestamp'].isoformat(),
+            'latitude': float(row['latitude']),
+            'longitude': float(row['longitude']),
+            'condition': row['road_condition'],
+            'id': row['id']
+        })
+    return json.dumps(items, separators=(',', ':')).encode('utf-8')
+
+
+def bench(encode, repeat):
+    body = encode()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        encode()
+    return body, (time.perf_counter() - start) / repeat
+
+
+def report(title, names, rows, current, repeat):
+    count = len(rows)
+    print(f"\n{title}: {count} lignes, {repeat} répétitions")
+    print(f"{'format':<12}{'µs/ligne':>10}{'octets/ligne':>14}{'gzip/ligne':>12}")
+
+    candidates = [('actuel', lambda: current(names, rows))]
+    for name in columnar.FORMATS:
+        candidates.append((name, lambda name=name: columnar.encode(name, names, rows)[0]))
+
+    baseline = None
+    for name, encode in candidates:
+        try:
+            body, seconds = bench(encode, repeat)
+        except columnar.UnsupportedFormat as e:
+            print(f"{name:<12}  indisponible ({e})")
+            continue
+        compressed = len(gzip.compress(body, 6))
+        if baseline is None:
+            baseline = (seconds, len(body))
+        print(f"{name:<12}{seconds * 1e6 / count:10.2f}{len(body) / count:14.1f}{compressed / count:12.1f}"
+              f"   ({baseline[0] / seconds:.1f}x plus rapide, {baseline[1] / len(body):.1f}x plus petit)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des formats de réponse de l'historique")
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rows = sample_rows(args.rows)
+    report("/api/history", HISTORY_NAMES, rows, current_history, args.repeat)
+
+    road_rows = [(row[0], row[1], row[5], row[6], row[9]) for row in rows]
+    report("/api/road-history", ROAD_NAMES, road_rows, current_road_history, args.repeat)
+
+    # Vérifie que le format binaire restitue les colonnes
+    header, columns = columnar.from_binary(columnar.to_binary(ROAD_NAMES, road_rows))
+    assert header['count'] == len(road_rows)
+    assert columns['road_condition'] == [row[4] for row in road_rows]
+    assert abs(columns['latitude'][0] - road_rows[0][2]) < 1e-9
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark des insertions dans le tampon SQLite du Raspberry Pi.
+
+Compare l'ancienne implémentation (une connexion, une transaction et un
+fsync par échantillon, journal rollback) à LocalDatabase (connexion
+persistante, WAL, synchronous=NORMAL, écriture groupée).
+
+Usage:
+    python3 bench_local_db.py [--samples 2000]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from local_database import LocalDatabase
+
+
+def legacy_save_data(db_path, data):
+    """Ancienne LocalDatabase.save_data: connexion et commit par échantillon."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT INTO sensor_data (timestamp, data, synced) VALUES (?, ?, ?)",
+        (data["timestamp"], json.dumps(data), 0)
+    )
+    conn.commit()
+    conn.close()
+
+
+def sample(i):
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "gps": {"time": "12:00:00", "latitude": -4.325, "longitude": 15.31, "altitude": 280.0, "satellites": 8},
+        "accelerometer": {"x_raw": -1200 + i % 7, "y_raw": -13800, "z_raw": -7400}
+    }
+
+
+def bench_legacy(directory, count):
+    db_path = os.path.join(directory, "legacy.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+    CREATE TABLE sensor_data (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT NOT NULL,
+        data TEXT NOT NULL,
+        synced INTEGER DEFAULT 0
+    )
+    ''')
+    conn.commit()
+    conn.close()
+
+    start = time.perf_counter()
+    for i in range(count):
+        legacy_save_data(db_path, sample(i))
+    return time.perf_counter() - start
+
+
+def bench_local_database(directory, count):
+    db = LocalDatabase(os.path.join(directory, "local.db"))
+    start = time.perf_counter()
+    for i in range(count):
+        db.save_data(sample(i))
+    # Inclure l'écriture des derniers échantillons en attente
+    db.close()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du tampon SQLite local")
+    parser.add_argument('--samples', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        legacy = bench_legacy(directory, args.samples)
+        current = bench_local_database(directory, args.samples)
+
+    print(f"{args.samples} échantillons")
+    print(f"Avant (connexion + commit par échantillon): {args.samples / legacy:10,.0f} insertions/s")
+    print(f"Après (WAL + écriture groupée):            {args.samples / current:10,.0f} insertions/s")
+    print(f"Accélération: x{legacy / current:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Benchmark de l'analyse des captures NMEA (nmea_log.py).
+
+Génère une capture synthétique (GGA, RMC et VTG en alternance, avec une
+fraction de lignes corrompues), puis compare le débit de parse_nmea_file
+à celui de parse_gpgga, l'analyseur ligne par ligne qu'utilisait
+Jean_autostart.py (recopié ici comme référence), qui ne lit que GGA sans
+vérifier la somme de contrôle, et de
+gps_reader.parse_sentence, qui fait le même travail que parse_nmea_file.
+Les deux derniers ne trouvent pas tout à fait le même nombre de positions:
+une ligne corrompue par '#' n'a plus de fin de ligne, la phrase suivante
+s'y colle, et seul parse_nmea_file la récupère (voir la sortie).
+
+Usage:
+    python3 bench_nmea.py [--sentences 1000000] [--corrupt 0.01] [--seed 42]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from gps_reader import parse_sentence
+from nmea_log import parse_nmea_file
+
+
+def with_checksum(body):
+    checksum = 0
+    for char in body:
+        checksum ^= ord(char)
+    return f"${body}*{checksum:02X}\r\n"
+
+
+def to_nmea(value, degree_digits):
+    value = abs(value)
+    degrees = int(value)
+    return f"{degrees:0{degree_digits}d}{(value - degrees) * 60:07.4f}"
+
+
+def generate_capture(path, sentences, corrupt, seed):
+    """Écrit une capture NMEA d'environ `sentences` phrases."""
+    rng = random.Random(seed)
+    lat, lon = -4.3250, 15.3100
+    seconds = 8 * 3600
+    written = 0
+    with open(path, 'w') as f:
+        while written < sentences:
+            lat += rng.uniform(-0.00005, 0.00015)
+            lon += rng.uniform(-0.00005, 0.00015)
+            hh, mm, ss = seconds // 3600, seconds // 60 % 60, seconds % 60
+            clock = f"{hh:02d}{mm:02d}{ss:02d}.00"
+            speed_kn = rng.uniform(0, 30)
+            course = rng.uniform(0, 360)
+            lines = [
+                with_checksum(f"GPGGA,{clock},{to_nmea(lat, 2)},S,{to_nmea(lon, 3)},E,1,"
+                              f"{rng.randint(4, 12):02d},0.9,{280 + rng.uniform(-5, 5):.1f},M,46.9,M,,"),
+                with_checksum(f"GPRMC,{clock},A,{to_nmea(lat, 2)},S,{to_nmea(lon, 3)},E,"
+                              f"{speed_kn:.1f},{course:.1f},010524,,"),
+                with_checksum(f"GPVTG,{course:.1f},T,,M,{speed_kn:.1f},N,{speed_kn * 1.852:.1f},K")
+            ]
+            for line in lines:
+                if rng.random() < corrupt:
+                    # Octet altéré ou ligne tronquée
+                    position = rng.randrange(1, len(line) - 5)
+                    line = line[:position] + ('#' if rng.random() < 0.5 else '\r\n')
+                f.write(line)
+            written += len(lines)
+            seconds += 1
+
+
+def parse_gpgga(gpgga_string):
+    """
+    Analyser la chaîne de données NMEA $GPGGA pour en extraire les informations GPS.
+
+    Copie de l'ancienne version de Jean_autostart.py, gardée comme référence.
+    """
+    parts = gpgga_string.split(',')
+    if len(parts) < 15:
+        return None
+    try:
+        time = parts[1][:2] + ':' + parts[1][2:4] + ':' + parts[1][4:6]
+        latitude = float(parts[2][:2]) + float(parts[2][2:]) / 60
+        if parts[3] == 'S':
+            latitude = -latitude
+        longitude = float(parts[4][:3]) + float(parts[4][3:]) / 60
+        if parts[5] == 'W':
+            longitude = -longitude
+        altitude = float(parts[9])
+        satellites = int(parts[7])
+        return {
+            "time": time,
+            "latitude": latitude,
+            "longitude": longitude,
+            "altitude": altitude,
+            "satellites": satellites
+        }
+    except (ValueError, IndexError):
+        return None
+
+
+def bench_parse_gpgga(path):
+    start = time.perf_counter()
+    count = fixes = 0
+    with open(path, 'r', errors='replace') as f:
+        for line in f:
+            count += 1
+            if line.startswith('$GPGGA') and parse_gpgga(line.rstrip()):
+                fixes += 1
+    return time.perf_counter() - start, count, fixes
+
+
+def bench_parse_sentence(path):
+    start = time.perf_counter()
+    fixes = 0
+    with open(path, 'r', errors='replace') as f:
+        for line in f:
+            parsed = parse_sentence(line)
+            if parsed and parsed[0] in ('GGA', 'RMC'):
+                fixes += 1
+    return time.perf_counter() - start, fixes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'analyse NMEA")
+    parser.add_argument('--sentences', type=int, default=1000000)
+    parser.add_argument('--corrupt', type=float, default=0.01)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'capture.nmea')
+        generate_capture(path, args.sentences, args.corrupt, args.seed)
+        size = os.path.getsize(path)
+
+        start = time.perf_counter()
+        fixes = parse_nmea_file(path)
+        vectorized = time.perf_counter() - start
+
+        legacy, count, legacy_fixes = bench_parse_gpgga(path)
+        per_line, per_line_fixes = bench_parse_sentence(path)
+
+    print(f"Capture: {count:,} lignes, {size / 1e6:.1f} Mo")
+    print(f"parse_gpgga (ligne par ligne):    {count / legacy:9,.0f} phrases/s  ({legacy_fixes:,} positions GGA, sans contrôle)")
+    print(f"parse_sentence (ligne par ligne): {count / per_line:9,.0f} phrases/s  ({per_line_fixes:,} positions GGA+RMC)")
+    print(f"parse_nmea_file (vectorisé):      {count / vectorized:9,.0f} phrases/s  ({len(fixes):,} positions GGA+RMC)")
+    print(f"Accélération: x{legacy / vectorized:.1f} sur parse_gpgga, x{per_line / vectorized:.1f} sur parse_sentence")
+    print(f"Écart de {len(fixes) - per_line_fixes:+,} positions avec parse_sentence: une ligne tronquée par '#' "
+          f"reçoit la phrase suivante (…#$GPRMC,…*hh); parse_nmea_file repart du dernier '$' et récupère "
+          f"cette phrase, parse_sentence rejette la ligne entière.")
+
+
+if __name__ == '__main__':
+    main()
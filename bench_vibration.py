@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark du classifieur de vibrations (vibration.py).
+
+Mesure le débit de la mise à jour incrémentale (WindowedClassifier) et de la
+version vectorisée (window_features), puis l'accord de chaque méthode avec
+les états de route étiquetés du simulateur (simulator.py).
+
+Le simulateur ne distingue les états que par la valeur moyenne de y
+(décalage de gravité), avec le même bruit de ±200 partout: la
+classification par fenêtre, qui retire la moyenne, les classe donc tous
+'good'. L'accord affiché n'est pas une mesure de précision; les seuils
+de vibration.py viennent de l'ISO 2631-1, pas de ces données.
+
+Usage:
+    python3 bench_vibration.py [--samples 200000] [--window 8] [--seed 42]
+"""
+import argparse
+import itertools
+import random
+import time
+import numpy as np
+from simulator import generer_chemin_continu, accelerometre_realiste
+from vibration import WindowedClassifier, window_features, classify_sample
+
+# Échantillons d'accéléromètre générés par point GPS du simulateur
+SAMPLES_PER_POINT = 8
+
+
+def labeled_samples(count):
+    """Génère `count` valeurs brutes de y étiquetées par l'état de la route."""
+    values = np.empty(count, dtype=np.float64)
+    labels = np.empty(count, dtype='<U4')
+    chemin = generer_chemin_continu()
+    i = 0
+    while i < count:
+        _, etat = next(chemin)
+        for _ in range(min(SAMPLES_PER_POINT, count - i)):
+            values[i] = accelerometre_realiste(etat)['y']
+            labels[i] = etat
+            i += 1
+    return values, labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du classifieur de vibrations")
+    parser.add_argument('--samples', type=int, default=200000)
+    parser.add_argument('--window', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    values, labels = labeled_samples(args.samples)
+    print(f"{args.samples} échantillons simulés, fenêtre de {args.window}")
+
+    # Débit de la mise à jour incrémentale (Raspberry Pi, serveur)
+    classifier = WindowedClassifier(args.window)
+    incremental = []
+    start = time.perf_counter()
+    for value in values.tolist():
+        classifier.update(value)
+        incremental.append(classifier.features()['condition'])
+    elapsed = time.perf_counter() - start
+    print(f"Incrémental:  {args.samples / elapsed:12,.0f} échantillons/s")
+
+    # Débit de la version vectorisée (rejeu en masse)
+    start = time.perf_counter()
+    features = window_features(values, args.window)
+    elapsed = time.perf_counter() - start
+    print(f"Vectorisé:    {args.samples / elapsed:12,.0f} échantillons/s")
+
+    # Débit de l'ancien seuil sur un seul échantillon
+    start = time.perf_counter()
+    single = [classify_sample(value) for value in values.tolist()]
+    elapsed = time.perf_counter() - start
+    print(f"Seuil simple: {args.samples / elapsed:12,.0f} échantillons/s")
+
+    # Accord avec les étiquettes du simulateur
+    windowed_labels = labels[args.window - 1:]
+    print()
+    print(f"Accord seuil simple:      {np.mean(np.array(single) == labels):6.1%}")
+    print(f"Accord fenêtre vectorisé: {np.mean(features['condition'] == windowed_labels):6.1%}")
+    print(f"Accord fenêtre incrément: {np.mean(np.array(incremental) == labels):6.1%}")
+    print("(états simulés distingués par la moyenne de y seulement, voir l'en-tête)")
+
+    # Matrice de confusion de la classification par fenêtre
+    conditions = ['good', 'fair', 'bad']
+    print()
+    print("Étiquette -> prédiction (fenêtre)")
+    for expected, predicted in itertools.product(conditions, conditions):
+        count = np.sum((windowed_labels == expected) & (features['condition'] == predicted))
+        print(f"  {expected:>4} -> {predicted:<4} {count:8d}")
+
+
+if __name__ == '__main__':
+    main()
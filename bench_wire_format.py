@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark des formats d'envoi par lot (wire_format.py).
+
+Pour chaque combinaison format/compression, mesure la taille par
+enregistrement et le temps CPU d'encodage (côté Pi) et de décodage (côté
+serveur) sur un lot de lectures semblables à celles de Jean_autostart.py.
+Vérifie d'abord que chaque format restitue les lectures (appareil compris)
+après un aller-retour encode_batch/decode_batch.
+
+Usage:
+    python3 bench_wire_format.py [--records 500] [--repeat 20]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+import wire_format
+from vibration import convert_to_ms2
+
+
+def sample_batch(count, seed=1):
+    """Lot de lectures à 1 Hz le long d'un trajet, avec caractéristiques de vibration."""
+    rng = random.Random(seed)
+    start = datetime(2024, 5, 1, 8, 0, 0)
+    lat, lon = -4.3250, 15.3100
+    readings = []
+    for i in range(count):
+        lat += rng.uniform(-0.00005, 0.00015)
+        lon += rng.uniform(-0.00005, 0.00015)
+        x, y, z = rng.randint(-2000, 2000), rng.randint(-14500, -13200), rng.randint(-8000, -6000)
+        readings.append({
+            "timestamp": (start + timedelta(seconds=i, microseconds=rng.randint(0, 999) * 1000)).isoformat(),
+            "gps": {
+                "time": (start + timedelta(seconds=i)).strftime("%H:%M:%S"),
+                "latitude": round(lat, 6),
+                "longitude": round(lon, 6),
+                "altitude": round(280 + rng.uniform(-5, 5), 1),
+                "satellites": rng.randint(4, 12),
+                "speed": round(rng.uniform(0, 60), 1),
+                "course": round(rng.uniform(0, 360), 1)
+            },
+            "accelerometer": {
+                "x_raw": x, "y_raw": y, "z_raw": z,
+                "x": convert_to_ms2(x), "y": convert_to_ms2(y), "z": convert_to_ms2(z)
+            },
+            "vibration": {
+                "n": 8,
+                "rms": abs(y) + rng.uniform(0, 300),
+                "ptp": rng.uniform(200, 6000),
+                "variance": rng.uniform(1e4, 1e6)
+            },
+            "device": f"pi-{i % 3}"
+        })
+    return readings
+
+
+def check_round_trip(readings, content_type, encoding):
+    """Vérifie qu'un aller-retour conserve les champs utilisés par le serveur."""
+    decoded = wire_format.decode_batch(wire_format.encode_batch(readings, content_type, encoding),
+                                       content_type, encoding)
+    assert len(decoded) == len(readings)
+    for sent, received in zip(readings, decoded):
+        assert received.get('device') == sent.get('device'), (sent.get('device'), received.get('device'))
+        assert abs(wire_format._to_seconds(received['timestamp']) - wire_format._to_seconds(sent['timestamp'])) < 1e-3
+        for key in ('latitude', 'longitude'):
+            assert abs(received['gps'][key] - sent['gps'][key]) < 1e-6
+        for key in ('speed', 'course'):
+            assert abs(received['gps'][key] - sent['gps'][key]) < 0.01
+        for key in ('x_raw', 'y_raw', 'z_raw'):
+            assert received['accelerometer'][key] == sent['accelerometer'][key]
+        for key in ('rms', 'ptp', 'variance'):
+            assert abs(received['vibration'][key] - sent['vibration'][key]) <= 1e-6 * sent['vibration'][key]
+
+
+def bench(readings, content_type, encoding, repeat):
+    body = wire_format.encode_batch(readings, content_type, encoding)
+    start = time.process_time()
+    for _ in range(repeat):
+        wire_format.encode_batch(readings, content_type, encoding)
+    encode_time = time.process_time() - start
+
+    start = time.process_time()
+    for _ in range(repeat):
+        decoded = wire_format.decode_batch(body, content_type, encoding)
+    decode_time = time.process_time() - start
+
+    assert len(decoded) == len(readings)
+    per_record = 1e6 / (repeat * len(readings))
+    return len(body), encode_time * per_record, decode_time * per_record
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des formats d'envoi par lot")
+    parser.add_argument('--records', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    readings = sample_batch(args.records)
+    for content_type in (wire_format.MSGPACK, wire_format.PACKED):
+        # Un champ inconnu doit faire repasser le lot au JSON plutôt qu'être perdu
+        try:
+            wire_format.encode_batch(readings[:1] + [dict(readings[1], extra=1)], content_type)
+        except wire_format.UnrepresentableReading:
+            pass
+        except wire_format.UnsupportedFormat:
+            continue
+        else:
+            raise AssertionError(f"{content_type}: champ inconnu perdu sans erreur")
+
+    print(f"Lot de {args.records} lectures, {args.repeat} répétitions")
+    print(f"{'format':<10}{'compression':<13}{'octets/enr.':>12}{'encodage µs/enr.':>18}{'décodage µs/enr.':>18}")
+
+    baseline = None
+    for name, content_type in wire_format.FORMATS.items():
+        for encoding in (None,) + wire_format.COMPRESSIONS:
+            try:
+                check_round_trip(readings, content_type, encoding)
+                size, encode_us, decode_us = bench(readings, content_type, encoding, args.repeat)
+            except wire_format.UnsupportedFormat as e:
+                print(f"{name:<10}{encoding or '-':<13}  indisponible ({e})")
+                continue
+            if baseline is None:
+                baseline = size
+            print(f"{name:<10}{encoding or '-':<13}{size / args.records:12.1f}"
+                  f"{encode_us:18.1f}{decode_us:18.1f}   ({baseline / size:.1f}x plus petit que JSON)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+"""
+Réponses en colonnes des API d'historique (?format=...).
+
+Les lignes du curseur MySQL (tuples) sont transposées colonne par colonne,
+sans dictionnaire par ligne:
+
+- columnar: JSON {"columns": {nom: [valeurs]}, "count", ...}, un tableau par
+  colonne de la requête (timestamp en ISO 8601)
+- binary: tableaux typés little-endian pour les gros chargements de carte,
+  lisibles sans copie par Float32Array/Float64Array/Int32Array/Uint8Array
+- arrow: flux Arrow IPC (paquet pyarrow, optionnel)
+
+Format binary: signature BINARY_MAGIC, longueur de l'en-tête (uint32), en-tête
+JSON complété par des espaces jusqu'à un multiple de 8 octets, puis les
+tampons de chaque colonne alignés sur 8 octets. L'en-tête décrit chaque
+colonne: nom, dtype, position et longueur en octets, et pour les colonnes
+texte la liste des valeurs dont la colonne contient les indices. Valeurs
+absentes: NaN (flottants), -1 (entiers), NULL_CATEGORY (texte).
+Timestamps: secondes depuis 1970-01-01, heure du serveur sans fuseau
+(comme wire_format.EPOCH).
+"""
+import json
+import struct
+import numpy as np
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:
+    pyarrow = None
+
+COLUMNAR = 'columnar'
+BINARY = 'binary'
+ARROW = 'arrow'
+
+BINARY_CONTENT_TYPE = 'application/vnd.road-monitor.columns'
+ARROW_CONTENT_TYPE = 'application/vnd.apache.arrow.stream'
+
+# Valeurs du paramètre format et type MIME de la réponse
+FORMATS = {COLUMNAR: 'application/json', BINARY: BINARY_CONTENT_TYPE, ARROW: ARROW_CONTENT_TYPE}
+
+BINARY_MAGIC = b'RMC1'
+BINARY_PREFIX = struct.Struct('<4sI')
+
+# Indice des valeurs absentes dans les colonnes texte
+NULL_CATEGORY = 255
+
+# Type des colonnes connues dans le format binary; les autres sont en float64
+COLUMN_DTYPES = {
+    'id': '<i4',
+    'timestamp': 'timestamp',
+    'accelerometer_x': '<f4',
+    'accelerometer_y': '<f4',
+    'accelerometer_z': '<f4',
+    'latitude': '<f8',
+    'longitude': '<f8',
+    'altitude': '<f4',
+    'satellites': '<i2',
+    'count': '<i4',
+    'good': '<i4',
+    'fair': '<i4',
+    'bad': '<i4',
+    'road_condition': 'category',
+    'device': 'category'
+}
+
+
+class UnsupportedFormat(ValueError):
+    """Format de réponse inconnu ou dépendance optionnelle absente."""
+
+
+def transpose(rows, width):
+    """Colonnes (tuples) d'une liste de lignes, en une seule passe C (zip)."""
+    if not rows:
+        return [()] * width
+    return list(zip(*rows))
+
+
+def _isoformat(values):
+    return [value.isoformat() if value is not None else None for value in values]
+
+
+def to_columnar_json(names, rows, extra=None):
+    """
+    Returns:
+        dict: {"count", "columns": {nom: [valeurs]}} plus les clés de `extra`
+    """
+    columns = transpose(rows, len(names))
+    payload = {
+        'count': len(rows),
+        'columns': {
+            name: _isoformat(values) if name == 'timestamp' else list(values)
+            for name, values in zip(names, columns)
+        }
+    }
+    if extra:
+        payload.update(extra)
+    return payload
+
+
+def _timestamp_array(values):
+    seconds = np.array(values, dtype='datetime64[s]')
+    result = seconds.astype(np.int64).astype(np.float64)
+    result[np.isnat(seconds)] = np.nan
+    return result
+
+
+def _category_array(values):
+    categories = sorted({value for value in values if value is not None})
+    if len(categories) >= NULL_CATEGORY:
+        raise UnsupportedFormat(f"Too many distinct values for a text column ({len(categories)})")
+    index = {value: code for code, value in enumerate(categories)}
+    index[None] = NULL_CATEGORY
+    return np.array([index[value] for value in values], dtype=np.uint8), categories
+
+
+def _numeric_array(values, dtype):
+    # None devient NaN à la conversion en flottant
+    floats = np.array(values, dtype=np.float64)
+    if np.dtype(dtype).kind == 'i':
+        floats[np.isnan(floats)] = -1
+    return floats.astype(dtype)
+
+
+def to_binary(names, rows, extra=None):
+    """Encode les lignes en tableaux typés (voir la docstring du module)."""
+    columns = transpose(rows, len(names))
+    fields = []
+    buffers = []
+    offset = 0
+    for name, values in zip(names, columns):
+        kind = COLUMN_DTYPES.get(name, '<f8')
+        field = {'name': name}
+        if kind == 'timestamp':
+            array = _timestamp_array(values)
+            field['dtype'] = 'float64'
+            field['unit'] = 's'
+        elif kind == 'category':
+            array, field['categories'] = _category_array(values)
+            field['dtype'] = 'uint8'
+        else:
+            array = _numeric_array(values, kind)
+            field['dtype'] = array.dtype.name
+        data = array.tobytes()
+        field['offset'] = offset
+        field['length'] = len(data)
+        fields.append(field)
+        buffers.append(data + b'\0' * (-len(data) % 8))
+        offset += len(buffers[-1])
+
+    header = {'count': len(rows), 'fields': fields}
+    if extra:
+        header.update(extra)
+    header = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    # Signature + longueur (8 octets) + en-tête: les tampons commencent sur un multiple de 8
+    header += b' ' * (-len(header) % 8)
+    return BINARY_PREFIX.pack(BINARY_MAGIC, len(header)) + header + b''.join(buffers)
+
+
+def from_binary(body):
+    """
+    Décode une réponse binary (outils et benchmark).
+
+    Returns:
+        tuple: (en-tête, {nom: tableau NumPy ou liste de textes})
+    """
+    magic, header_length = BINARY_PREFIX.unpack_from(body)
+    if magic != BINARY_MAGIC:
+        raise ValueError("Invalid binary response signature")
+    start = BINARY_PREFIX.size + header_length
+    header = json.loads(body[BINARY_PREFIX.size:start])
+    columns = {}
+    for field in header['fields']:
+        array = np.frombuffer(body, dtype=field['dtype'], count=field['length'] // np.dtype(field['dtype']).itemsize,
+                              offset=start + field['offset'])
+        if 'categories' in field:
+            categories = field['categories'] + [None] * (NULL_CATEGORY + 1 - len(field['categories']))
+            array = [categories[code] for code in array]
+        columns[field['name']] = array
+    return header, columns
+
+
+def to_arrow(names, rows, extra=None):
+    """Flux Arrow IPC d'une table (une colonne par nom); nécessite pyarrow."""
+    if pyarrow is None:
+        raise UnsupportedFormat("pyarrow is not installed")
+    columns = transpose(rows, len(names))
+    table = pyarrow.table({name: pyarrow.array(values) for name, values in zip(names, columns)})
+    if extra:
+        table = table.replace_schema_metadata({key: json.dumps(value) for key, value in extra.items()})
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def encode(response_format, names, rows, extra=None):
+    """
+    Corps d'une réponse en colonnes.
+
+    Returns:
+        tuple: (octets, type MIME)
+
+    Raises:
+        UnsupportedFormat: Format inconnu ou pyarrow absent
+    """
+    if response_format == COLUMNAR:
+        body = json.dumps(to_columnar_json(names, rows, extra), separators=(',', ':')).encode('utf-8')
+    elif response_format == BINARY:
+        body = to_binary(names, rows, extra)
+    elif response_format == ARROW:
+        body = to_arrow(names, rows, extra)
+    else:
+        raise UnsupportedFormat(f"Unknown format: {response_format}")
+    return body, FORMATS[response_format]
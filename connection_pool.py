@@ -0,0 +1,183 @@
+import threading
+import time
+import mysql.connector
+
+
+class PoolTimeout(Exception):
+    """Levée quand aucune connexion ne se libère avant l'expiration du délai."""
+
+
+class PooledConnection:
+    """
+    Enveloppe une connexion MySQL empruntée au pool.
+
+    close() rend la connexion au pool au lieu de la fermer, ce qui permet
+    au code existant (conn = get_connection() ... conn.close()) de profiter
+    du pool sans modification. Les autres attributs sont délégués à la
+    connexion sous-jacente.
+    """
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+        self._released = False
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self._pool.release(self._conn)
+
+    def discard(self):
+        """Ferme la connexion sans la rendre au pool (état inconnu ou résultat non lu)."""
+        if not self._released:
+            self._released = True
+            self._pool.discard(self._conn)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    Pool de connexions MySQL borné et thread-safe.
+
+    Les connexions inactives sont réutilisées; une connexion est vérifiée
+    (ping) au moment de l'emprunt et recréée si elle est périmée. Quand le
+    pool est plein, les appelants attendent jusqu'à `timeout` secondes.
+    """
+
+    def __init__(self, config, pool_size=5, timeout=10, check_idle=30):
+        """
+        Args:
+            config (dict): Paramètres passés à mysql.connector.connect
+            pool_size (int): Nombre maximal de connexions ouvertes
+            timeout (float): Attente maximale d'une connexion libre en secondes
+            check_idle (float): Durée d'inactivité au-delà de laquelle la connexion
+                est vérifiée avant d'être prêtée (0 pour toujours vérifier)
+        """
+        self.config = config
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.check_idle = check_idle
+
+        self._lock = threading.Condition()
+        self._idle = []          # Liste de (connexion, instant de restitution)
+        self._open = 0           # Connexions ouvertes (prêtées + inactives)
+        self._in_use = 0
+        self._waiting = 0
+        self._created = 0
+        self._reconnects = 0
+        self._timeouts = 0
+
+    def _connect(self):
+        conn = mysql.connector.connect(**self.config)
+        with self._lock:
+            self._created += 1
+        return conn
+
+    def _is_healthy(self, conn, idle_since):
+        """Vérifie qu'une connexion inactive est toujours utilisable."""
+        if time.monotonic() - idle_since < self.check_idle:
+            return True
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def acquire(self):
+        """Emprunte une connexion, en la recréant si elle est périmée."""
+        deadline = time.monotonic() + self.timeout
+        with self._lock:
+            while not self._idle and self._open >= self.pool_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(f"Aucune connexion disponible après {self.timeout}s")
+                self._waiting += 1
+                try:
+                    self._lock.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            if self._idle:
+                conn, idle_since = self._idle.pop()
+            else:
+                conn, idle_since = None, None
+                self._open += 1
+            self._in_use += 1
+
+        try:
+            if conn is not None and not self._is_healthy(conn, idle_since):
+                self._discard(conn)
+                with self._lock:
+                    self._reconnects += 1
+                conn = None
+            if conn is None:
+                conn = self._connect()
+        except Exception:
+            # Libérer la place réservée si la connexion n'a pas pu être établie
+            with self._lock:
+                self._open -= 1
+                self._in_use -= 1
+                self._lock.notify()
+            raise
+
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        """Rend une connexion au pool."""
+        try:
+            # Annuler une éventuelle transaction laissée ouverte
+            if conn.in_transaction:
+                conn.rollback()
+        except Exception:
+            self.discard(conn)
+            return
+
+        with self._lock:
+            self._idle.append((conn, time.monotonic()))
+            self._in_use -= 1
+            self._lock.notify()
+
+    def discard(self, conn):
+        """Ferme une connexion empruntée et libère sa place dans le pool."""
+        self._discard(conn)
+        with self._lock:
+            self._open -= 1
+            self._in_use -= 1
+            self._lock.notify()
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close_all(self):
+        """Ferme toutes les connexions inactives."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self):
+        """Retourne les métriques du pool."""
+        with self._lock:
+            return {
+                'pool_size': self.pool_size,
+                'open': self._open,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'created': self._created,
+                'reconnects': self._reconnects,
+                'timeouts': self._timeouts
+            }
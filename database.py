@@ -1,9 +1,299 @@
 import mysql.connector
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
+from connection_pool import ConnectionPool, PoolTimeout
+from road_grid import GRID_CELL_SIZE, cell_for, factor_for_zoom, bbox_to_cells, build_cells
+from road_segments import SegmentIndex
+from storage_tiers import (
+    FUTURE_PARTITION, MINUTE_TIER, RAW_TIER, choose_tier, parse_bound,
+    partitions_to_create, retention_cutoff
+)
+from vibration import classify_reading, to_raw
+
+# Requête d'insertion commune aux écritures unitaires et par lot
+INSERT_QUERY = '''
+INSERT INTO donnees_routieres 
+(timestamp, accelerometer_x, accelerometer_y, accelerometer_z, 
+ latitude, longitude, altitude, satellites, road_condition, device)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+'''
+
+# Appareil des lectures sans clé "device" (un seul Raspberry Pi)
+DEFAULT_DEVICE = 'default'
+
+# Colonnes de donnees_routieres dans l'ordre utilisé par les exports
+HISTORY_COLUMNS = (
+    "id, timestamp, accelerometer_x, accelerometer_y, accelerometer_z, "
+    "latitude, longitude, altitude, satellites, road_condition"
+)
+
+# Colonnes de donnees_minute au format de HISTORY_COLUMNS (réponses en colonnes)
+MINUTE_HISTORY_COLUMNS = (
+    "bucket AS timestamp, device, count, accelerometer_x, accelerometer_y, accelerometer_z, "
+    "latitude, longitude, altitude, satellites, road_condition"
+)
+
+# Migrations du schéma, appliquées dans l'ordre par init_db et enregistrées
+# dans la table schema_migrations. Ne jamais modifier une migration déjà
+# publiée: en ajouter une nouvelle avec le numéro suivant.
+MIGRATIONS = [
+    (1, "Index de tri/plage sur timestamp, couvrant pour /api/road-history", [
+        '''
+        CREATE INDEX idx_donnees_timestamp
+        ON donnees_routieres (timestamp, road_condition, latitude, longitude)
+        '''
+    ]),
+    (2, "Index (road_condition, timestamp) pour les filtres par état", [
+        '''
+        CREATE INDEX idx_donnees_condition_timestamp
+        ON donnees_routieres (road_condition, timestamp, latitude, longitude)
+        '''
+    ]),
+    (3, "Agrégat horaire des états de route pour /api/statistics", [
+        '''
+        CREATE TABLE IF NOT EXISTS statistiques_horaires (
+            bucket DATETIME NOT NULL,
+            road_condition VARCHAR(10) NOT NULL,
+            count INT NOT NULL DEFAULT 0,
+            first_ts DATETIME NOT NULL,
+            last_ts DATETIME NOT NULL,
+            PRIMARY KEY (bucket, road_condition)
+        )
+        ''',
+        # Remplir l'agrégat avec les données déjà présentes
+        '''
+        INSERT INTO statistiques_horaires (bucket, road_condition, count, first_ts, last_ts)
+        SELECT DATE_FORMAT(timestamp, '%Y-%m-%d %H:00:00'),
+               COALESCE(road_condition, 'unknown'),
+               COUNT(*), MIN(timestamp), MAX(timestamp)
+        FROM donnees_routieres
+        GROUP BY 1, 2
+        '''
+    ]),
+    (4, "Grille spatiale des états de route pour /api/road-grid", [
+        '''
+        CREATE TABLE IF NOT EXISTS grille_routiere (
+            cell_y INT NOT NULL,
+            cell_x INT NOT NULL,
+            road_condition VARCHAR(10) NOT NULL,
+            count INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (cell_y, cell_x, road_condition)
+        )
+        ''',
+        # Cellules de 0.0005° (road_grid.GRID_CELL_SIZE)
+        '''
+        INSERT INTO grille_routiere (cell_y, cell_x, road_condition, count)
+        SELECT FLOOR(latitude / 0.0005), FLOOR(longitude / 0.0005),
+               COALESCE(road_condition, 'unknown'), COUNT(*)
+        FROM donnees_routieres
+        WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+        GROUP BY 1, 2, 3
+        '''
+    ]),
+    (5, "Tronçons routiers et statistiques de rugosité par tronçon", [
+        '''
+        CREATE TABLE IF NOT EXISTS troncons (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            nom VARCHAR(255),
+            source VARCHAR(32) NOT NULL,
+            lat_debut DOUBLE NOT NULL,
+            lon_debut DOUBLE NOT NULL,
+            lat_fin DOUBLE NOT NULL,
+            lon_fin DOUBLE NOT NULL,
+            INDEX idx_troncons_source (source)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS troncons_stats (
+            troncon_id INT PRIMARY KEY,
+            count INT NOT NULL DEFAULT 0,
+            sum_roughness DOUBLE NOT NULL DEFAULT 0,
+            sum_roughness_sq DOUBLE NOT NULL DEFAULT 0,
+            good INT NOT NULL DEFAULT 0,
+            fair INT NOT NULL DEFAULT 0,
+            bad INT NOT NULL DEFAULT 0,
+            last_ts DATETIME
+        )
+        '''
+    ]),
+    (6, "Colonne device (appareil émetteur) sur donnees_routieres", [
+        '''
+        ALTER TABLE donnees_routieres
+        ADD COLUMN device VARCHAR(64) NOT NULL DEFAULT 'default'
+        '''
+    ]),
+    (7, "Partitionnement de donnees_routieres par plage de timestamp", [
+        # La clé de partitionnement doit faire partie de la clé primaire
+        '''
+        ALTER TABLE donnees_routieres
+        DROP PRIMARY KEY, ADD PRIMARY KEY (id, timestamp)
+        ''',
+        # Une seule partition au départ: ensure_partitions() la découpe par mois
+        '''
+        ALTER TABLE donnees_routieres
+        PARTITION BY RANGE COLUMNS(timestamp) (
+            PARTITION p_future VALUES LESS THAN (MAXVALUE)
+        )
+        '''
+    ]),
+    (8, "Lectures résumées à la minute par appareil (niveau sous-échantillonné)", [
+        '''
+        CREATE TABLE IF NOT EXISTS donnees_minute (
+            bucket DATETIME NOT NULL,
+            device VARCHAR(64) NOT NULL,
+            count INT NOT NULL,
+            accelerometer_x FLOAT,
+            accelerometer_y FLOAT,
+            accelerometer_z FLOAT,
+            latitude FLOAT,
+            longitude FLOAT,
+            altitude FLOAT,
+            satellites INT,
+            good INT NOT NULL DEFAULT 0,
+            fair INT NOT NULL DEFAULT 0,
+            bad INT NOT NULL DEFAULT 0,
+            road_condition VARCHAR(10),
+            PRIMARY KEY (bucket, device),
+            INDEX idx_minute_condition_bucket (road_condition, bucket)
+        )
+        '''
+    ]),
+    (9, "Index (timestamp, id) pour la pagination par curseur de l'historique", [
+        '''
+        CREATE INDEX idx_donnees_timestamp_id
+        ON donnees_routieres (timestamp, id)
+        ''',
+        '''
+        CREATE INDEX idx_donnees_condition_timestamp_id
+        ON donnees_routieres (road_condition, timestamp, id)
+        ''',
+        '''
+        CREATE INDEX idx_minute_condition_bucket_device
+        ON donnees_minute (road_condition, bucket, device)
+        '''
+    ]),
+]
+
+# Résumé à la minute par appareil d'une plage de lectures brutes. Les
+# minutes déjà présentes sont remplacées: relancer sur une plage est sans
+# risque (lectures arrivées en retard). État dominant, le pire en cas d'égalité.
+ROLLUP_MINUTES_QUERY = '''
+INSERT INTO donnees_minute
+(bucket, device, count, accelerometer_x, accelerometer_y, accelerometer_z,
+ latitude, longitude, altitude, satellites, good, fair, bad, road_condition)
+SELECT bucket, device, n, ax, ay, az, lat, lon, alt, sats, good, fair, bad,
+       CASE WHEN good + fair + bad = 0 THEN 'unknown'
+            WHEN bad >= fair AND bad >= good THEN 'bad'
+            WHEN fair >= good THEN 'fair'
+            ELSE 'good' END
+FROM (
+    SELECT DATE_FORMAT(timestamp, '%%Y-%%m-%%d %%H:%%i:00') AS bucket, device, COUNT(*) AS n,
+           AVG(accelerometer_x) AS ax, AVG(accelerometer_y) AS ay, AVG(accelerometer_z) AS az,
+           AVG(latitude) AS lat, AVG(longitude) AS lon, AVG(altitude) AS alt,
+           ROUND(AVG(satellites)) AS sats,
+           SUM(road_condition = 'good') AS good,
+           SUM(road_condition = 'fair') AS fair,
+           SUM(road_condition = 'bad') AS bad
+    FROM donnees_routieres
+    WHERE timestamp >= %s AND timestamp < %s
+    GROUP BY bucket, device
+) AS minutes
+ON DUPLICATE KEY UPDATE
+    count = VALUES(count),
+    accelerometer_x = VALUES(accelerometer_x),
+    accelerometer_y = VALUES(accelerometer_y),
+    accelerometer_z = VALUES(accelerometer_z),
+    latitude = VALUES(latitude),
+    longitude = VALUES(longitude),
+    altitude = VALUES(altitude),
+    satellites = VALUES(satellites),
+    good = VALUES(good),
+    fair = VALUES(fair),
+    bad = VALUES(bad),
+    road_condition = VALUES(road_condition)
+'''
+
+# Partitions de donnees_routieres dans l'ordre des bornes
+PARTITIONS_QUERY = '''
+SELECT PARTITION_NAME, PARTITION_DESCRIPTION
+FROM information_schema.PARTITIONS
+WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'donnees_routieres'
+  AND PARTITION_NAME IS NOT NULL
+ORDER BY PARTITION_ORDINAL_POSITION
+'''
+
+# Mise à jour incrémentale de l'agrégat horaire lors des insertions
+ROLLUP_UPSERT_QUERY = '''
+INSERT INTO statistiques_horaires (bucket, road_condition, count, first_ts, last_ts)
+VALUES (%s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE
+    count = count + VALUES(count),
+    first_ts = LEAST(first_ts, VALUES(first_ts)),
+    last_ts = GREATEST(last_ts, VALUES(last_ts))
+'''
+
+# Mise à jour incrémentale de la grille spatiale lors des insertions
+GRID_UPSERT_QUERY = '''
+INSERT INTO grille_routiere (cell_y, cell_x, road_condition, count)
+VALUES (%s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE count = count + VALUES(count)
+'''
+
+# Mise à jour incrémentale des statistiques par tronçon lors des insertions
+SEGMENT_STATS_UPSERT_QUERY = '''
+INSERT INTO troncons_stats (troncon_id, count, sum_roughness, sum_roughness_sq, good, fair, bad, last_ts)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE
+    count = count + VALUES(count),
+    sum_roughness = sum_roughness + VALUES(sum_roughness),
+    sum_roughness_sq = sum_roughness_sq + VALUES(sum_roughness_sq),
+    good = good + VALUES(good),
+    fair = fair + VALUES(fair),
+    bad = bad + VALUES(bad),
+    last_ts = GREATEST(COALESCE(last_ts, VALUES(last_ts)), VALUES(last_ts))
+'''
+
+# Code d'erreur MySQL renvoyé quand un index du même nom existe déjà
+ER_DUP_KEYNAME = 1061
+
+# Erreurs MySQL passagères (attente de verrou, interblocage, connexion
+# perdue): la même écriture peut réussir en la relançant
+TRANSIENT_ERRNOS = {1205, 1213, 2006, 2013, 2055}
+
+
+def is_transient_error(error):
+    """Vrai si une écriture a échoué pour une raison passagère plutôt qu'à cause des données."""
+    if isinstance(error, PoolTimeout):
+        return True
+    if isinstance(error, (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError)):
+        return True
+    return isinstance(error, mysql.connector.Error) and error.errno in TRANSIENT_ERRNOS
+
+
+def history_item(row):
+    """Élément de /api/history (forme imbriquée) à partir d'une ligne brute en dictionnaire."""
+    return {
+        'id': row['id'],
+        'timestamp': row['timestamp'].isoformat() if row['timestamp'] else None,
+        'accelerometer': {
+            'x': row['accelerometer_x'],
+            'y': row['accelerometer_y'],
+            'z': row['accelerometer_z']
+        },
+        'gps': {
+            'latitude': row['latitude'],
+            'longitude': row['longitude'],
+            'altitude': row['altitude'],
+            'satellites': row['satellites']
+        },
+        'road_condition': row['road_condition'],
+        'device': row.get('device')
+    }
+
 
 class Database:
-    def __init__(self, host="localhost", user="root", password="", database="road_monitor"):
+    def __init__(self, host="localhost", user="root", password="", database="road_monitor",
+                 pool_size=5, pool_timeout=10, pool_check_idle=30):
         """
         Initialise la connexion à la base de données MySQL.
         
@@ -12,6 +302,10 @@ class Database:
             user (str): Nom d'utilisateur MySQL (par défaut: root)
             password (str): Mot de passe MySQL (par défaut: vide)
             database (str): Nom de la base de données (par défaut: road_monitor)
+            pool_size (int): Nombre maximal de connexions du pool (par défaut: 5)
+            pool_timeout (float): Attente maximale d'une connexion libre en secondes (par défaut: 10)
+            pool_check_idle (float): Inactivité en secondes au-delà de laquelle une connexion
+                est vérifiée avant d'être prêtée (par défaut: 30)
         """
         self.config = {
             'host': host,
@@ -20,10 +314,26 @@ class Database:
             'database': database
         }
         self.init_db()
+        self.pool = ConnectionPool(
+            self.config,
+            pool_size=pool_size,
+            timeout=pool_timeout,
+            check_idle=pool_check_idle
+        )
+        # Index des tronçons pour le rattachement des lectures
+        self.segment_index = SegmentIndex(self.load_segments())
 
     def get_connection(self):
-        """Établit et retourne une connexion à la base de données."""
-        return mysql.connector.connect(**self.config)
+        """
+        Emprunte une connexion au pool.
+        
+        Appeler close() sur la connexion retournée la rend au pool.
+        """
+        return self.pool.acquire()
+
+    def pool_stats(self):
+        """Retourne les métriques du pool de connexions."""
+        return self.pool.stats()
 
     def init_db(self):
         """Initialise la base de données avec les tables nécessaires."""
@@ -55,42 +365,197 @@ class Database:
         )
         ''')
         
+        conn.commit()
+        self.apply_migrations(cursor)
+        conn.commit()
+        # Partitions du mois courant et des suivants
+        self._ensure_partitions(cursor)
         conn.commit()
         cursor.close()
         conn.close()
 
-    def save_sensor_data(self, data):
-        """Enregistre les données des capteurs dans la base de données."""
+    def apply_migrations(self, cursor):
+        """Applique les migrations de MIGRATIONS qui ne l'ont pas encore été."""
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            description VARCHAR(255),
+            applied_at DATETIME NOT NULL
+        )
+        ''')
+        cursor.execute("SELECT version FROM schema_migrations")
+        applied = {row[0] for row in cursor.fetchall()}
+        
+        for version, description, statements in MIGRATIONS:
+            if version in applied:
+                continue
+            print(f"Application de la migration {version}: {description}")
+            for statement in statements:
+                try:
+                    cursor.execute(statement)
+                except mysql.connector.Error as e:
+                    # Index déjà créé à la main: la migration est considérée appliquée
+                    if e.errno != ER_DUP_KEYNAME:
+                        raise
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, description, applied_at) VALUES (%s, %s, %s)",
+                (version, description, datetime.now())
+            )
+
+    def _list_partitions(self, cursor):
+        """
+        Returns:
+            list: (nom, borne supérieure exclue ou None pour MAXVALUE); vide si
+                  la table n'est pas partitionnée
+        """
+        cursor.execute(PARTITIONS_QUERY)
+        return [(name, parse_bound(description)) for name, description in cursor.fetchall()]
+
+    def _raw_since(self, cursor):
+        """Plus ancienne lecture brute conservée (index sur timestamp: lecture immédiate)."""
+        cursor.execute("SELECT MIN(timestamp) FROM donnees_routieres")
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def _ensure_partitions(self, cursor, now=None):
+        """
+        Découpe p_future pour que les partitions couvrent le mois courant et
+        PARTITION_MONTHS_AHEAD mois de plus.
+        
+        Returns:
+            list: Noms des partitions créées
+        """
+        partitions = self._list_partitions(cursor)
+        if not any(name == FUTURE_PARTITION for name, _ in partitions):
+            return []
+        bounds = [bound for _, bound in partitions if bound is not None]
+        last_bound = max(bounds) if bounds else None
+        first_data = self._raw_since(cursor) if last_bound is None else None
+        created = partitions_to_create(last_bound, first_data, now or datetime.now())
+        if not created:
+            return []
+        definitions = ", ".join(
+            f"PARTITION {name} VALUES LESS THAN ('{bound:%Y-%m-%d %H:%M:%S}')" for name, bound in created
+        )
+        cursor.execute(f"""
+        ALTER TABLE donnees_routieres REORGANIZE PARTITION {FUTURE_PARTITION} INTO (
+            {definitions}, PARTITION {FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE)
+        )
+        """)
+        return [name for name, _ in created]
+
+    def ensure_partitions(self, now=None):
+        """Crée à l'avance les partitions mensuelles de donnees_routieres."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            return self._ensure_partitions(cursor, now)
+        finally:
+            cursor.close()
+            conn.close()
+
+    def rollup_minutes(self, start, end, step=timedelta(days=1)):
+        """
+        Recalcule donnees_minute pour les lectures de [start, end), par
+        transactions d'une journée.
+        
+        Returns:
+            int: Nombre de lignes de donnees_minute écrites
+        """
         conn = self.get_connection()
         cursor = conn.cursor()
+        written = 0
+        try:
+            chunk_start = start
+            while chunk_start < end:
+                chunk_end = min(chunk_start + step, end)
+                cursor.execute(ROLLUP_MINUTES_QUERY, (chunk_start, chunk_end))
+                written += cursor.rowcount
+                conn.commit()
+                chunk_start = chunk_end
+            return written
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    def apply_retention(self, now=None):
+        """
+        Supprime les partitions brutes plus anciennes que RAW_RETENTION_MONTHS,
+        après les avoir résumées une dernière fois dans donnees_minute.
         
+        Les agrégats (statistiques_horaires, grille_routiere, troncons_stats)
+        ne sont pas touchés. Seul rebuild_statistics() sait repartir de
+        donnees_minute: rebuild_road_grid() et rebuild_segment_stats() ne
+        recompteront plus les lectures supprimées.
+        
+        Returns:
+            list: Noms des partitions supprimées
+        """
+        cutoff = retention_cutoff(now or datetime.now())
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            partitions = self._list_partitions(cursor)
+            raw_since = self._raw_since(cursor)
+        finally:
+            cursor.close()
+            conn.close()
+        
+        dropped = []
+        lower = raw_since
+        for name, bound in partitions:
+            if bound is None or bound > cutoff:
+                break
+            if lower is not None and lower < bound:
+                self.rollup_minutes(lower, bound)
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            try:
+                cursor.execute(f"ALTER TABLE donnees_routieres DROP PARTITION {name}")
+            finally:
+                cursor.close()
+                conn.close()
+            dropped.append(name)
+            lower = bound
+        return dropped
+
+    def history_tier(self, start_date=None, end_date=None):
+        """Niveau de détail (raw ou minute) à utiliser pour une plage d'historique."""
+        if not start_date:
+            return RAW_TIER
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            raw_since = self._raw_since(cursor)
+        finally:
+            cursor.close()
+            conn.close()
+        return choose_tier(start_date, end_date, raw_since)
+
+    def _prepare_row(self, data):
+        """Convertit une lecture reçue en tuple prêt pour l'insertion."""
         # Extraire les données
         timestamp = data.get('timestamp', datetime.now().isoformat())
         # Convertir le timestamp ISO en datetime MySQL
         try:
             timestamp_dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-        except ValueError:
+        except (ValueError, AttributeError):
             timestamp_dt = datetime.now()
         
         # Valeurs par défaut
         accel_x = accel_y = accel_z = lat = lon = alt = satellites = None
-        road_condition = 'unknown'
         
         # Extraire les données de l'accéléromètre
         if data.get('accelerometer'):
             accel_x = data['accelerometer'].get('x')
             accel_y = data['accelerometer'].get('y')
             accel_z = data['accelerometer'].get('z')
-            
-            # Déterminer l'état de la route
-            if accel_y is not None:
-                y_accel = abs(accel_y)
-                if y_accel > 15000:
-                    road_condition = 'bad'
-                elif y_accel > 10000:
-                    road_condition = 'fair'
-                else:
-                    road_condition = 'good'
+        
+        # Déterminer l'état de la route (règles partagées avec l'appareil)
+        road_condition = classify_reading(data) or 'unknown'
         
         # Extraire les données GPS
         if data.get('gps'):  # Vérifier si gps existe et n'est pas None
@@ -99,60 +564,634 @@ class Database:
             alt = data['gps'].get('altitude')
             satellites = data['gps'].get('satellites')
         
-        # Insérer les données dans la base de données
-        query = '''
-        INSERT INTO donnees_routieres 
-        (timestamp, accelerometer_x, accelerometer_y, accelerometer_z, 
-         latitude, longitude, altitude, satellites, road_condition)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        '''
-        cursor.execute(query, (
-            timestamp_dt, accel_x, accel_y, accel_z, 
-            lat, lon, alt, satellites, road_condition
-        ))
+        return (
+            timestamp_dt, accel_x, accel_y, accel_z,
+            lat, lon, alt, satellites, road_condition,
+            str(data.get('device') or DEFAULT_DEVICE)[:64]
+        )
+
+    def save_sensor_data(self, data):
+        """Enregistre les données des capteurs dans la base de données."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
         
-        conn.commit()
-        last_id = cursor.lastrowid
-        cursor.close()
-        conn.close()
+        try:
+            row = self._prepare_row(data)
+            # Insérer les données dans la base de données
+            cursor.execute(INSERT_QUERY, row)
+            last_id = cursor.lastrowid
+            # Mettre à jour les statistiques agrégées dans la même transaction
+            self._update_rollup(cursor, [row])
+            self._update_minutes(cursor, [row])
+            self._update_grid(cursor, [row])
+            self._update_segment_stats(cursor, [row])
+        
+            conn.commit()
+            return last_id
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    def save_sensor_data_batch(self, items):
+        """
+        Enregistre un lot de lectures en une seule transaction.
         
-        return last_id
+        executemany() est réécrit par mysql.connector en un INSERT multi-lignes,
+        ce qui évite un aller-retour et un commit par lecture.
+        
+        Args:
+            items (list): Liste de dictionnaires au même format que pour save_sensor_data
+            
+        Returns:
+            int: Nombre de lignes insérées
+        """
+        if not items:
+            return 0
+        
+        rows = [self._prepare_row(data) for data in items]
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.executemany(INSERT_QUERY, rows)
+            self._update_rollup(cursor, rows)
+            self._update_minutes(cursor, rows)
+            self._update_grid(cursor, rows)
+            self._update_segment_stats(cursor, rows)
+            conn.commit()
+            return len(rows)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
 
-    def get_history(self, limit=1000, start_date=None, end_date=None, condition=None):
-        """Récupère l'historique des données des capteurs."""
+    def _update_rollup(self, cursor, rows):
+        """
+        Incrémente les compteurs horaires de statistiques_horaires.
+        
+        Les lignes sont d'abord regroupées par (heure, état) pour n'envoyer
+        qu'un upsert par groupe, même pour un gros lot.
+        """
+        groups = {}
+        for row in rows:
+            timestamp_dt, road_condition = row[0].replace(tzinfo=None), row[8]
+            key = (timestamp_dt.replace(minute=0, second=0, microsecond=0), road_condition)
+            count, first_ts, last_ts = groups.get(key, (0, timestamp_dt, timestamp_dt))
+            groups[key] = (count + 1, min(first_ts, timestamp_dt), max(last_ts, timestamp_dt))
+        
+        cursor.executemany(ROLLUP_UPSERT_QUERY, [
+            (bucket, road_condition, count, first_ts, last_ts)
+            for (bucket, road_condition), (count, first_ts, last_ts) in groups.items()
+        ])
+
+    def _update_minutes(self, cursor, rows):
+        """
+        Recalcule dans donnees_minute les minutes touchées par les lectures insérées.
+        
+        Les moyennes ne s'incrémentent pas comme des compteurs: chaque minute
+        est résumée à nouveau depuis la table brute (ROLLUP_MINUTES_QUERY),
+        une requête par suite de minutes consécutives.
+        """
+        minutes = sorted({row[0].replace(tzinfo=None, second=0, microsecond=0) for row in rows})
+        ranges = []
+        for minute in minutes:
+            if ranges and ranges[-1][1] == minute:
+                ranges[-1][1] = minute + timedelta(minutes=1)
+            else:
+                ranges.append([minute, minute + timedelta(minutes=1)])
+        for start, end in ranges:
+            cursor.execute(ROLLUP_MINUTES_QUERY, (start, end))
+
+    def _update_grid(self, cursor, rows):
+        """Incrémente les compteurs de grille_routiere pour les lectures géolocalisées."""
+        groups = {}
+        for row in rows:
+            lat, lon, road_condition = row[4], row[5], row[8]
+            if lat is None or lon is None:
+                continue
+            key = cell_for(lat, lon) + (road_condition,)
+            groups[key] = groups.get(key, 0) + 1
+        
+        if groups:
+            cursor.executemany(GRID_UPSERT_QUERY, [key + (count,) for key, count in groups.items()])
+
+    def _segment_stats_groups(self, rows):
+        """Regroupe des lignes (format _prepare_row) par tronçon le plus proche."""
+        groups = {}
+        for row in rows:
+            timestamp_dt, accel_y, lat, lon, road_condition = row[0], row[2], row[4], row[5], row[8]
+            if lat is None or lon is None:
+                continue
+            segment_id = self.segment_index.nearest(lat, lon)
+            if segment_id is None:
+                continue
+            
+            # Rugosité: amplitude de l'accélération verticale en unité brute
+            roughness = abs(to_raw(accel_y)) if accel_y is not None else 0.0
+            stats = groups.setdefault(segment_id, {
+                'count': 0, 'sum': 0.0, 'sum_sq': 0.0,
+                'good': 0, 'fair': 0, 'bad': 0, 'last_ts': None
+            })
+            stats['count'] += 1
+            stats['sum'] += roughness
+            stats['sum_sq'] += roughness * roughness
+            if road_condition in ('good', 'fair', 'bad'):
+                stats[road_condition] += 1
+            if timestamp_dt is not None:
+                timestamp_dt = timestamp_dt.replace(tzinfo=None)
+                if stats['last_ts'] is None or timestamp_dt > stats['last_ts']:
+                    stats['last_ts'] = timestamp_dt
+        return groups
+
+    def _write_segment_stats(self, cursor, groups):
+        cursor.executemany(SEGMENT_STATS_UPSERT_QUERY, [
+            (segment_id, stats['count'], stats['sum'], stats['sum_sq'],
+             stats['good'], stats['fair'], stats['bad'], stats['last_ts'])
+            for segment_id, stats in groups.items()
+        ])
+
+    def _update_segment_stats(self, cursor, rows):
+        """Rattache les lectures à leur tronçon et met à jour ses statistiques."""
+        if not len(self.segment_index):
+            return
+        groups = self._segment_stats_groups(rows)
+        if groups:
+            self._write_segment_stats(cursor, groups)
+
+    def load_segments(self):
+        """Charge les tronçons depuis la base."""
         conn = self.get_connection()
-        cursor = conn.cursor(dictionary=True)  # Pour obtenir les résultats sous forme de dictionnaires
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT id, nom, lat_debut, lon_debut, lat_fin, lon_fin FROM troncons")
+            return [
+                {'id': row[0], 'name': row[1], 'start': (row[2], row[3]), 'end': (row[4], row[5])}
+                for row in cursor.fetchall()
+            ]
+        finally:
+            cursor.close()
+            conn.close()
+
+    def reload_segments(self):
+        """Recharge l'index des tronçons après un import."""
+        self.segment_index = SegmentIndex(self.load_segments())
+
+    def save_segments(self, segments, source):
+        """
+        Remplace les tronçons d'une source (simulator, osm, ...) par `segments`.
+        
+        Les statistiques des tronçons remplacés sont supprimées; lancer
+        rebuild_segment_stats() pour les recalculer. Seul l'index de ce
+        processus est rechargé: redémarrer les autres workers du serveur.
+        
+        Returns:
+            int: Nombre de tronçons enregistrés
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+            DELETE troncons_stats FROM troncons_stats
+            JOIN troncons ON troncons.id = troncons_stats.troncon_id
+            WHERE troncons.source = %s
+            """, (source,))
+            cursor.execute("DELETE FROM troncons WHERE source = %s", (source,))
+            cursor.executemany("""
+            INSERT INTO troncons (nom, source, lat_debut, lon_debut, lat_fin, lon_fin)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            """, [
+                (segment['name'], source, segment['start'][0], segment['start'][1],
+                 segment['end'][0], segment['end'][1])
+                for segment in segments
+            ])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+        
+        self.reload_segments()
+        return len(segments)
+
+    def rebuild_segment_stats(self, chunk_size=10000):
+        """
+        Recalcule troncons_stats en rattachant toutes les lectures existantes.
+        
+        Returns:
+            int: Nombre de tronçons ayant au moins une lecture
+        """
+        totals = {}
+        batch = []
+        for row in self.iter_history_rows(chunk_size=chunk_size):
+            # Sans l'id, la ligne est au format de _prepare_row
+            batch.append(row[1:])
+            if len(batch) >= chunk_size:
+                self._merge_segment_groups(totals, self._segment_stats_groups(batch))
+                batch = []
+        self._merge_segment_groups(totals, self._segment_stats_groups(batch))
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("DELETE FROM troncons_stats")
+            if totals:
+                self._write_segment_stats(cursor, totals)
+            conn.commit()
+            return len(totals)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _merge_segment_groups(self, totals, groups):
+        for segment_id, stats in groups.items():
+            total = totals.get(segment_id)
+            if total is None:
+                totals[segment_id] = stats
+                continue
+            for key in ('count', 'sum', 'sum_sq', 'good', 'fair', 'bad'):
+                total[key] += stats[key]
+            if stats['last_ts'] and (total['last_ts'] is None or stats['last_ts'] > total['last_ts']):
+                total['last_ts'] = stats['last_ts']
+
+    def get_segments(self, south=None, west=None, north=None, east=None):
+        """
+        Retourne les tronçons et leurs statistiques de rugosité.
+        
+        Avec une emprise, seuls les tronçons dont une extrémité est visible
+        sont retournés.
+        """
+        query = """
+        SELECT t.id, t.nom, t.lat_debut, t.lon_debut, t.lat_fin, t.lon_fin,
+               s.count, s.sum_roughness, s.sum_roughness_sq, s.good, s.fair, s.bad, s.last_ts
+        FROM troncons t
+        LEFT JOIN troncons_stats s ON s.troncon_id = t.id
+        WHERE 1=1
+        """
+        params = []
+        if None not in (south, west, north, east):
+            query += """
+            AND ((t.lat_debut BETWEEN %s AND %s AND t.lon_debut BETWEEN %s AND %s)
+              OR (t.lat_fin BETWEEN %s AND %s AND t.lon_fin BETWEEN %s AND %s))
+            """
+            params += [south, north, west, east] * 2
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(query, params)
+            result = []
+            for (segment_id, name, lat1, lon1, lat2, lon2,
+                 count, total, total_sq, good, fair, bad, last_ts) in cursor.fetchall():
+                count = count or 0
+                mean = total / count if count else None
+                std = (max(0.0, total_sq / count - mean * mean) ** 0.5) if count else None
+                counts = {'good': good or 0, 'fair': fair or 0, 'bad': bad or 0}
+                result.append({
+                    'id': segment_id,
+                    'name': name,
+                    'start': [lat1, lon1],
+                    'end': [lat2, lon2],
+                    'count': count,
+                    'roughness_mean': mean,
+                    'roughness_std': std,
+                    'counts': counts,
+                    'condition': max(counts, key=counts.get) if count else None,
+                    'last_record': last_ts.isoformat() if last_ts else None
+                })
+            return result
+        finally:
+            cursor.close()
+            conn.close()
+
+    def rebuild_road_grid(self):
+        """
+        Reconstruit grille_routiere à partir de donnees_routieres.
+        
+        Returns:
+            int: Nombre de cellules créées
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("DELETE FROM grille_routiere")
+            cursor.execute("""
+            INSERT INTO grille_routiere (cell_y, cell_x, road_condition, count)
+            SELECT FLOOR(latitude / %s), FLOOR(longitude / %s),
+                   COALESCE(road_condition, 'unknown'), COUNT(*)
+            FROM donnees_routieres
+            WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+            GROUP BY 1, 2, 3
+            """, (GRID_CELL_SIZE, GRID_CELL_SIZE))
+            created = cursor.rowcount
+            conn.commit()
+            return created
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    def get_road_grid(self, zoom, south=None, west=None, north=None, east=None):
+        """
+        Retourne les cellules de la grille des états de route pour un zoom donné.
+        
+        Les cellules de base sont regroupées par blocs de factor_for_zoom(zoom)
+        et seules celles de l'emprise demandée sont lues (parcours de la clé
+        primaire sur cell_y).
+        """
+        factor = factor_for_zoom(zoom)
+        
+        query = """
+        SELECT FLOOR(cell_y / %s) AS gy, FLOOR(cell_x / %s) AS gx, road_condition, SUM(count)
+        FROM grille_routiere
+        WHERE 1=1
+        """
+        params = [factor, factor]
+        if None not in (south, west, north, east):
+            min_y, min_x, max_y, max_x = bbox_to_cells(south, west, north, east, factor)
+            query += " AND cell_y BETWEEN %s AND %s AND cell_x BETWEEN %s AND %s"
+            params += [min_y, max_y, min_x, max_x]
+        query += " GROUP BY gy, gx, road_condition"
         
-        query = "SELECT * FROM donnees_routieres WHERE 1=1"
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(query, params)
+            return {
+                'zoom': zoom,
+                'cell_size': GRID_CELL_SIZE * factor,
+                'cells': build_cells(cursor.fetchall(), factor)
+            }
+        finally:
+            cursor.close()
+            conn.close()
+
+    def rebuild_statistics(self):
+        """
+        Reconstruit statistiques_horaires à partir de donnees_routieres, et
+        de donnees_minute pour les lectures brutes déjà supprimées par
+        apply_retention.
+        
+        À lancer après un import direct en base (insert_data.py) ou pour
+        initialiser l'agrégat sur des données existantes.
+        
+        Returns:
+            int: Nombre de lignes d'agrégat créées
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("DELETE FROM statistiques_horaires")
+            cursor.execute("""
+            INSERT INTO statistiques_horaires (bucket, road_condition, count, first_ts, last_ts)
+            SELECT DATE_FORMAT(timestamp, '%Y-%m-%d %H:00:00'),
+                   COALESCE(road_condition, 'unknown'),
+                   COUNT(*), MIN(timestamp), MAX(timestamp)
+            FROM donnees_routieres
+            GROUP BY 1, 2
+            """)
+            created = cursor.rowcount
+            
+            # Minutes plus anciennes que les lectures brutes conservées
+            raw_since = self._raw_since(cursor) or datetime.max.replace(microsecond=0)
+            cursor.execute("""
+            INSERT INTO statistiques_horaires (bucket, road_condition, count, first_ts, last_ts)
+            SELECT DATE_FORMAT(bucket, '%%Y-%%m-%%d %%H:00:00'), road_condition,
+                   SUM(n), MIN(bucket), MAX(bucket)
+            FROM (
+                SELECT bucket, 'good' AS road_condition, good AS n FROM donnees_minute WHERE bucket < %s
+                UNION ALL SELECT bucket, 'fair', fair FROM donnees_minute WHERE bucket < %s
+                UNION ALL SELECT bucket, 'bad', bad FROM donnees_minute WHERE bucket < %s
+                UNION ALL SELECT bucket, 'unknown', count - good - fair - bad FROM donnees_minute WHERE bucket < %s
+            ) AS minutes
+            WHERE n > 0
+            GROUP BY 1, 2
+            ON DUPLICATE KEY UPDATE
+                count = count + VALUES(count),
+                first_ts = LEAST(first_ts, VALUES(first_ts)),
+                last_ts = GREATEST(last_ts, VALUES(last_ts))
+            """, (raw_since,) * 4)
+            created += cursor.rowcount
+            conn.commit()
+            return created
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _history_filters(self, start_date=None, end_date=None, condition=None, time_column="timestamp",
+                         after=None, key_column="id"):
+        """
+        Construit les conditions WHERE communes aux requêtes d'historique.
+        
+        after (timestamp, clé) limite aux lignes strictement plus anciennes
+        dans l'ordre (time_column DESC, key_column DESC): la plage sur
+        time_column permet une recherche dans l'index.
+        """
+        clause = ""
         params = []
         
+        if after is not None:
+            clause += f" AND {time_column} <= %s AND ({time_column} < %s OR {key_column} < %s)"
+            params.extend([after[0], after[0], after[1]])
+        
         if start_date:
-            query += " AND timestamp >= %s"
+            clause += f" AND {time_column} >= %s"
             params.append(start_date)
         
         if end_date:
-            query += " AND timestamp <= %s"
+            clause += f" AND {time_column} <= %s"
             params.append(end_date)
         
         if condition:
-            query += " AND road_condition = %s"
+            clause += " AND road_condition = %s"
             params.append(condition)
         
-        query += " ORDER BY timestamp DESC LIMIT %s"
+        return clause, params
+
+    def build_history_query(self, limit=1000, start_date=None, end_date=None, condition=None, columns="*",
+                            after=None):
+        """
+        Construit la requête de /api/history (réutilisée par explain_queries.py).
+        
+        Un limit à None retourne toutes les lignes correspondantes.
+        """
+        clause, params = self._history_filters(start_date, end_date, condition, after=after)
+        query = f"SELECT {columns} FROM donnees_routieres WHERE 1=1" + clause
+        query += " ORDER BY timestamp DESC, id DESC"
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit)
+        return query, params
+
+    def build_road_history_query(self, limit=1000, start_date=None, end_date=None, condition=None, tier=RAW_TIER,
+                                 after=None):
+        """Construit la requête de /api/road-history (réutilisée par explain_queries.py)."""
+        if tier == MINUTE_TIER:
+            clause, params = self._history_filters(start_date, end_date, condition, time_column="bucket",
+                                                   after=after, key_column="device")
+            query = """
+            SELECT bucket AS timestamp, device, latitude, longitude, road_condition 
+            FROM donnees_minute 
+            WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+            """ + clause
+            query += " ORDER BY bucket DESC, device DESC LIMIT %s"
+        else:
+            clause, params = self._history_filters(start_date, end_date, condition, after=after)
+            query = """
+            SELECT id, timestamp, latitude, longitude, road_condition 
+            FROM donnees_routieres 
+            WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+            """ + clause
+            query += " ORDER BY timestamp DESC, id DESC LIMIT %s"
         params.append(limit)
+        return query, params
+
+    def build_minute_history_query(self, limit=1000, start_date=None, end_date=None, condition=None, after=None,
+                                   columns="*"):
+        """
+        Construit la requête de /api/history sur donnees_minute.
         
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
+        Le filtre condition porte sur l'état dominant de chaque minute.
+        """
+        clause, params = self._history_filters(start_date, end_date, condition, time_column="bucket",
+                                               after=after, key_column="device")
+        query = f"SELECT {columns} FROM donnees_minute WHERE 1=1" + clause
+        query += " ORDER BY bucket DESC, device DESC"
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit)
+        return query, params
+
+    def iter_history_rows(self, start_date=None, end_date=None, condition=None, limit=None, chunk_size=1000):
+        """
+        Parcourt l'historique par blocs avec un curseur côté serveur.
         
-        # Convertir les résultats en liste de dictionnaires
-        result = []
-        for row in rows:
-            # Convertir datetime en string ISO
-            row['timestamp'] = row['timestamp'].isoformat() if row['timestamp'] else None
-            
-            result.append({
-                'id': row['id'],
-                'timestamp': row['timestamp'],
+        Les lignes sont lues au fil de l'eau (curseur non bufferisé + fetchmany)
+        au lieu d'être chargées en mémoire, ce qui permet d'exporter des mois de
+        données en mémoire constante. La connexion reste empruntée au pool tant
+        que le générateur n'est pas épuisé ou fermé.
+        
+        Yields:
+            tuple: (id, timestamp, accelerometer_x, accelerometer_y, accelerometer_z,
+                    latitude, longitude, altitude, satellites, road_condition)
+        """
+        query, params = self.build_history_query(limit, start_date, end_date, condition, columns=HISTORY_COLUMNS)
+        for rows in self._iter_chunks(query, params, chunk_size):
+            yield from rows
+
+    def _iter_chunks(self, query, params, chunk_size):
+        """
+        Exécute une requête avec un curseur côté serveur et retourne les lignes par blocs.
+        
+        La connexion reste empruntée au pool tant que le générateur n'est
+        pas épuisé ou fermé.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor(buffered=False)
+        exhausted = False
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    exhausted = True
+                    break
+                yield rows
+        finally:
+            if exhausted:
+                cursor.close()
+                conn.close()
+            else:
+                # Téléchargement interrompu: le résultat non lu rendrait la
+                # connexion inutilisable, on la ferme au lieu de la rendre au pool
+                conn.discard()
+
+    def build_timeseries_query(self, start_date, end_date, device=None, tier=RAW_TIER):
+        """
+        Construit la requête de /api/timeseries (réutilisée par explain_queries.py).
+        
+        Colonnes: secondes écoulées depuis start_date (calculées par MySQL,
+        pour éviter de convertir un datetime Python par ligne) puis
+        downsample.TIMESERIES_FIELDS, dans l'ordre chronologique.
+        """
+        time_column = "bucket" if tier == MINUTE_TIER else "timestamp"
+        table = "donnees_minute" if tier == MINUTE_TIER else "donnees_routieres"
+        query = f"""
+        SELECT TIMESTAMPDIFF(SECOND, %s, {time_column}) AS seconds,
+               accelerometer_x, accelerometer_y, accelerometer_z
+        FROM {table}
+        WHERE {time_column} >= %s AND {time_column} <= %s
+        """
+        params = [start_date, start_date, end_date]
+        if device:
+            query += " AND device = %s"
+            params.append(device)
+        query += f" ORDER BY {time_column}"
+        return query, params
+
+    def iter_timeseries_rows(self, start_date, end_date, device=None, tier=RAW_TIER, chunk_size=10000):
+        """
+        Parcourt les lectures de l'accéléromètre d'une plage par blocs de chunk_size lignes.
+        
+        Yields:
+            list: Lignes (secondes depuis start_date, accelerometer_x, accelerometer_y, accelerometer_z)
+        """
+        query, params = self.build_timeseries_query(start_date, end_date, device, tier)
+        return self._iter_chunks(query, params, chunk_size)
+
+    def get_history(self, limit=1000, start_date=None, end_date=None, condition=None, tier=None, after=None):
+        """
+        Récupère l'historique des données des capteurs, du plus récent au plus ancien.
+        
+        Sans tier, le niveau de détail est choisi d'après la plage demandée
+        (history_tier). Au niveau minute, chaque élément résume les lectures
+        d'une minute d'un appareil (moyennes, 'count', état dominant) et n'a
+        pas d'id. after (voir pagination.parse_cursor) reprend après la
+        dernière ligne d'une page précédente.
+        """
+        if tier is None:
+            tier = self.history_tier(start_date, end_date)
+        if tier == MINUTE_TIER:
+            return self._get_minute_history(limit, start_date, end_date, condition, after)
+        
+        conn = self.get_connection()
+        cursor = conn.cursor(dictionary=True)  # Pour obtenir les résultats sous forme de dictionnaires
+        
+        try:
+            query, params = self.build_history_query(limit, start_date, end_date, condition, after=after)
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+        
+            return [history_item(row) for row in rows]
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _get_minute_history(self, limit, start_date, end_date, condition, after=None):
+        """Historique au niveau minute (donnees_minute), au format de get_history."""
+        conn = self.get_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        try:
+            query, params = self.build_minute_history_query(limit, start_date, end_date, condition, after)
+            cursor.execute(query, params)
+            return [{
+                'id': None,
+                'timestamp': row['bucket'].isoformat(),
                 'accelerometer': {
                     'x': row['accelerometer_x'],
                     'y': row['accelerometer_y'],
@@ -164,39 +1203,66 @@ class Database:
                     'altitude': row['altitude'],
                     'satellites': row['satellites']
                 },
-                'road_condition': row['road_condition']
-            })
-        
-        cursor.close()
-        conn.close()
-        return result
+                'road_condition': row['road_condition'],
+                'device': row['device'],
+                'count': row['count']
+            } for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+            conn.close()
 
-    def get_road_condition_history(self, limit=1000, start_date=None, end_date=None, condition=None):
-        """Récupère l'historique des états de route avec coordonnées GPS."""
-        conn = self.get_connection()
-        cursor = conn.cursor(dictionary=True)
+    def get_history_rows(self, limit=1000, start_date=None, end_date=None, condition=None, tier=None, after=None,
+                         road=False):
+        """
+        Lignes brutes (tuples) de /api/history ou, avec road, de /api/road-history.
         
-        query = """
-        SELECT timestamp, latitude, longitude, road_condition 
-        FROM donnees_routieres 
-        WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+        Mêmes requêtes et paramètres que get_history et
+        get_road_condition_history, sans conversion ligne par ligne: les
+        réponses en colonnes (columnar.py) sont construites directement à
+        partir des tuples du curseur. Au niveau minute, la colonne bucket est
+        renommée timestamp.
+        
+        Returns:
+            tuple: (noms des colonnes, liste de tuples, niveau de détail)
         """
-        params = []
+        if tier is None:
+            tier = self.history_tier(start_date, end_date)
+        if road:
+            query, params = self.build_road_history_query(limit, start_date, end_date, condition, tier, after)
+        elif tier == MINUTE_TIER:
+            query, params = self.build_minute_history_query(limit, start_date, end_date, condition, after,
+                                                            columns=MINUTE_HISTORY_COLUMNS)
+        else:
+            query, params = self.build_history_query(limit, start_date, end_date, condition, after=after,
+                                                     columns=HISTORY_COLUMNS + ", device")
         
-        if start_date:
-            query += " AND timestamp >= %s"
-            params.append(start_date)
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            names = [column[0] for column in cursor.description]
+            return names, rows, tier
+        finally:
+            cursor.close()
+            conn.close()
+
+    def get_road_condition_history(self, limit=1000, start_date=None, end_date=None, condition=None, tier=None,
+                                   after=None):
+        """
+        Récupère l'historique des états de route avec coordonnées GPS.
         
-        if end_date:
-            query += " AND timestamp <= %s"
-            params.append(end_date)
+        Au niveau minute, un point par minute et par appareil (position
+        moyenne, état dominant). Les points portent leur clé de pagination
+        (id, ou device au niveau minute).
+        """
+        if tier is None:
+            tier = self.history_tier(start_date, end_date)
         
-        if condition:
-            query += " AND road_condition = %s"
-            params.append(condition)
+        conn = self.get_connection()
+        cursor = conn.cursor(dictionary=True)
         
-        query += " ORDER BY timestamp DESC LIMIT %s"
-        params.append(limit)
+        query, params = self.build_road_history_query(limit, start_date, end_date, condition, tier, after)
         
         try:
             cursor.execute(query, params)
@@ -213,12 +1279,18 @@ class Database:
                 lng = row['longitude']
                 
                 if lat is not None and lng is not None:
-                    result.append({
+                    point = {
                         'timestamp': row['timestamp'],
                         'latitude': float(lat),
                         'longitude': float(lng),
                         'condition': row['road_condition']
-                    })
+                    }
+                    # Clé de pagination (pagination.encode_cursor)
+                    if 'id' in row:
+                        point['id'] = row['id']
+                    if 'device' in row:
+                        point['device'] = row['device']
+                    result.append(point)
             
             return result
         except Exception as e:
@@ -228,34 +1300,58 @@ class Database:
             cursor.close()
             conn.close()
 
-    def get_statistics(self):
-        """Récupère des statistiques sur les données enregistrées."""
+    def _floor_to_hour(self, value):
+        """Arrondit une date ISO à l'heure inférieure (laissée telle quelle si illisible)."""
+        try:
+            return datetime.fromisoformat(value).replace(minute=0, second=0, microsecond=0)
+        except (TypeError, ValueError):
+            return value
+
+    def get_statistics(self, start_date=None, end_date=None):
+        """
+        Récupère des statistiques sur les données enregistrées.
+        
+        Les statistiques sont lues dans l'agrégat horaire statistiques_horaires
+        plutôt que dans la table brute. Les bornes start_date/end_date sont donc
+        arrondies à l'heure: une heure est comptée si elle chevauche la plage.
+        """
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        stats = {}
-        
-        # Nombre total d'enregistrements
-        cursor.execute("SELECT COUNT(*) FROM donnees_routieres")
-        stats['total_records'] = cursor.fetchone()[0]
-        
-        # Répartition des états de route
-        cursor.execute("""
-        SELECT road_condition, COUNT(*) as count 
-        FROM donnees_routieres 
-        GROUP BY road_condition
-        """)
-        road_conditions = {}
-        for row in cursor.fetchall():
-            road_conditions[row[0]] = row[1]
-        stats['road_conditions'] = road_conditions
-        
-        # Premier et dernier enregistrement
-        cursor.execute("SELECT MIN(timestamp), MAX(timestamp) FROM donnees_routieres")
-        first_last = cursor.fetchone()
-        stats['first_record'] = first_last[0].isoformat() if first_last[0] else None
-        stats['last_record'] = first_last[1].isoformat() if first_last[1] else None
-        
-        cursor.close()
-        conn.close()
-        return stats
\ No newline at end of file
+        try:
+            query = """
+            SELECT road_condition, SUM(count), MIN(first_ts), MAX(last_ts)
+            FROM statistiques_horaires
+            WHERE 1=1
+            """
+            params = []
+            if start_date:
+                query += " AND bucket >= %s"
+                params.append(self._floor_to_hour(start_date))
+            if end_date:
+                query += " AND bucket <= %s"
+                params.append(end_date)
+            query += " GROUP BY road_condition"
+            cursor.execute(query, params)
+            
+            stats = {}
+            road_conditions = {}
+            first_record = last_record = None
+            for road_condition, count, first_ts, last_ts in cursor.fetchall():
+                # Répartition des états de route
+                road_conditions[road_condition] = int(count)
+                # Premier et dernier enregistrement
+                if first_ts and (first_record is None or first_ts < first_record):
+                    first_record = first_ts
+                if last_ts and (last_record is None or last_ts > last_record):
+                    last_record = last_ts
+            
+            # Nombre total d'enregistrements
+            stats['total_records'] = sum(road_conditions.values())
+            stats['road_conditions'] = road_conditions
+            stats['first_record'] = first_record.isoformat() if first_record else None
+            stats['last_record'] = last_record.isoformat() if last_record else None
+            return stats
+        finally:
+            cursor.close()
+            conn.close()
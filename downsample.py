@@ -0,0 +1,180 @@
+"""
+Sous-échantillonnage des séries de l'accéléromètre pour les graphiques (/api/timeseries).
+
+Les lignes sont lues par blocs (Database.iter_timeseries_rows) et réduites
+au fil de l'eau, en NumPy, à un minimum et un maximum par intervalle de
+temps (MinMaxAccumulator): la mémoire et le coût de la réponse dépendent du
+nombre de points demandés, pas de la durée de la plage.
+
+Méthodes:
+- minmax: le minimum et le maximum de chaque intervalle (points // 2
+  intervalles), ce qui conserve tous les pics
+- lttb: Largest-Triangle-Three-Buckets sur les extrema de
+  LTTB_PRESELECTION fois plus d'intervalles (MinMaxLTTB): même allure que
+  LTTB sur la série complète, sans la charger en mémoire
+"""
+import numpy as np
+
+LTTB = 'lttb'
+MINMAX = 'minmax'
+METHODS = (LTTB, MINMAX)
+
+# Champs tracés, dans l'ordre des colonnes de Database.build_timeseries_query
+TIMESERIES_FIELDS = ('accelerometer_x', 'accelerometer_y', 'accelerometer_z')
+
+# Candidats par point retenu avant LTTB (extrema de points * ratio / 2 intervalles)
+LTTB_PRESELECTION = 4
+
+# Nombre de points par défaut et maximal d'une série
+DEFAULT_POINTS = 500
+MAX_POINTS = 5000
+
+
+class MinMaxAccumulator:
+    """Minimum et maximum (valeur et instant) par intervalle, mis à jour bloc par bloc."""
+
+    def __init__(self, span, buckets, width):
+        """
+        Args:
+            span (float): Durée de la plage en secondes
+            buckets (int): Nombre d'intervalles de même durée
+            width (int): Nombre de champs
+        """
+        self.buckets = buckets
+        self.scale = buckets / max(span, 1.0)
+        self.rows = 0
+        self.min_value = np.full((buckets, width), np.inf)
+        self.min_time = np.full((buckets, width), np.nan)
+        self.max_value = np.full((buckets, width), -np.inf)
+        self.max_time = np.full((buckets, width), np.nan)
+
+    def add(self, times, values):
+        """
+        Args:
+            times (ndarray): Secondes depuis le début de la plage, croissantes
+            values (ndarray): Valeurs (lignes, champs), NaN si absentes
+        """
+        self.rows += len(times)
+        bucket = (times * self.scale).astype(np.int64)
+        np.clip(bucket, 0, self.buckets - 1, out=bucket)
+
+        for field in range(values.shape[1]):
+            value = values[:, field]
+            valid = ~np.isnan(value)
+            if not valid.any():
+                continue
+            b, v, t = bucket[valid], value[valid], times[valid]
+
+            # Tri par intervalle puis valeur: le premier de chaque groupe est le minimum, le dernier le maximum
+            order = np.lexsort((v, b))
+            b, v, t = b[order], v[order], t[order]
+            ends = np.flatnonzero(np.diff(b))
+            firsts = np.concatenate(([0], ends + 1))
+            lasts = np.concatenate((ends, [len(b) - 1]))
+            ids = b[firsts]
+
+            lower = v[firsts] < self.min_value[ids, field]
+            self.min_value[ids[lower], field] = v[firsts][lower]
+            self.min_time[ids[lower], field] = t[firsts][lower]
+
+            higher = v[lasts] > self.max_value[ids, field]
+            self.max_value[ids[higher], field] = v[lasts][higher]
+            self.max_time[ids[higher], field] = t[lasts][higher]
+
+    def extrema(self, field):
+        """
+        Returns:
+            tuple: (instants, valeurs) des extrema d'un champ, dans l'ordre chronologique
+        """
+        times = np.concatenate((self.min_time[:, field], self.max_time[:, field]))
+        values = np.concatenate((self.min_value[:, field], self.max_value[:, field]))
+        present = ~np.isnan(times)
+        times, values = times[present], values[present]
+        order = np.argsort(times, kind='stable')
+        times, values = times[order], values[order]
+        # Intervalle d'une seule lecture: le minimum et le maximum sont le même point
+        keep = np.ones(len(times), dtype=bool)
+        keep[1:] = (np.diff(times) != 0) | (np.diff(values) != 0)
+        return times[keep], values[keep]
+
+
+def lttb(times, values, threshold):
+    """
+    Largest-Triangle-Three-Buckets.
+
+    Garde le premier et le dernier point, puis dans chaque intervalle le point
+    qui forme le plus grand triangle avec le point retenu précédent et la
+    moyenne de l'intervalle suivant. Les moyennes sont vectorisées; seul le
+    choix d'un point par intervalle (dépendant du précédent) est une boucle.
+
+    Returns:
+        ndarray: Indices des points retenus
+    """
+    count = len(times)
+    if threshold >= count or threshold < 3:
+        return np.arange(count)
+
+    # Bornes des threshold - 2 intervalles intérieurs (points 1 à count - 2)
+    edges = (np.arange(threshold - 1) * (count - 2) / (threshold - 2)).astype(np.int64) + 1
+    sizes = np.diff(edges)
+    average_time = np.append(np.add.reduceat(times[1:-1], edges[:-1] - 1) / sizes, times[-1])
+    average_value = np.append(np.add.reduceat(values[1:-1], edges[:-1] - 1) / sizes, values[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = count - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        time, value = times[previous], values[previous]
+        area = np.abs((time - average_time[i + 1]) * (values[start:end] - value)
+                      - (time - times[start:end]) * (average_value[i + 1] - value))
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+def rows_to_arrays(rows):
+    """
+    Convertit un bloc de lignes (secondes, champs...) en tableaux NumPy.
+
+    Returns:
+        tuple: (secondes depuis le début de la plage, valeurs (lignes, champs) avec NaN pour NULL)
+    """
+    array = np.array(rows, dtype=np.float64)
+    return array[:, 0], array[:, 1:]
+
+
+def downsample(chunks, start, end, points=DEFAULT_POINTS, method=LTTB, fields=TIMESERIES_FIELDS):
+    """
+    Réduit une série lue par blocs à environ `points` points par champ.
+
+    Args:
+        chunks: Itérable de listes de lignes (secondes depuis start, champs...), dans l'ordre chronologique
+        start, end (datetime): Plage demandée
+
+    Returns:
+        dict: {"rows": lignes lues, "series": {champ: {"timestamp": [...], "value": [...]}}}
+    """
+    if method == MINMAX:
+        buckets = max(points // 2, 1)
+    else:
+        buckets = max(points * LTTB_PRESELECTION // 2, 1)
+    accumulator = MinMaxAccumulator((end - start).total_seconds(), buckets, len(fields))
+    for rows in chunks:
+        if rows:
+            accumulator.add(*rows_to_arrays(rows))
+
+    origin = np.datetime64(start, 's')
+    series = {}
+    for field, name in enumerate(fields):
+        times, values = accumulator.extrema(field)
+        if method == LTTB:
+            keep = lttb(times, values, points)
+            times, values = times[keep], values[keep]
+        timestamps = origin + np.round(times).astype('timedelta64[s]')
+        series[name] = {
+            'timestamp': np.datetime_as_string(timestamps, unit='s').tolist(),
+            'value': values.tolist()
+        }
+    return {'rows': accumulator.rows, 'series': series}
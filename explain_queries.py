@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Affiche le plan d'exécution (EXPLAIN) des requêtes servies par les endpoints
+d'historique, afin de repérer les régressions d'index.
+
+Les requêtes sont construites par Database.build_*_query, exactement comme
+dans les endpoints. Le script se termine avec le code 1 si une requête fait
+un parcours complet de table (type ALL) ou un tri sur fichier (filesort).
+
+Usage:
+    python3 explain_queries.py
+    python3 explain_queries.py --start-date 2025-02-01 --end-date 2025-02-08
+"""
+import argparse
+import sys
+from datetime import datetime
+from database import Database
+
+# Configuration MySQL
+DB_CONFIG = {
+    'host': 'localhost',
+    'user': 'admin',
+    'password': 'admin',
+    'database': 'road_monitor'
+}
+
+
+def endpoint_queries(db, start_date, end_date, condition, limit):
+    """Retourne les requêtes (nom, sql, paramètres) de chaque endpoint et variante de filtre."""
+    variants = [
+        ("sans filtre", {}),
+        ("plage de dates", {'start_date': start_date, 'end_date': end_date}),
+        ("état", {'condition': condition}),
+        ("plage de dates + état", {'start_date': start_date, 'end_date': end_date, 'condition': condition}),
+    ]
+    queries = []
+    for label, filters in variants:
+        queries.append((f"/api/history ({label})",) + db.build_history_query(limit, **filters))
+        queries.append((f"/api/road-history ({label})",) + db.build_road_history_query(limit, **filters))
+        queries.append((f"/api/history minute ({label})",) + db.build_minute_history_query(limit, **filters))
+        queries.append((f"/api/road-history minute ({label})",)
+                       + db.build_road_history_query(limit, tier='minute', **filters))
+    
+    # Page suivante (curseur after): recherche dans l'index (timestamp, id)
+    after = (datetime.fromisoformat(end_date), 2 ** 31 - 1)
+    queries.append(("/api/history (page suivante)",) + db.build_history_query(limit, after=after))
+    queries.append(("/api/history (page suivante + état)",)
+                   + db.build_history_query(limit, condition=condition, after=after))
+    queries.append(("/api/road-history (page suivante)",) + db.build_road_history_query(limit, after=after))
+    
+    # Séries de l'accéléromètre (lues en entier sur la plage, sans LIMIT)
+    queries.append(("/api/timeseries",) + db.build_timeseries_query(start_date, end_date))
+    queries.append(("/api/timeseries minute",) + db.build_timeseries_query(start_date, end_date, tier='minute'))
+    return queries
+
+
+def explain(cursor, query, params):
+    """Exécute EXPLAIN et retourne les lignes du plan sous forme de dictionnaires."""
+    cursor.execute("EXPLAIN " + query, params)
+    columns = [col[0] for col in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def plan_problems(plan):
+    """Liste les signes de régression dans un plan (parcours complet, tri sur fichier)."""
+    problems = []
+    for row in plan:
+        if row.get('type') == 'ALL':
+            problems.append(f"parcours complet de {row.get('table')}")
+        if 'filesort' in (row.get('Extra') or ''):
+            problems.append("tri sur fichier (filesort)")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN des requêtes des endpoints d'historique")
+    parser.add_argument('--start-date', default='2025-02-01 00:00:00')
+    parser.add_argument('--end-date', default='2025-02-08 00:00:00')
+    parser.add_argument('--condition', default='bad')
+    parser.add_argument('--limit', type=int, default=1000)
+    args = parser.parse_args()
+
+    db = Database(**DB_CONFIG)
+    conn = db.get_connection()
+    cursor = conn.cursor()
+
+    failures = 0
+    try:
+        for name, query, params in endpoint_queries(db, args.start_date, args.end_date, args.condition, args.limit):
+            plan = explain(cursor, query, params)
+            print(f"=== {name}")
+            for row in plan:
+                print(f"  table={row.get('table')} type={row.get('type')} key={row.get('key')} "
+                      f"rows={row.get('rows')} extra={row.get('Extra')}")
+            problems = plan_problems(plan)
+            if problems:
+                failures += 1
+                print(f"  !! {', '.join(problems)}")
+    finally:
+        cursor.close()
+        conn.close()
+
+    if failures:
+        print(f"\n{failures} requête(s) sans index adapté")
+        sys.exit(1)
+    print("\nToutes les requêtes utilisent un index")
+
+
+if __name__ == '__main__':
+    main()
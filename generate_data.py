@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Générateur de données synthétiques en masse pour donnees_routieres.
+
+Les lectures sont construites par lots NumPy: positions tirées le long des
+tronçons des itinéraires (même modèle que simulator.parcourir_segment),
+bruit de l'accéléromètre, altitude, satellites et horodatages (12 s ± 3 s
+comme insert_data.py), puis écrites par transactions de --chunk lignes
+avec executemany (insertion multi-lignes) ou LOAD DATA LOCAL INFILE. Une
+erreur ne fait perdre que le lot en cours.
+
+Le travail est découpé en tâches (un véhicule sur une période de
+--period-days jours), réparties sur --workers processus. Chaque tâche a
+son propre générateur aléatoire dérivé de (--seed, véhicule, période): le
+jeu de données est identique quel que soit le nombre de processus.
+Les lectures d'un véhicule sont écrites sous l'appareil vehicle-<n>
+(colonne device), comme les lectures reçues de plusieurs Raspberry Pi.
+
+Les trajets suivent les itinéraires de routes.py ou, avec --network, les
+routes du réseau OSM importé par import_osm.py (insert_data2.py).
+
+Les agrégats (statistiques horaires, résumé à la minute, grille, tronçons)
+ne sont pas mis à jour ligne par ligne: utiliser --rebuild, ou lancer
+rebuild_statistics.py et maintain_storage.py --rollup-all.
+
+Usage:
+    python3 generate_data.py --start 2025-02-01 --end 2025-03-05 --vehicles 1
+    python3 generate_data.py --start 2023-01-01 --end 2025-01-01 --vehicles 20 --workers 8 --method load-data
+    python3 generate_data.py --start 2025-01-01 --end 2025-02-01 --dry-run
+    python3 generate_data.py --network osm_network --vehicles 50 --workers 8
+"""
+import argparse
+import csv
+import itertools
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from multiprocessing import Pool
+import numpy as np
+import mysql.connector
+from simulator import PLAGE_ALTITUDE, PLAGE_SATELLITES, distance_gps
+from road_network import RoadNetwork
+from routes import ROUTE_ALLER, ROUTE_RETOUR
+
+# Configuration MySQL
+DB_CONFIG = {
+    'host': 'localhost',
+    'user': 'admin',
+    'password': 'admin',
+    'database': 'road_monitor'
+}
+
+COLUMNS = (
+    "timestamp, accelerometer_x, accelerometer_y, accelerometer_z, "
+    "latitude, longitude, altitude, satellites, road_condition, device"
+)
+INSERT_QUERY = f"INSERT INTO donnees_routieres ({COLUMNS}) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+LOAD_DATA_QUERY = (
+    "LOAD DATA LOCAL INFILE %s INTO TABLE donnees_routieres "
+    "FIELDS TERMINATED BY ',' LINES TERMINATED BY '\\n' "
+    f"({COLUMNS})"
+)
+
+# Intervalle entre deux lectures: 12 s ± 3 s (insert_data.py)
+MEAN_INTERVAL = 12
+INTERVAL_JITTER = 3
+
+# États de route et valeurs moyennes brutes de l'accéléromètre (simulator.accelerometre_realiste)
+CONDITIONS = np.array(['good', 'fair', 'bad'])
+ACCEL_BASE = np.array([
+    [-1200, -13800, -7400],
+    [-2000, -14300, -7700],
+    [-3200, -15200, -8100]
+])
+ACCEL_NOISE = np.array([150, 200, 150])
+
+
+def build_trips(routes):
+    """
+    Découpe des itinéraires en pas d'environ 200 m, comme parcourir_segment.
+
+    Returns:
+        dict: Tableaux par pas de tous les trajets concaténés (extrémités du
+              tronçon, demi-largeur, état) et 'offsets': début de chaque trajet
+    """
+    steps = []
+    offsets = [0]
+    for route in routes:
+        for segment in route:
+            condition = int(np.flatnonzero(CONDITIONS == segment['etat'])[0])
+            half_width = segment['largeur'] / 2 * 0.009
+            points = segment['points']
+            for a, b in zip(points, points[1:]):
+                count = int(distance_gps(a, b) / 0.2)
+                steps.extend([(a[0], a[1], b[0], b[1], half_width, condition)] * count)
+        offsets.append(len(steps))
+    steps = np.array(steps, dtype=np.float64).reshape(-1, 6)
+    return {
+        'a_lat': steps[:, 0], 'a_lon': steps[:, 1],
+        'b_lat': steps[:, 2], 'b_lon': steps[:, 3],
+        'half_width': steps[:, 4], 'condition': steps[:, 5].astype(np.int64),
+        'offsets': np.array(offsets, dtype=np.int64)
+    }
+
+
+def trips_from_network(network, seed):
+    """
+    Un trajet par route du réseau OSM (road_network.py), comme insert_data2.py:
+    état selon le type de voie, largeur de 20 à 30 m, au moins un pas par tronçon.
+    """
+    rng = np.random.default_rng(np.random.SeedSequence([seed, len(network)]))
+    way_nodes = np.asarray(network.way_nodes)
+    way_offsets = np.asarray(network.way_offsets)
+    lat = np.asarray(network.lat, dtype=np.float64)
+    lon = np.asarray(network.lon, dtype=np.float64)
+
+    types = np.array(network.types + [''])[np.asarray(network.way_type)]
+    way_condition = np.where(rng.random(len(network)) > 0.5, 2, 1)
+    way_condition[np.isin(types, ['secondary', 'tertiary'])] = 1
+    way_condition[np.isin(types, ['primary', 'trunk'])] = 0
+
+    is_segment = np.ones(way_nodes.size, dtype=bool)
+    is_segment[way_offsets[1:] - 1] = False
+    segments = np.flatnonzero(is_segment)
+    way_of = np.searchsorted(way_offsets, segments, side='right') - 1
+    start, end = way_nodes[segments], way_nodes[segments + 1]
+    distance = np.sqrt((lat[end] - lat[start]) ** 2 + (lon[end] - lon[start]) ** 2) * 111
+    counts = np.maximum(1, (distance / 0.2).astype(np.int64))
+    half_width = (0.02 + 0.01 * rng.random(segments.size)) / 2 * 0.009
+
+    step = np.repeat(np.arange(segments.size), counts)
+    per_way = np.bincount(way_of, weights=counts, minlength=len(network)).astype(np.int64)
+    return {
+        'a_lat': lat[start][step], 'a_lon': lon[start][step],
+        'b_lat': lat[end][step], 'b_lon': lon[end][step],
+        'half_width': half_width[step], 'condition': way_condition[way_of][step],
+        'offsets': np.concatenate(([0], np.cumsum(per_way)))
+    }
+
+
+# Trajets simulés par défaut; remplacés par le réseau OSM avec --network
+TRIPS = build_trips([ROUTE_ALLER, ROUTE_RETOUR])
+
+
+def generate_rows(rng, start, end):
+    """
+    Génère les lectures d'un véhicule entre start et end.
+
+    Returns:
+        dict: Colonnes NumPy (timestamp, x, y, z, latitude, longitude,
+              altitude, satellites, condition)
+    """
+    # Horodatages: pas de 12 s ± 3 s sur [start, end), sans chevauchement entre périodes
+    duration = (end - start).total_seconds()
+    estimate = int(duration / (MEAN_INTERVAL - INTERVAL_JITTER)) + 1
+    offsets = np.cumsum(rng.integers(MEAN_INTERVAL - INTERVAL_JITTER, MEAN_INTERVAL + INTERVAL_JITTER + 1, estimate))
+    offsets = np.concatenate(([0], offsets))
+    offsets = offsets[offsets < duration]
+    n = offsets.size
+
+    # Enchaînement de trajets tirés au hasard (équiprobables) jusqu'à n pas
+    lengths = np.diff(TRIPS['offsets'])
+    valid = np.flatnonzero(lengths)
+    choices = valid[rng.integers(0, valid.size, n // lengths[valid].min() + 2)]
+    ends = np.cumsum(lengths[choices])
+    choices = choices[:np.searchsorted(ends, n) + 1]
+    sizes = lengths[choices]
+    first = np.repeat(TRIPS['offsets'][choices] - (np.cumsum(sizes) - sizes), sizes)
+    index = (np.arange(sizes.sum()) + first)[:n]
+
+    a_lat, a_lon = TRIPS['a_lat'][index], TRIPS['a_lon'][index]
+    b_lat, b_lon = TRIPS['b_lat'][index], TRIPS['b_lon'][index]
+    half_width, condition = TRIPS['half_width'][index], TRIPS['condition'][index]
+
+    # Position aléatoire sur le tronçon puis variation latérale
+    t = rng.random(n)
+    angle = np.radians(rng.uniform(-90, 90, n))
+    latitude = a_lat + t * (b_lat - a_lat) + half_width * np.sin(angle) * rng.uniform(-1, 1, n)
+    longitude = a_lon + t * (b_lon - a_lon) + half_width * np.cos(angle) * rng.uniform(-1, 1, n)
+
+    accel = ACCEL_BASE[condition] + rng.integers(-ACCEL_NOISE, ACCEL_NOISE + 1, (n, 3))
+
+    return {
+        'timestamp': np.datetime64(start, 's') + offsets.astype('timedelta64[s]'),
+        'x': accel[:, 0], 'y': accel[:, 1], 'z': accel[:, 2],
+        'latitude': np.round(latitude, 6),
+        'longitude': np.round(longitude, 6),
+        'altitude': np.round(rng.uniform(*PLAGE_ALTITUDE, n), 1),
+        'satellites': rng.integers(PLAGE_SATELLITES[0], PLAGE_SATELLITES[1] + 1, n),
+        'condition': condition
+    }
+
+
+def vehicle_device(vehicle):
+    """Identifiant d'appareil (colonne device) d'un véhicule simulé."""
+    return f"vehicle-{vehicle}"
+
+
+def to_rows(columns, start, stop, device):
+    """Convertit une tranche des colonnes en tuples pour le connecteur MySQL."""
+    return list(zip(
+        columns['timestamp'][start:stop].tolist(),
+        columns['x'][start:stop].tolist(),
+        columns['y'][start:stop].tolist(),
+        columns['z'][start:stop].tolist(),
+        columns['latitude'][start:stop].tolist(),
+        columns['longitude'][start:stop].tolist(),
+        columns['altitude'][start:stop].tolist(),
+        columns['satellites'][start:stop].tolist(),
+        CONDITIONS[columns['condition'][start:stop]].tolist(),
+        itertools.repeat(device)
+    ))
+
+
+def write_load_data(cursor, rows):
+    """Écrit un lot par LOAD DATA LOCAL INFILE via un fichier CSV temporaire."""
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', newline='', delete=False) as f:
+        csv.writer(f, lineterminator='\n').writerows(
+            (row[0].strftime('%Y-%m-%d %H:%M:%S'),) + row[1:] for row in rows
+        )
+        path = f.name
+    try:
+        cursor.execute(LOAD_DATA_QUERY, (path,))
+    finally:
+        os.unlink(path)
+
+
+# Connexion propre à chaque processus (ouverte par init_worker)
+worker_conn = None
+worker_options = None
+
+
+def init_worker(db_config, options):
+    global worker_conn, worker_options, TRIPS
+    worker_options = options
+    if options['network']:
+        # Chargement par mmap: quelques millisecondes par processus
+        TRIPS = trips_from_network(RoadNetwork.load(options['network']), options['seed'])
+    if not options['dry_run']:
+        worker_conn = mysql.connector.connect(
+            **db_config,
+            allow_local_infile=options['method'] == 'load-data'
+        )
+
+
+def run_task(task):
+    """
+    Génère et écrit les lectures d'une tâche (véhicule, période).
+
+    Returns:
+        tuple: (index de la tâche, lignes écrites, message d'erreur ou None)
+    """
+    task_index, vehicle, period, start, end = task
+    rng = np.random.default_rng(np.random.SeedSequence([worker_options['seed'], vehicle, period]))
+    columns = generate_rows(rng, start, end)
+    n = columns['timestamp'].size
+    if worker_options['dry_run']:
+        return task_index, n, None
+
+    chunk = worker_options['chunk']
+    device = vehicle_device(vehicle)
+    written = 0
+    cursor = worker_conn.cursor()
+    try:
+        for offset in range(0, n, chunk):
+            rows = to_rows(columns, offset, offset + chunk, device)
+            try:
+                if worker_options['method'] == 'load-data':
+                    write_load_data(cursor, rows)
+                else:
+                    cursor.executemany(INSERT_QUERY, rows)
+                worker_conn.commit()
+                written += len(rows)
+            except mysql.connector.Error as e:
+                worker_conn.rollback()
+                return task_index, written, f"lot {offset}-{offset + len(rows)}: {e}"
+    finally:
+        cursor.close()
+    return task_index, written, None
+
+
+def build_tasks(start, end, vehicles, period_days):
+    """Découpe [start, end) en tâches (véhicule, période) indépendantes."""
+    tasks = []
+    period_start = start
+    period = 0
+    while period_start < end:
+        period_end = min(period_start + timedelta(days=period_days), end)
+        for vehicle in range(vehicles):
+            tasks.append((len(tasks), vehicle, period, period_start, period_end))
+        period_start = period_end
+        period += 1
+    return tasks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Générateur de données synthétiques en masse")
+    parser.add_argument('--start', type=datetime.fromisoformat, default=datetime(2025, 2, 1, 7, 0, 0))
+    parser.add_argument('--end', type=datetime.fromisoformat, default=datetime(2025, 3, 5, 18, 0, 0))
+    parser.add_argument('--vehicles', type=int, default=1, help="Nombre de véhicules simulés")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Nombre de processus")
+    parser.add_argument('--chunk', type=int, default=10000, help="Lignes par transaction")
+    parser.add_argument('--period-days', type=int, default=7, help="Durée d'une tâche en jours")
+    parser.add_argument('--method', choices=('executemany', 'load-data'), default='executemany')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--network', help="Réseau OSM importé par import_osm.py (par défaut: itinéraires de routes.py)")
+    parser.add_argument('--dry-run', action='store_true', help="Générer sans écrire en base (mesure du débit)")
+    parser.add_argument('--rebuild', action='store_true', help="Reconstruire les agrégats à la fin")
+    args = parser.parse_args()
+
+    if not args.dry_run:
+        # Crée la table et ses index si nécessaire
+        from database import Database
+        Database(**DB_CONFIG).pool.close_all()
+
+    tasks = build_tasks(args.start, args.end, args.vehicles, args.period_days)
+    options = {'seed': args.seed, 'chunk': args.chunk, 'method': args.method,
+               'dry_run': args.dry_run, 'network': args.network}
+    print(f"{len(tasks)} tâches ({args.vehicles} véhicule(s), périodes de {args.period_days} j) "
+          f"sur {args.workers} processus")
+
+    started = time.perf_counter()
+    total = 0
+    failed = []
+    with Pool(args.workers, initializer=init_worker, initargs=(DB_CONFIG, options)) as pool:
+        for task_index, written, error in pool.imap_unordered(run_task, tasks):
+            total += written
+            if error:
+                failed.append(task_index)
+                print(f"Tâche {task_index} interrompue ({written} lignes écrites): {error}")
+    elapsed = time.perf_counter() - started
+
+    verb = "générés" if args.dry_run else "insérés"
+    print(f"Terminé! {total:,} enregistrements {verb} en {elapsed:.1f} s ({total / elapsed:,.0f} lignes/s).")
+    if failed:
+        print(f"Tâches en échec: {failed}")
+
+    if args.rebuild and not args.dry_run:
+        from database import Database
+        db = Database(**DB_CONFIG)
+        print(f"Agrégat horaire: {db.rebuild_statistics()} lignes")
+        print(f"Résumé à la minute: {db.rollup_minutes(args.start, args.end)} lignes")
+        print(f"Grille spatiale: {db.rebuild_road_grid()} cellules")
+        print(f"Tronçons: {db.rebuild_segment_stats()} tronçons avec des lectures")
+    elif not args.dry_run:
+        print("Pensez à lancer rebuild_statistics.py et maintain_storage.py --rollup-all "
+              "pour mettre à jour les statistiques.")
+
+
+if __name__ == '__main__':
+    main()
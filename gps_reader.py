@@ -0,0 +1,218 @@
+"""
+Lecture continue du GPS (NMEA 0183) sur le port série du Raspberry Pi.
+
+Un thread dédié vide le port série en permanence, si bien que le tampon de
+l'UART ne se remplit plus de positions périmées. Les phrases GGA (position,
+altitude, satellites), RMC (position, vitesse, cap, date) et VTG (vitesse,
+cap) sont acceptées quel que soit l'émetteur (GP, GN, GL...), après
+vérification de la somme de contrôle.
+
+La dernière position est publiée dans un emplacement unique: chaque mise à
+jour remplace la référence par un nouveau dictionnaire (jamais modifié
+ensuite). En CPython, l'affectation d'un attribut est atomique; la boucle
+de collecte lit donc la position sans verrou ni entrée/sortie.
+"""
+import logging
+import threading
+import time
+
+# Conversion des nœuds (RMC) en km/h
+KNOTS_TO_KMH = 1.852
+
+
+def checksum_ok(sentence):
+    """
+    Vérifie la somme de contrôle d'une phrase NMEA ($...*hh).
+
+    Le XOR de tous les caractères entre '$' et '*' doit valoir hh.
+    """
+    if not sentence.startswith('$'):
+        return False
+    star = sentence.rfind('*')
+    if star < 0 or len(sentence) < star + 3:
+        return False
+    try:
+        expected = int(sentence[star + 1:star + 3], 16)
+    except ValueError:
+        return False
+    value = 0
+    for char in sentence[1:star]:
+        value ^= ord(char)
+    return value == expected
+
+
+def parse_coordinate(value, hemisphere, degree_digits):
+    """Convertit ddmm.mmmm (ou dddmm.mmmm) et l'hémisphère en degrés décimaux."""
+    if not value:
+        return None
+    degrees = float(value[:degree_digits]) + float(value[degree_digits:]) / 60
+    return -degrees if hemisphere in ('S', 'W') else degrees
+
+
+def parse_time(value):
+    """hhmmss.ss -> 'hh:mm:ss'."""
+    if len(value) < 6:
+        return None
+    return value[:2] + ':' + value[2:4] + ':' + value[4:6]
+
+
+def parse_gga(fields):
+    """GGA: position, qualité du fix, satellites et altitude."""
+    if len(fields) < 10 or fields[6] in ('', '0'):
+        return None  # Pas de fix
+    latitude = parse_coordinate(fields[2], fields[3], 2)
+    longitude = parse_coordinate(fields[4], fields[5], 3)
+    if latitude is None or longitude is None:
+        return None
+    return {
+        'time': parse_time(fields[1]),
+        'latitude': latitude,
+        'longitude': longitude,
+        'satellites': int(fields[7]) if fields[7] else None,
+        'altitude': float(fields[9]) if fields[9] else None
+    }
+
+
+def parse_rmc(fields):
+    """RMC: position, vitesse sur le fond (nœuds) et cap, si le fix est valide."""
+    if len(fields) < 10 or fields[2] != 'A':
+        return None
+    latitude = parse_coordinate(fields[3], fields[4], 2)
+    longitude = parse_coordinate(fields[5], fields[6], 3)
+    if latitude is None or longitude is None:
+        return None
+    result = {'time': parse_time(fields[1]), 'latitude': latitude, 'longitude': longitude}
+    if fields[7]:
+        result['speed'] = float(fields[7]) * KNOTS_TO_KMH
+    if fields[8]:
+        result['course'] = float(fields[8])
+    if len(fields[9]) == 6:
+        result['date'] = f"20{fields[9][4:6]}-{fields[9][2:4]}-{fields[9][0:2]}"
+    return result
+
+
+def parse_vtg(fields):
+    """VTG: cap vrai et vitesse en km/h."""
+    if len(fields) < 8:
+        return None
+    result = {}
+    if fields[1]:
+        result['course'] = float(fields[1])
+    if fields[7]:
+        result['speed'] = float(fields[7])
+    return result or None
+
+
+PARSERS = {'GGA': parse_gga, 'RMC': parse_rmc, 'VTG': parse_vtg}
+
+
+def parse_sentence(sentence):
+    """
+    Analyse une phrase NMEA.
+
+    Returns:
+        tuple: (type, champs extraits), ou None si la phrase est invalide,
+               sans fix, ou d'un type non pris en charge
+    """
+    sentence = sentence.strip()
+    if not checksum_ok(sentence):
+        return None
+    fields = sentence[1:sentence.rfind('*')].split(',')
+    kind = fields[0][2:]
+    parser = PARSERS.get(kind)
+    if parser is None:
+        return None
+    try:
+        values = parser(fields)
+    except (ValueError, IndexError):
+        return None
+    return (kind, values) if values else None
+
+
+class GpsReader:
+    """
+    Thread qui vide le port série et publie la dernière position connue.
+
+    Les champs de GGA, RMC et VTG sont fusionnés: la position vient de la
+    dernière phrase GGA ou RMC, la vitesse et le cap de la dernière RMC ou
+    VTG. `fix_time` est l'instant (time.time()) de réception de la
+    position; la vitesse et le cap gardent le leur dans `motion_time`.
+    """
+
+    def __init__(self, ser):
+        """
+        Args:
+            ser: Port série ouvert (serial.Serial) avec un timeout de lecture
+        """
+        self.ser = ser
+        self._fix = None          # Dernière position publiée (dictionnaire immuable)
+        self._state = {}          # Champs fusionnés, propres au thread de lecture
+        self._running = False
+        self._thread = None
+        self.sentences = 0
+        self.checksum_errors = 0
+        self.read_errors = 0
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="gps-reader", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    def _run(self):
+        while self._running:
+            try:
+                # Bloque au plus le timeout du port série
+                raw = self.ser.readline()
+            except Exception as e:
+                self.read_errors += 1
+                logging.error(f"Erreur lors de la lecture du GPS: {e}")
+                time.sleep(1)
+                continue
+            if raw:
+                self.feed(raw.decode('ascii', errors='replace'))
+
+    def feed(self, sentence):
+        """Traite une phrase NMEA et publie la position si elle a changé."""
+        sentence = sentence.strip()
+        if not sentence.startswith('$'):
+            return
+        self.sentences += 1
+        parsed = parse_sentence(sentence)
+        if parsed is None:
+            if not checksum_ok(sentence):
+                self.checksum_errors += 1
+            return
+
+        kind, values = parsed
+        now = time.time()
+        self._state.update(values)
+        if kind in ('GGA', 'RMC'):
+            self._state['fix_time'] = now
+        if 'speed' in values or 'course' in values:
+            self._state['motion_time'] = now
+        if 'latitude' in self._state:
+            # Nouvelle référence: les lecteurs ne voient jamais un dictionnaire à moitié mis à jour
+            self._fix = dict(self._state)
+
+    def latest_fix(self, max_age=None):
+        """
+        Retourne la dernière position sans entrée/sortie.
+
+        Args:
+            max_age (float): Âge maximal en secondes (None: pas de limite)
+
+        Returns:
+            dict: Position (time, latitude, longitude, altitude, satellites,
+                  speed en km/h, course en degrés, fix_time), ou None
+        """
+        fix = self._fix
+        if fix is None:
+            return None
+        if max_age is not None and time.time() - fix['fix_time'] > max_age:
+            return None
+        return fix
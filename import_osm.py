@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Importe une seule fois le réseau routier OpenStreetMap dans un cache local
+(road_network.py), utilisé ensuite sans accès réseau par insert_data2.py,
+generate_data.py --network et import_segments.py --network.
+
+La source est un extrait .osm (XML) ou une réponse Overpass .json déjà sur
+disque; --fetch télécharge d'abord la réponse Overpass de l'emprise de
+Kinshasa (requête de insert_data2.py) et la conserve à côté du cache.
+
+Usage:
+    python3 import_osm.py kinshasa.osm
+    python3 import_osm.py --fetch kinshasa.json --output osm_network
+"""
+import argparse
+import time
+import requests
+from road_network import HIGHWAY_TYPES, OSM_NETWORK_DIR, import_osm, RoadNetwork
+
+# Paramètres OpenStreetMap (bbox ajusté pour Kinshasa)
+OVERPASS_URL = "http://overpass-api.de/api/interpreter"
+KINSHASA_BBOX = "-4.5,15.0,-4.2,15.5"
+
+
+def fetch_overpass(path, bbox=KINSHASA_BBOX):
+    """Télécharge les routes de l'emprise depuis Overpass dans `path`."""
+    query = f"""
+    [out:json][timeout:250];
+    (
+      way["highway"~"{'|'.join(HIGHWAY_TYPES)}"]({bbox});
+    );
+    out body;
+    >;
+    out skel qt;
+    """
+    with requests.get(OVERPASS_URL, params={'data': query}, timeout=300, stream=True) as response:
+        response.raise_for_status()
+        with open(path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=1 << 20):
+                f.write(chunk)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import du réseau routier OSM dans un cache local")
+    parser.add_argument('source', help="Extrait .osm ou réponse Overpass .json")
+    parser.add_argument('--output', default=OSM_NETWORK_DIR, help="Répertoire du réseau importé")
+    parser.add_argument('--fetch', action='store_true', help="Télécharger d'abord la réponse Overpass dans SOURCE")
+    parser.add_argument('--bbox', default=KINSHASA_BBOX, help="Emprise sud,ouest,nord,est pour --fetch")
+    args = parser.parse_args()
+
+    if args.fetch:
+        print("Téléchargement des données OpenStreetMap...")
+        fetch_overpass(args.source, args.bbox)
+
+    start = time.perf_counter()
+    meta = import_osm(args.source, args.output)
+    print(f"{meta['ways']:,} routes, {meta['nodes']:,} nœuds, {meta['segments']:,} tronçons "
+          f"importés en {time.perf_counter() - start:.1f} s dans {args.output}/")
+
+    start = time.perf_counter()
+    RoadNetwork.load(args.output)
+    print(f"Chargement du cache: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Importe les tronçons routiers utilisés pour le rattachement des lectures
+(/api/segments), puis recalcule leurs statistiques à partir des données
+existantes.
+
+Par défaut, les itinéraires simulés de routes.py sont importés; avec
+--network, les tronçons du réseau OSM importé par import_osm.py (source osm).
+
+Usage:
+    python3 import_segments.py
+    python3 import_segments.py --network osm_network
+"""
+import argparse
+from database import Database
+from road_network import RoadNetwork
+from road_segments import segments_from_routes
+from routes import ROUTE_ALLER, ROUTE_RETOUR
+
+# Configuration MySQL
+DB_CONFIG = {
+    'host': 'localhost',
+    'user': 'admin',
+    'password': 'admin',
+    'database': 'road_monitor'
+}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Import des tronçons routiers")
+    parser.add_argument('--network', help="Réseau OSM importé par import_osm.py")
+    args = parser.parse_args()
+    
+    db = Database(**DB_CONFIG)
+    
+    if args.network:
+        segments = RoadNetwork.load(args.network).segments()
+        count = db.save_segments(segments, source='osm')
+    else:
+        segments = segments_from_routes(ROUTE_ALLER + ROUTE_RETOUR, source='simulator')
+        count = db.save_segments(segments, source='simulator')
+    print(f"{count} tronçons importés.")
+    
+    print("Rattachement des lectures existantes aux tronçons...")
+    matched = db.rebuild_segment_stats()
+    print(f"Terminé! {matched} tronçons avec des lectures.")
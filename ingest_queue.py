@@ -0,0 +1,211 @@
+import queue
+import threading
+import time
+from database import is_transient_error
+
+
+class WriteBehindQueue:
+    """
+    File d'écriture différée entre le récepteur HTTP et MySQL.
+
+    Les lectures sont placées dans une file bornée et l'endpoint répond
+    immédiatement. Un thread d'écriture les vide vers la base par lots,
+    dès que `batch_size` lectures sont disponibles ou que `flush_interval`
+    secondes se sont écoulées. Quand la file est pleine, submit() retourne
+    False pour que l'appelant applique une contre-pression (HTTP 429).
+
+    Les lectures ont déjà été acquittées auprès de l'appareil: un lot n'est
+    jamais abandonné sur une erreur passagère (interblocage, connexion
+    perdue, pool saturé), il est réécrit avec une attente croissante tant
+    que la file tourne (la file se remplit pendant ce temps et /data répond
+    429). Sur une erreur due aux données, le lot est réécrit ligne par ligne
+    pour ne rejeter que les lectures fautives, qui sont journalisées.
+    """
+
+    def __init__(self, db, max_size=10000, batch_size=500, flush_interval=1.0, on_written=None,
+                 retry_delay=0.5, max_retry_delay=30.0, max_retries=5):
+        """
+        Args:
+            db: Instance de Database exposant save_sensor_data_batch
+            max_size (int): Nombre maximal de lectures en attente
+            batch_size (int): Taille maximale d'un lot écrit en base
+            flush_interval (float): Délai maximal en secondes avant l'écriture d'un lot incomplet
+            on_written: Fonction appelée avec chaque lot écrit (ex. invalidation du cache des réponses)
+            retry_delay (float): Première attente (s) avant de réécrire après une erreur passagère
+            max_retry_delay (float): Attente maximale (s) entre deux tentatives
+            max_retries (int): Tentatives à l'arrêt de la file (sans limite tant qu'elle tourne)
+        """
+        self.db = db
+        self.on_written = on_written
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.max_retries = max_retries
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_size)
+        self._running = False
+        self._stopped = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        # Métriques
+        self._accepted = 0
+        self._dropped = 0
+        self._written = 0
+        self._failed = 0
+        self._retries = 0
+        self._flushes = 0
+        self._last_flush_latency = None
+        self._max_flush_latency = 0.0
+        self._total_flush_latency = 0.0
+
+    def start(self):
+        """Démarre le thread d'écriture."""
+        if self._running:
+            return
+        self._running = True
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._writer_loop, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10):
+        """
+        Arrête le thread d'écriture après avoir vidé la file.
+
+        Un lot en attente de réécriture (jusqu'à max_retry_delay) est réveillé
+        aussitôt: ses dernières tentatives n'attendent que retry_delay, si bien
+        que le thread se termine avant `timeout` au lieu de laisser _drain
+        tourner pendant qu'il tient encore un lot.
+        """
+        if not self._running:
+            return
+        self._running = False
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        # Écrire ce qui reste si le thread n'a pas tout vidé
+        self._drain()
+
+    def submit(self, data):
+        """
+        Ajoute une lecture à la file sans bloquer.
+
+        Returns:
+            bool: False si la file est pleine et que la lecture a été rejetée
+        """
+        try:
+            self._queue.put_nowait(data)
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            return False
+        with self._lock:
+            self._accepted += 1
+        return True
+
+    def _collect_batch(self):
+        """Attend un lot complet ou l'expiration de flush_interval."""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _save(self, batch):
+        """Écrit un lot, en le relançant sur les erreurs passagères; lève l'erreur définitive."""
+        attempt = 0
+        final_attempts = 0  # tentatives depuis l'arrêt de la file
+        while True:
+            try:
+                self.db.save_sensor_data_batch(batch)
+                return
+            except Exception as e:
+                if not is_transient_error(e) or final_attempts >= self.max_retries:
+                    raise
+                attempt += 1
+                if not self._running:
+                    final_attempts += 1
+                delay = min(self.retry_delay * 2 ** (attempt - 1), self.max_retry_delay)
+                with self._lock:
+                    self._retries += 1
+                print(f"Transient error writing write-behind batch ({e}), retry {attempt} in {delay:.1f}s")
+                # stop() interrompt l'attente; à l'arrêt, attente courte seulement
+                if self._stopped.wait(delay):
+                    time.sleep(self.retry_delay)
+
+    def _flush(self, batch):
+        """Écrit un lot en base et met à jour les métriques."""
+        if not batch:
+            return
+        started = time.monotonic()
+        written = []
+        try:
+            self._save(batch)
+            written = batch
+        except Exception as e:
+            if is_transient_error(e):
+                # Arrêt de la file pendant une panne MySQL
+                print(f"Error flushing write-behind batch, {len(batch)} readings lost: {e}")
+            else:
+                print(f"Error flushing write-behind batch ({e}), writing readings one by one")
+                for data in batch:
+                    try:
+                        self._save([data])
+                        written.append(data)
+                    except Exception as row_error:
+                        print(f"Rejected reading {data!r}: {row_error}")
+        latency = time.monotonic() - started
+
+        with self._lock:
+            self._flushes += 1
+            self._last_flush_latency = latency
+            self._max_flush_latency = max(self._max_flush_latency, latency)
+            self._total_flush_latency += latency
+            self._written += len(written)
+            self._failed += len(batch) - len(written)
+
+        if written and self.on_written is not None:
+            try:
+                self.on_written(written)
+            except Exception as e:
+                print(f"Error in write-behind callback: {e}")
+
+    def _writer_loop(self):
+        while self._running:
+            self._flush(self._collect_batch())
+
+    def _drain(self):
+        """Écrit toutes les lectures encore en file (arrêt propre)."""
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            self._flush(batch)
+
+    def stats(self):
+        """Retourne les métriques de la file d'écriture différée."""
+        with self._lock:
+            return {
+                'depth': self._queue.qsize(),
+                'capacity': self._queue.maxsize,
+                'accepted': self._accepted,
+                'dropped': self._dropped,
+                'written': self._written,
+                'failed': self._failed,
+                'retries': self._retries,
+                'flushes': self._flushes,
+                'last_flush_latency': self._last_flush_latency,
+                'max_flush_latency': self._max_flush_latency,
+                'avg_flush_latency': self._total_flush_latency / self._flushes if self._flushes else None
+            }
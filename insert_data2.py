@@ -1,9 +1,9 @@
 import mysql.connector
 import random
-import requests
 import pandas as pd
 from datetime import datetime, timedelta
 from math import sin, cos, radians, sqrt
+from road_network import OSM_NETWORK_DIR, RoadNetwork
 
 # Configuration MySQL
 DB_CONFIG = {
@@ -13,65 +13,28 @@ DB_CONFIG = {
     'database': 'road_monitor'
 }
 
-# Paramètres OpenStreetMap (bbox ajusté pour Kinshasa)
-OVERPASS_URL = "http://overpass-api.de/api/interpreter"
-KINSHASA_BBOX = "-4.5,15.0,-4.2,15.5"  # Bbox correct pour Kinshasa
-
 # Paramètres généraux
 PLAGE_ALTITUDE = (275.0, 285.0)
 PLAGE_SATELLITES = (6, 9)
 VARIATION_GPS = 0.0002  # 20m de variation
 
 def recuperer_routes_osm():
-    """Récupère les routes de Kinshasa depuis OpenStreetMap"""
-    query = f"""
-    [out:json][timeout:250];
-    (
-      way["highway"~"primary|secondary|tertiary|residential|unclassified|trunk|service|road"]({KINSHASA_BBOX});
-    );
-    out body;
-    >;
-    out skel qt;
-    """
-    
+    """Charge les routes de Kinshasa depuis le cache local (import_osm.py)"""
     try:
-        response = requests.get(OVERPASS_URL, params={'data': query}, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-        
-        nodes = {}
-        for element in data['elements']:
-            if element['type'] == 'node':
-                nodes[element['id']] = (element['lat'], element['lon'])
-        
-        routes = []
-        for element in data['elements']:
-            if element['type'] == 'way' and 'nodes' in element:
-                coordinates = []
-                for node_id in element['nodes']:
-                    if node_id in nodes:
-                        coordinates.append(nodes[node_id])
-                
-                if coordinates:
-                    routes.append({
-                        'nom': element.get('tags', {}).get('name', 'Unnamed'),
-                        'type': element.get('tags', {}).get('highway', 'unknown'),
-                        'coordinates': coordinates
-                    })
-        
+        routes = RoadNetwork.load(OSM_NETWORK_DIR).routes()
         print(f"Routes trouvées : {len(routes)}")
         return routes
         
-    except Exception as e:
-        print(f"Erreur lors de la récupération OSM : {str(e)}")
+    except (OSError, ValueError) as e:
+        print(f"Erreur lors du chargement du réseau OSM : {str(e)}")
         return []
 
 # Récupération des routes OSM
-print("Récupération des données OpenStreetMap...")
+print("Chargement du réseau OpenStreetMap...")
 routes_osm = recuperer_routes_osm()
 
 if not routes_osm:
-    print("Aucune route trouvée. Vérifiez votre connexion internet et les paramètres OSM.")
+    print(f"Aucune route trouvée. Importez d'abord le réseau: python3 import_osm.py --fetch kinshasa.json --output {OSM_NETWORK_DIR}")
     exit()
 
 # Conversion en format ZONES_SPECIFIQUES
@@ -200,4 +163,5 @@ while current <= fin:
 
 conn.commit()
 conn.close()
-print(f"Insertion terminée! {total} enregistrements créés.")
\ No newline at end of file
+print(f"Insertion terminée! {total} enregistrements créés.")
+print("Pensez à lancer rebuild_statistics.py pour mettre à jour les statistiques.")
\ No newline at end of file
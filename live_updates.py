@@ -0,0 +1,211 @@
+"""
+Diffusion Socket.IO des lectures en temps réel, par deltas.
+
+Un client reçoit une seule fois un instantané (dernière lecture et
+historique récent des points de route) à la connexion ou à l'abonnement,
+puis uniquement les nouveaux points. Les lectures sont regroupées par
+room et envoyées au plus max_rate fois par seconde: quel que soit le débit
+des appareils, chaque client reçoit au plus max_rate messages par seconde
+et par room, contenant la dernière lecture et les points accumulés.
+
+Rooms:
+- 'all': toutes les lectures (room par défaut à la connexion)
+- 'device:<id>': lectures d'un appareil (clé "device" de la lecture)
+- 'region:<y>:<x>': lectures situées dans une cellule de REGION_CELL_SIZE degrés
+
+Un client abonné à la fois à un appareil et à une région qui le contient
+reçoit les mêmes points dans les deux rooms (champ "room" du message).
+"""
+import heapq
+import math
+import threading
+from collections import OrderedDict, deque
+from operator import itemgetter
+
+# Room reçue par défaut par les clients qui ne s'abonnent à rien
+ALL_ROOM = 'all'
+
+# Appareil attribué aux lectures sans clé "device" (Raspberry Pi unique)
+DEFAULT_DEVICE = 'default'
+
+# Taille des cellules de région en degrés (~5,5 km): Kinshasa tient en ~60 cellules
+REGION_CELL_SIZE = 0.05
+
+# Nombre maximal de rooms par abonnement (au-delà, abonnement à 'all')
+MAX_SUBSCRIPTIONS = 100
+
+# Nombre maximal de rooms dont l'historique est conservé: au-delà, celui de
+# la room la moins récemment alimentée est oublié
+MAX_HISTORY_ROOMS = 1000
+
+
+def device_room(device):
+    return f"device:{device}"
+
+
+def region_room(latitude, longitude, cell_size=REGION_CELL_SIZE):
+    return f"region:{math.floor(latitude / cell_size)}:{math.floor(longitude / cell_size)}"
+
+
+def regions_for_bbox(south, west, north, east, cell_size=REGION_CELL_SIZE):
+    """Rooms des régions couvertes par une emprise, ou None si elles sont trop nombreuses."""
+    min_y, max_y = math.floor(south / cell_size), math.floor(north / cell_size)
+    min_x, max_x = math.floor(west / cell_size), math.floor(east / cell_size)
+    if max_y < min_y or max_x < min_x or (max_y - min_y + 1) * (max_x - min_x + 1) > MAX_SUBSCRIPTIONS:
+        return None
+    return [f"region:{y}:{x}" for y in range(min_y, max_y + 1) for x in range(min_x, max_x + 1)]
+
+
+def subscription_rooms(message):
+    """
+    Rooms demandées par un message 'subscribe'.
+
+    Accepte {"devices": [...]} et/ou {"bbox": [sud, ouest, nord, est]};
+    un message vide, invalide ou trop large revient à la room 'all'.
+    """
+    if not isinstance(message, dict):
+        return [ALL_ROOM]
+    rooms = []
+    devices = message.get('devices') or []
+    if isinstance(devices, list):
+        rooms.extend(device_room(device) for device in devices if isinstance(device, (str, int)))
+    bbox = message.get('bbox')
+    if isinstance(bbox, list) and len(bbox) == 4:
+        try:
+            regions = regions_for_bbox(*(float(value) for value in bbox))
+        except (TypeError, ValueError):
+            regions = None
+        if regions is None:
+            return [ALL_ROOM]
+        rooms.extend(regions)
+    if not rooms or len(rooms) > MAX_SUBSCRIPTIONS:
+        return [ALL_ROOM]
+    return rooms
+
+
+class LiveBroadcaster:
+    """Historique récent en mémoire et envoi groupé des deltas par room."""
+
+    def __init__(self, socketio, history_size=100, max_rate=4.0):
+        """
+        Args:
+            socketio: Instance de flask_socketio.SocketIO
+            history_size (int): Points de route conservés par room pour les instantanés
+            max_rate (float): Nombre maximal de messages par seconde et par room
+        """
+        self.socketio = socketio
+        self.history_size = history_size
+        self.interval = 1.0 / max_rate
+        # room -> deque((numéro de publication, point)), la plus récemment alimentée en dernier
+        self._history = OrderedDict()
+        self._latest = {}           # room -> (numéro de publication, lecture)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._task = None
+
+        # Métriques
+        self._published = 0
+        self._messages = 0
+        self._points_sent = 0
+
+    def rooms_for(self, data, road_point):
+        """Rooms concernées par une lecture."""
+        rooms = [ALL_ROOM, device_room(data.get('device', DEFAULT_DEVICE))]
+        if road_point is not None and road_point['latitude'] is not None and road_point['longitude'] is not None:
+            rooms.append(region_room(road_point['latitude'], road_point['longitude']))
+        return rooms
+
+    def publish(self, data, road_point=None):
+        """
+        Enregistre une lecture (et son point de route éventuel) pour le prochain envoi.
+
+        N'émet rien directement: l'appelant (endpoint HTTP) ne bloque jamais
+        sur les clients Socket.IO.
+        """
+        rooms = self.rooms_for(data, road_point)
+        with self._lock:
+            self._published += 1
+            if road_point is not None:
+                self._record_point(rooms, road_point)
+            for room in rooms:
+                self._latest[room] = (self._published, data)
+                pending = self._pending.get(room)
+                if pending is None:
+                    pending = self._pending[room] = {'sensor_data': data, 'points': deque(maxlen=self.history_size)}
+                pending['sensor_data'] = data
+                if road_point is not None:
+                    pending['points'].append(road_point)
+            if self._task is None:
+                self._task = self.socketio.start_background_task(self._flush_loop)
+
+    def _record_point(self, rooms, road_point):
+        """Ajoute un point à l'historique de chacune de ses rooms (verrou déjà pris)."""
+        for room in rooms:
+            history = self._history.get(room)
+            if history is None:
+                history = self._history[room] = deque(maxlen=self.history_size)
+                if len(self._history) > MAX_HISTORY_ROOMS:
+                    self._history.popitem(last=False)
+            else:
+                self._history.move_to_end(room)
+            history.append((self._published, road_point))
+
+    def snapshot(self, rooms):
+        """
+        Instantané pour un nouveau client: dernière lecture et historique de ses rooms.
+
+        Les historiques des rooms sont fusionnés dans l'ordre de publication;
+        un point présent dans plusieurs rooms (appareil et région) n'apparaît
+        qu'une fois, et seuls les history_size plus récents sont gardés.
+        """
+        wanted = set(rooms)
+        with self._lock:
+            histories = [self._history[room] for room in wanted if room in self._history]
+            points = deque(maxlen=self.history_size)
+            previous = None
+            for number, point in heapq.merge(*histories, key=itemgetter(0)):
+                if number != previous:
+                    points.append(point)
+                    previous = number
+            # Lecture la plus récemment publiée parmi les rooms, pas celle de la dernière room
+            latest = max((self._latest[room] for room in wanted if room in self._latest),
+                         key=lambda item: item[0], default=(0, {}))
+        return {
+            'sensor_data': latest[1],
+            'road_condition_history': list(points)
+        }
+
+    def flush(self):
+        """Envoie à chaque room les lectures accumulées depuis le dernier envoi."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for room, delta in pending.items():
+            points = list(delta['points'])
+            self.socketio.emit('sensor_delta', {
+                'room': room,
+                'sensor_data': delta['sensor_data'],
+                'points': points
+            }, to=room)
+            self._messages += 1
+            self._points_sent += len(points)
+
+    def _flush_loop(self):
+        while True:
+            self.socketio.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error broadcasting live updates: {e}")
+
+    def stats(self):
+        """Métriques de diffusion pour /api/metrics."""
+        with self._lock:
+            return {
+                'readings_published': self._published,
+                'messages_sent': self._messages,
+                'points_sent': self._points_sent,
+                'history_rooms': len(self._history),
+                'history_points': sum(len(history) for history in self._history.values()),
+                'active_rooms': len(self._latest),
+                'max_rate': 1.0 / self.interval
+            }
@@ -0,0 +1,383 @@
+import sqlite3
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+from vibration import convert_to_ms2
+
+
+# Colonnes typées de la table readings, dans l'ordre des requêtes
+READING_COLUMNS = (
+    "timestamp", "gps_time", "latitude", "longitude", "altitude", "satellites", "speed", "course",
+    "x_raw", "y_raw", "z_raw", "vib_n", "vib_rms", "vib_ptp", "vib_variance", "extra"
+)
+
+# Clés du message déjà stockées dans des colonnes typées
+GPS_KEYS = ("time", "latitude", "longitude", "altitude", "satellites", "speed", "course")
+ACCEL_KEYS = ("x_raw", "y_raw", "z_raw", "x", "y", "z")
+VIBRATION_KEYS = ("n", "rms", "ptp", "variance")
+
+
+def reading_to_row(data):
+    """
+    Convertit un message capteur en ligne typée.
+
+    Les champs sans colonne dédiée (ajouts futurs) sont conservés en JSON
+    dans la colonne extra, vide la plupart du temps.
+    """
+    gps = data.get("gps") or {}
+    accel = data.get("accelerometer") or {}
+    vibration = data.get("vibration") or {}
+
+    extra = {key: value for key, value in data.items()
+             if key not in ("timestamp", "gps", "accelerometer", "vibration")}
+    extra_gps = {key: value for key, value in gps.items() if key not in GPS_KEYS}
+    extra_accel = {key: value for key, value in accel.items() if key not in ACCEL_KEYS}
+    extra_vibration = {key: value for key, value in vibration.items() if key not in VIBRATION_KEYS}
+    if extra_gps:
+        extra["gps"] = extra_gps
+    if extra_accel:
+        extra["accelerometer"] = extra_accel
+    if extra_vibration:
+        extra["vibration"] = extra_vibration
+
+    return (
+        data["timestamp"],
+        gps.get("time"), gps.get("latitude"), gps.get("longitude"), gps.get("altitude"), gps.get("satellites"),
+        gps.get("speed"), gps.get("course"),
+        accel.get("x_raw"), accel.get("y_raw"), accel.get("z_raw"),
+        vibration.get("n"), vibration.get("rms"), vibration.get("ptp"), vibration.get("variance"),
+        json.dumps(extra) if extra else None
+    )
+
+
+def row_to_reading(row):
+    """Reconstruit le message capteur (format envoyé au serveur) depuis une ligne typée."""
+    (timestamp, gps_time, latitude, longitude, altitude, satellites, speed, course,
+     x_raw, y_raw, z_raw, vib_n, vib_rms, vib_ptp, vib_variance, extra) = row
+    extra = json.loads(extra) if extra else {}
+
+    data = {"timestamp": timestamp, "gps": None, "accelerometer": None}
+    if latitude is not None and longitude is not None:
+        data["gps"] = {
+            "time": gps_time,
+            "latitude": latitude,
+            "longitude": longitude,
+            "altitude": altitude,
+            "satellites": satellites
+        }
+        if speed is not None:
+            data["gps"]["speed"] = speed
+            data["gps"]["course"] = course
+        data["gps"].update(extra.pop("gps", {}))
+    if x_raw is not None:
+        data["accelerometer"] = {
+            "x_raw": x_raw,
+            "y_raw": y_raw,
+            "z_raw": z_raw,
+            "x": convert_to_ms2(x_raw),
+            "y": convert_to_ms2(y_raw),
+            "z": convert_to_ms2(z_raw)
+        }
+        data["accelerometer"].update(extra.pop("accelerometer", {}))
+    if vib_rms is not None:
+        data["vibration"] = {"n": vib_n, "rms": vib_rms, "ptp": vib_ptp, "variance": vib_variance}
+        data["vibration"].update(extra.pop("vibration", {}))
+    data.update(extra)
+    return data
+
+
+class LocalDatabase:
+    """
+    Tampon SQLite local du Raspberry Pi (données en attente de synchronisation).
+
+    Une seule connexion est gardée ouverte pour toute la durée du programme,
+    en mode WAL avec synchronous=NORMAL: une écriture ne force plus un fsync
+    du journal sur la carte SD. Les échantillons sont accumulés en mémoire et
+    écrits par lots (une transaction toutes les `commit_interval` secondes ou
+    tous les `max_pending` échantillons). En cas de coupure de courant, au
+    plus `commit_interval` secondes d'échantillons sont perdues.
+
+    Les lectures sont stockées en colonnes typées (table readings). Un index
+    partiel ne couvre que les lignes non synchronisées, si bien que la
+    recherche du backlog ne dépend pas de l'historique accumulé. Les lignes
+    synchronisées plus anciennes que `retention` sont supprimées
+    périodiquement et l'espace libéré est rendu au système de fichiers.
+    """
+
+    # Version du schéma local (PRAGMA user_version)
+    SCHEMA_VERSION = 2
+
+    # Requêtes constantes: sqlite3 les garde préparées dans son cache de requêtes
+    INSERT_QUERY = (
+        f"INSERT INTO readings ({', '.join(READING_COLUMNS)}) "
+        f"VALUES ({', '.join(['?'] * len(READING_COLUMNS))})"
+    )
+    UNSYNCED_QUERY = (
+        f"SELECT id, {', '.join(READING_COLUMNS)} FROM readings "
+        f"WHERE synced = 0 ORDER BY timestamp ASC LIMIT ?"
+    )
+    PRUNE_QUERY = "DELETE FROM readings WHERE synced = 1 AND timestamp < ?"
+    # Parcourt uniquement l'index partiel des lignes non synchronisées
+    BACKLOG_QUERY = "SELECT COUNT(*), MIN(timestamp) FROM readings WHERE synced = 0"
+
+    # Nombre maximal de paramètres par requête UPDATE ... IN (...)
+    MARK_CHUNK = 500
+
+    # Valeurs de la colonne synced: en attente (0), envoyé, refusé par le serveur
+    SYNCED = 1
+    REJECTED = 2
+
+    def __init__(self, db_path, commit_interval=1.0, max_pending=500,
+                 retention=timedelta(days=7), prune_interval=600):
+        """
+        Initialise la base de données SQLite locale
+
+        Args:
+            db_path (str): Chemin du fichier SQLite
+            commit_interval (float): Délai maximal avant l'écriture des échantillons en attente
+            max_pending (int): Nombre d'échantillons en attente déclenchant une écriture immédiate
+            retention (timedelta): Durée de conservation des lignes déjà synchronisées
+            prune_interval (float): Intervalle en secondes entre deux purges
+        """
+        self.db_path = db_path
+        self.commit_interval = commit_interval
+        self.max_pending = max_pending
+        self.retention = retention
+        self.prune_interval = prune_interval
+        self._pending = []
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+
+        # Connexion partagée par les threads de collecte et de synchronisation,
+        # protégée par self._lock
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, cached_statements=32)
+        self.init_db()
+
+        self._flusher = threading.Thread(target=self._flush_loop, name="local-db-flush", daemon=True)
+        self._flusher.start()
+
+    def init_db(self):
+        """Crée les tables et migre l'ancien format JSON si nécessaire"""
+        try:
+            with self._lock:
+                cursor = self.conn.cursor()
+                # auto_vacuum ne s'applique qu'à une base neuve (ou après VACUUM)
+                cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                cursor.execute("PRAGMA journal_mode=WAL")
+                cursor.execute("PRAGMA synchronous=NORMAL")
+
+                version = cursor.execute("PRAGMA user_version").fetchone()[0]
+                if version < 1:
+                    self._migrate_to_typed_rows(cursor)
+                elif version < 2:
+                    # Vitesse et cap du GPS (phrases RMC/VTG)
+                    cursor.execute("ALTER TABLE readings ADD COLUMN speed REAL")
+                    cursor.execute("ALTER TABLE readings ADD COLUMN course REAL")
+                if version < self.SCHEMA_VERSION:
+                    cursor.execute(f"PRAGMA user_version={self.SCHEMA_VERSION}")
+
+                self.conn.commit()
+            logging.info("Base de données locale initialisée avec succès")
+        except Exception as e:
+            self.conn.rollback()
+            logging.error(f"Erreur lors de l'initialisation de la base de données locale: {e}")
+
+    def _migrate_to_typed_rows(self, cursor):
+        """Crée la table readings et y reporte le backlog de l'ancienne table sensor_data."""
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS readings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            gps_time TEXT,
+            latitude REAL,
+            longitude REAL,
+            altitude REAL,
+            satellites INTEGER,
+            speed REAL,
+            course REAL,
+            x_raw INTEGER,
+            y_raw INTEGER,
+            z_raw INTEGER,
+            vib_n INTEGER,
+            vib_rms REAL,
+            vib_ptp REAL,
+            vib_variance REAL,
+            extra TEXT,
+            synced INTEGER NOT NULL DEFAULT 0
+        )
+        ''')
+        # Index partiels: backlog à envoyer et lignes synchronisées à purger
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_readings_unsynced ON readings (timestamp) WHERE synced = 0")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_readings_synced ON readings (timestamp) WHERE synced = 1")
+
+        legacy = cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'sensor_data'"
+        ).fetchone()
+        if not legacy:
+            return
+
+        # Seul le backlog non synchronisé est conservé
+        migrated = 0
+        for (data_json,) in cursor.execute("SELECT data FROM sensor_data WHERE synced = 0 ORDER BY id").fetchall():
+            try:
+                self.conn.execute(self.INSERT_QUERY, reading_to_row(json.loads(data_json)))
+                migrated += 1
+            except (ValueError, KeyError) as e:
+                logging.warning(f"Enregistrement local illisible ignoré lors de la migration: {e}")
+        cursor.execute("DROP TABLE sensor_data")
+        logging.info(f"Migration de la base locale: {migrated} enregistrements non synchronisés repris")
+
+    def save_data(self, data):
+        """Ajoute les données aux échantillons en attente d'écriture groupée"""
+        try:
+            row = reading_to_row(data)
+        except Exception as e:
+            logging.error(f"Erreur lors de l'enregistrement local des données: {e}")
+            return False
+
+        with self._lock:
+            self._pending.append(row)
+            full = len(self._pending) >= self.max_pending
+        if full:
+            return self.flush()
+        logging.debug(f"Données mises en attente localement: {data['timestamp']}")
+        return True
+
+    def _flush_locked(self):
+        """Écrit les échantillons en attente en une transaction (verrou déjà pris)."""
+        if not self._pending:
+            return True
+        rows, self._pending = self._pending, []
+        try:
+            self.conn.executemany(self.INSERT_QUERY, rows)
+            self.conn.commit()
+            logging.debug(f"Données enregistrées localement: {len(rows)} enregistrements")
+            return True
+        except Exception as e:
+            self.conn.rollback()
+            # Les remettre en attente pour la prochaine tentative
+            self._pending = rows + self._pending
+            logging.error(f"Erreur lors de l'enregistrement local des données: {e}")
+            return False
+
+    def flush(self):
+        """Écrit immédiatement les échantillons en attente"""
+        with self._lock:
+            return self._flush_locked()
+
+    def _flush_loop(self):
+        elapsed = 0.0
+        while not self._closed.wait(self.commit_interval):
+            self.flush()
+            elapsed += self.commit_interval
+            if elapsed >= self.prune_interval:
+                elapsed = 0.0
+                self.prune()
+
+    def prune(self):
+        """
+        Supprime les lignes synchronisées plus anciennes que la rétention
+        et rend les pages libérées au système de fichiers.
+
+        Returns:
+            int: Nombre de lignes supprimées
+        """
+        cutoff = (datetime.now() - self.retention).isoformat()
+        try:
+            with self._lock:
+                deleted = self.conn.execute(self.PRUNE_QUERY, (cutoff,)).rowcount
+                self.conn.commit()
+                if deleted:
+                    self.conn.execute("PRAGMA incremental_vacuum")
+                    self.conn.commit()
+            if deleted:
+                logging.info(f"Purge de la base locale: {deleted} enregistrements synchronisés supprimés")
+            return deleted
+        except Exception as e:
+            logging.error(f"Erreur lors de la purge de la base locale: {e}")
+            return 0
+
+    def get_unsynced_data(self, limit=50):
+        """Récupère les données non synchronisées"""
+        try:
+            with self._lock:
+                # Rendre visibles les échantillons encore en attente
+                self._flush_locked()
+                rows = self.conn.execute(self.UNSYNCED_QUERY, (limit,)).fetchall()
+
+            result = []
+            for row in rows:
+                result.append({
+                    "id": row[0],
+                    "timestamp": row[1],
+                    "data": row_to_reading(row[1:])
+                })
+
+            return result
+        except Exception as e:
+            logging.error(f"Erreur lors de la récupération des données non synchronisées: {e}")
+            return []
+
+    def get_backlog_stats(self):
+        """
+        Taille du backlog à synchroniser (écrit ou encore en attente).
+
+        Returns:
+            tuple: (nombre d'enregistrements, horodatage ISO du plus ancien ou None)
+        """
+        try:
+            with self._lock:
+                count, oldest = self.conn.execute(self.BACKLOG_QUERY).fetchone()
+                pending = len(self._pending)
+                if oldest is None and pending:
+                    oldest = self._pending[0][0]
+            return count + pending, oldest
+        except Exception as e:
+            logging.error(f"Erreur lors du calcul du backlog: {e}")
+            return 0, None
+
+    def mark_as_synced(self, ids):
+        """Marque les données comme synchronisées"""
+        if not ids:
+            return
+
+        try:
+            self._set_synced(ids, self.SYNCED)
+            logging.info(f"Données marquées comme synchronisées: {len(ids)} enregistrements")
+        except Exception as e:
+            logging.error(f"Erreur lors du marquage des données synchronisées: {e}")
+
+    def mark_as_rejected(self, ids):
+        """
+        Met de côté des enregistrements refusés par le serveur à chaque envoi.
+
+        Ils sortent du backlog (get_unsynced_data) mais restent en base pour
+        être examinés; ils ne sont pas supprimés par la purge.
+        """
+        if not ids:
+            return
+
+        try:
+            self._set_synced(ids, self.REJECTED)
+            logging.warning(f"Enregistrements mis de côté (refusés par le serveur): {ids}")
+        except Exception as e:
+            logging.error(f"Erreur lors de la mise de côté des enregistrements refusés: {e}")
+
+    def _set_synced(self, ids, state):
+        with self._lock:
+            for i in range(0, len(ids), self.MARK_CHUNK):
+                chunk = ids[i:i + self.MARK_CHUNK]
+                # Convertir la liste d'IDs en chaîne pour la requête SQL
+                id_str = ','.join(['?'] * len(chunk))
+                self.conn.execute(f"UPDATE readings SET synced = ? WHERE id IN ({id_str})", [state] + list(chunk))
+            self.conn.commit()
+
+    def close(self):
+        """Écrit les échantillons en attente et ferme la connexion"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        with self._lock:
+            self._flush_locked()
+            self.conn.close()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Maintenance du stockage de donnees_routieres (à lancer par cron, par
+exemple toutes les heures):
+
+1. crée à l'avance les partitions mensuelles (PARTITION_MONTHS_AHEAD)
+2. résume à la minute les lectures récentes dans donnees_minute
+   (ROLLUP_LOOKBACK). Les insertions de l'application le tiennent déjà à
+   jour; ce passage rattrape les lectures écrites directement en base
+3. supprime les partitions brutes plus anciennes que RAW_RETENTION_MONTHS,
+   après un dernier résumé
+
+Usage:
+    python3 maintain_storage.py
+    python3 maintain_storage.py --rollup-all   # (re)calcule donnees_minute sur toutes les lectures brutes
+    python3 maintain_storage.py --no-retention
+"""
+import argparse
+from datetime import datetime
+from database import Database
+from storage_tiers import ROLLUP_LOOKBACK
+
+# Configuration MySQL
+DB_CONFIG = {
+    'host': 'localhost',
+    'user': 'admin',
+    'password': 'admin',
+    'database': 'road_monitor'
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partitions, résumé à la minute et rétention des lectures brutes")
+    parser.add_argument('--rollup-all', action='store_true', help="Résumer toutes les lectures brutes conservées")
+    parser.add_argument('--no-retention', action='store_true', help="Ne supprimer aucune partition")
+    args = parser.parse_args()
+
+    db = Database(**DB_CONFIG)
+
+    created = db.ensure_partitions()
+    print(f"Partitions créées: {', '.join(created) if created else 'aucune'}")
+
+    # Seules les minutes complètes sont résumées
+    end = datetime.now().replace(second=0, microsecond=0)
+    if args.rollup_all:
+        conn = db.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT MIN(timestamp) FROM donnees_routieres")
+            start = cursor.fetchone()[0] or end
+        finally:
+            cursor.close()
+            conn.close()
+    else:
+        start = end - ROLLUP_LOOKBACK
+    written = db.rollup_minutes(start, end)
+    print(f"Résumé à la minute du {start:%Y-%m-%d %H:%M} au {end:%Y-%m-%d %H:%M}: {written} lignes écrites")
+
+    if not args.no_retention:
+        dropped = db.apply_retention()
+        print(f"Partitions supprimées: {', '.join(dropped) if dropped else 'aucune'}")
+
+
+if __name__ == '__main__':
+    main()
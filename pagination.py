@@ -0,0 +1,38 @@
+"""
+Curseurs de pagination par clé (keyset) des API d'historique.
+
+Les pages sont triées du plus récent au plus ancien. Le curseur
+"<timestamp>,<clé>" désigne la dernière ligne d'une page; la page suivante
+commence strictement après elle, par une recherche dans l'index
+(timestamp, id) au lieu d'un OFFSET qui relirait toutes les lignes
+précédentes. La clé départage les lignes de même timestamp: l'id pour les
+lectures brutes, l'appareil pour les résumés à la minute.
+"""
+from datetime import datetime
+from storage_tiers import MINUTE_TIER
+
+# Taille maximale d'une page
+MAX_PAGE_SIZE = 10000
+
+
+def encode_cursor(item, tier):
+    """Curseur désignant un élément retourné par get_history/get_road_condition_history."""
+    key = item['device'] if tier == MINUTE_TIER else item['id']
+    return f"{item['timestamp']},{key}"
+
+
+def parse_cursor(value, tier):
+    """
+    Returns:
+        tuple: (datetime, id) pour les lectures brutes, (datetime, appareil) au niveau minute
+
+    Raises:
+        ValueError: Curseur illisible
+    """
+    timestamp, separator, key = value.partition(',')
+    if not separator or not key:
+        raise ValueError(f"Curseur invalide: {value!r}")
+    timestamp = datetime.fromisoformat(timestamp)
+    if tier == MINUTE_TIER:
+        return timestamp, key
+    return timestamp, int(key)
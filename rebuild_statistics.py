@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Reconstruit les agrégats dérivés de donnees_routieres: l'agrégat horaire
+statistiques_horaires, la grille spatiale grille_routiere et les
+statistiques par tronçon troncons_stats.
+
+À lancer après un import direct en base (insert_data.py, insert_data2.py),
+qui contourne la mise à jour incrémentale faite par Database.
+
+Usage:
+    python3 rebuild_statistics.py
+"""
+from database import Database
+
+# Configuration MySQL
+DB_CONFIG = {
+    'host': 'localhost',
+    'user': 'admin',
+    'password': 'admin',
+    'database': 'road_monitor'
+}
+
+if __name__ == '__main__':
+    db = Database(**DB_CONFIG)
+    print("Reconstruction de l'agrégat des statistiques...")
+    created = db.rebuild_statistics()
+    print(f"Reconstruction terminée! {created} lignes d'agrégat créées.")
+    print("Reconstruction de la grille spatiale...")
+    cells = db.rebuild_road_grid()
+    print(f"Reconstruction terminée! {cells} cellules créées.")
+    print("Rattachement des lectures aux tronçons...")
+    segments = db.rebuild_segment_stats()
+    print(f"Reconstruction terminée! {segments} tronçons avec des lectures.")
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Rejeu de trajets vers le serveur Flask à N fois le temps réel.
+
+Chaque appareil simulé est une tâche asyncio avec sa propre connexion HTTP
+persistante; les lectures passent par le même chemin que celles du
+Raspberry Pi (POST /data, ou /data/batch avec --batch), donc par la
+classification, la base de données et la diffusion Socket.IO du serveur.
+
+Sources:
+- simulateur (par défaut): generer_chemin_continu et accelerometre_realiste,
+  une lecture par seconde comme Jean_autostart.py (SAMPLE_INTERVAL)
+- fichier SQLite du Raspberry Pi (table readings de local_database.py):
+  les intervalles entre lectures enregistrées sont respectés
+
+Le rapport donne le débit d'ingestion de bout en bout, la latence des
+requêtes (p50/p99) et le retard pris sur le calendrier de rejeu.
+
+Usage:
+    python3 replay.py --url http://localhost:5000 --devices 20 --speed 10 --duration 60
+    python3 replay.py --source sensor_data.db --devices 5 --speed 50 --batch 50
+"""
+import argparse
+import asyncio
+import json
+import random
+import sqlite3
+import time
+from collections import Counter
+from datetime import datetime
+from urllib.parse import urlsplit
+import numpy as np
+from local_database import READING_COLUMNS, row_to_reading
+from simulator import PLAGE_ALTITUDE, PLAGE_SATELLITES, generer_chemin_continu, accelerometre_realiste
+from vibration import WindowedClassifier, convert_to_ms2
+
+# Intervalle entre deux lectures du simulateur (SAMPLE_INTERVAL du Raspberry Pi)
+SIMULATOR_INTERVAL = 1.0
+
+# Fenêtre de classification des vibrations (VIBRATION_WINDOW du Raspberry Pi)
+VIBRATION_WINDOW = 8
+
+
+def simulator_readings(rng):
+    """
+    Lectures du simulateur, avec leur décalage en secondes depuis le début du trajet.
+
+    Yields:
+        tuple: (décalage, message capteur sans horodatage)
+    """
+    classifier = WindowedClassifier(VIBRATION_WINDOW)
+    chemin = generer_chemin_continu()
+    offset = 0.0
+    while True:
+        (lat, lon), etat = next(chemin)
+        acc = accelerometre_realiste(etat)
+        classifier.update(acc['y'])
+        features = classifier.features()
+        yield offset, {
+            "gps": {
+                "latitude": lat,
+                "longitude": lon,
+                "altitude": round(rng.uniform(*PLAGE_ALTITUDE), 1),
+                "satellites": rng.randint(*PLAGE_SATELLITES)
+            },
+            "accelerometer": {
+                "x_raw": acc['x'], "y_raw": acc['y'], "z_raw": acc['z'],
+                "x": convert_to_ms2(acc['x']), "y": convert_to_ms2(acc['y']), "z": convert_to_ms2(acc['z'])
+            },
+            "vibration": {
+                "n": features["n"],
+                "rms": features["rms"],
+                "ptp": features["ptp"],
+                "variance": features["variance"]
+            }
+        }
+        offset += SIMULATOR_INTERVAL
+
+
+def load_recording(path):
+    """
+    Charge les lectures d'une base SQLite du Raspberry Pi, dans l'ordre chronologique.
+
+    Returns:
+        list: (décalage en secondes, message capteur)
+    """
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(
+            f"SELECT {', '.join(READING_COLUMNS)} FROM readings ORDER BY timestamp"
+        ).fetchall()
+    finally:
+        conn.close()
+
+    recording = []
+    first = None
+    for row in rows:
+        reading = row_to_reading(row)
+        moment = datetime.fromisoformat(reading["timestamp"])
+        if first is None:
+            first = moment
+        recording.append(((moment - first).total_seconds(), reading))
+    return recording
+
+
+class HttpConnection:
+    """
+    Client HTTP/1.1 minimal sur les flux asyncio, avec connexion persistante.
+
+    Suffisant pour les réponses JSON du serveur (Content-Length); la
+    connexion est rouverte si le serveur la ferme (HTTP/1.0, Connection: close).
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def _connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self):
+        if self.writer:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+            self.reader = self.writer = None
+
+    async def post(self, path, body, content_type='application/json'):
+        """
+        Returns:
+            tuple: (code HTTP, corps de la réponse)
+        """
+        for attempt in range(2):
+            if self.writer is None:
+                await self._connect()
+            try:
+                self.writer.write(
+                    f"POST {path} HTTP/1.1\r\n"
+                    f"Host: {self.host}:{self.port}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"Connection: keep-alive\r\n\r\n".encode('ascii') + body
+                )
+                await self.writer.drain()
+                return await self._read_response()
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # Connexion persistante fermée par le serveur entre deux requêtes
+                await self.close()
+                if attempt:
+                    raise
+
+    async def _read_response(self):
+        status_line = await self.reader.readuntil(b'\r\n')
+        version, status = status_line.split(b' ', 2)[:2]
+        headers = {}
+        while True:
+            line = await self.reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if 'content-length' in headers:
+            body = await self.reader.readexactly(int(headers['content-length']))
+        else:
+            body = await self.reader.read()
+            headers['connection'] = 'close'
+
+        keep_alive = version == b'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+        if not keep_alive:
+            await self.close()
+        return int(status), body
+
+
+class ReplayStats:
+    """Résultats cumulés de tous les appareils."""
+
+    def __init__(self):
+        self.latencies = []
+        self.statuses = Counter()
+        self.readings_sent = 0
+        self.readings_accepted = 0
+        self.max_lag = 0.0
+
+    def report(self, elapsed, devices, speed):
+        latencies = np.array(self.latencies) * 1000
+        print(f"{devices} appareils à x{speed:g} du temps réel pendant {elapsed:.1f} s")
+        print(f"Requêtes: {len(latencies):,}  codes: {dict(self.statuses)}")
+        print(f"Lectures envoyées: {self.readings_sent:,}  acceptées: {self.readings_accepted:,}")
+        print(f"Débit d'ingestion: {self.readings_accepted / elapsed:,.1f} lectures/s")
+        if latencies.size:
+            p50, p99 = np.percentile(latencies, [50, 99])
+            print(f"Latence: p50 {p50:.1f} ms  p99 {p99:.1f} ms  max {latencies.max():.1f} ms")
+        print(f"Retard maximal sur le calendrier: {self.max_lag:.2f} s")
+
+
+async def post_readings(connection, path, messages, batch, stats):
+    """Envoie une lecture (/data) ou un lot (/data/batch) et cumule le résultat."""
+    body = json.dumps(messages if batch else messages[0]).encode('utf-8')
+    sent = time.perf_counter()
+    try:
+        status, response = await connection.post(path, body)
+    except (ConnectionError, OSError, asyncio.IncompleteReadError) as e:
+        stats.statuses[type(e).__name__] += 1
+        await asyncio.sleep(0.5)
+        return
+    stats.latencies.append(time.perf_counter() - sent)
+    stats.statuses[status] += 1
+    stats.readings_sent += len(messages)
+    if status == 200:
+        if batch:
+            stats.readings_accepted += len(json.loads(response).get("accepted", []))
+        else:
+            stats.readings_accepted += 1
+
+
+async def replay_device(device, readings, url, speed, batch, deadline, keep_timestamps, stats):
+    """
+    Envoie les lectures d'un appareil en respectant leur calendrier accéléré.
+
+    Le dernier lot incomplet (fin de l'enregistrement ou de la durée du
+    rejeu) est envoyé avant de fermer la connexion.
+    """
+    parts = urlsplit(url)
+    connection = HttpConnection(parts.hostname, parts.port or 80)
+    path = (parts.path.rstrip('/') or '') + ('/data/batch' if batch else '/data')
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    pending = []
+
+    try:
+        for offset, reading in readings:
+            due = start + offset / speed
+            now = loop.time()
+            if due > deadline:
+                break
+            if due > now:
+                await asyncio.sleep(due - now)
+            else:
+                stats.max_lag = max(stats.max_lag, now - due)
+
+            message = dict(reading)
+            if not keep_timestamps or "timestamp" not in message:
+                message["timestamp"] = datetime.now().isoformat()
+            message["device"] = device
+            pending.append(message)
+            if batch and len(pending) < batch:
+                continue
+            await post_readings(connection, path, pending, batch, stats)
+            pending = []
+        if pending:
+            await post_readings(connection, path, pending, batch, stats)
+    finally:
+        await connection.close()
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    random.seed(args.seed)  # Le simulateur utilise le générateur global
+    recording = load_recording(args.source) if args.source != 'simulator' else None
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + args.duration
+    stats = ReplayStats()
+    tasks = []
+    for device in range(args.devices):
+        if recording is not None:
+            readings = iter(recording)
+        else:
+            readings = simulator_readings(random.Random(rng.random()))
+        tasks.append(replay_device(
+            f"replay-{device}", readings, args.url, args.speed, args.batch,
+            deadline, args.keep_timestamps, stats
+        ))
+
+    started = time.perf_counter()
+    await asyncio.gather(*tasks)
+    stats.report(time.perf_counter() - started, args.devices, args.speed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rejeu de trajets vers le serveur à N fois le temps réel")
+    parser.add_argument('--url', default='http://localhost:5000', help="URL du serveur Flask")
+    parser.add_argument('--source', default='simulator', help="'simulator' ou chemin d'une base SQLite du Raspberry Pi")
+    parser.add_argument('--devices', type=int, default=10, help="Nombre d'appareils simulés")
+    parser.add_argument('--speed', type=float, default=1.0, help="Multiple du temps réel")
+    parser.add_argument('--duration', type=float, default=60, help="Durée maximale du rejeu en secondes")
+    parser.add_argument('--batch', type=int, default=0, help="Lectures par requête /data/batch (0: /data une par une)")
+    parser.add_argument('--keep-timestamps', action='store_true', help="Conserver les horodatages enregistrés")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
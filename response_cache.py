@@ -0,0 +1,374 @@
+"""
+Cache des réponses des API de lecture (/api/history, /api/road-history, /api/statistics).
+
+Une réponse est mise en cache sous une clé construite à partir du chemin et
+des paramètres normalisés (triés, valeurs vides ignorées sauf after,
+valeurs par défaut ajoutées, dates ISO réécrites): "/api/history" et
+"/api/history?limit=1000" partagent la même entrée, mais pas
+"/api/history?after=" (réponse paginée, de forme différente).
+
+Les entrées expirent après `ttl` secondes. Le backend mémoire évince aussi
+les moins récemment utilisées au-delà de max_entries (LRU). Chaque entrée
+garde sa fenêtre de données (start_date, end_date, ou le curseur after;
+None = non bornée). Une insertion (/data, /data/batch ou la file
+d'écriture différée) supprime seulement les entrées dont la fenêtre
+contient les lectures insérées.
+
+Chaque invalidation incrémente une génération. Une vue calculée pendant une
+invalidation peut contenir des données d'avant l'insertion: la réponse
+n'est enregistrée que si la génération n'a pas changé depuis le début du
+calcul (put(..., generation)).
+
+Chaque réponse porte un ETag (empreinte du corps): un navigateur qui
+renvoie If-None-Match reçoit un 304 sans corps.
+
+Backends:
+- MemoryBackend: dictionnaire LRU propre au processus. Avec plusieurs
+  workers, chacun a son cache, et une insertion ne l'invalide que dans le
+  worker qui l'a reçue (les autres attendent l'expiration du TTL).
+- RedisBackend: serveur Redis ou compatible (Valkey, KeyDB) partagé par
+  les workers, invalidation comprise. Nécessite le paquet redis (optionnel).
+  L'éviction LRU est confiée au serveur (maxmemory-policy allkeys-lru).
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from urllib.parse import urlencode
+from storage_tiers import parse_date
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# Paramètres dont la valeur est une date, normalisée dans la clé
+DATE_PARAMS = ('start_date', 'end_date')
+
+# Paramètres dont la présence change la réponse même avec une valeur vide
+# (after vide: première page au format paginé)
+PRESENCE_PARAMS = ('after',)
+
+
+def cache_key(path, args, defaults=None):
+    """
+    Clé de cache d'une requête.
+
+    Args:
+        path (str): Chemin de l'endpoint
+        args: Paramètres de la requête (request.args)
+        defaults (dict): Valeurs par défaut de l'endpoint (ex. {'limit': '1000'})
+    """
+    params = dict(defaults or {})
+    for name, value in args.items():
+        value = value.strip()
+        if value or name in PRESENCE_PARAMS:
+            params[name] = value
+    for name in DATE_PARAMS:
+        parsed = parse_date(params.get(name))
+        if parsed is not None:
+            params[name] = parsed.isoformat()
+    return f"{path}?{urlencode(sorted(params.items()))}"
+
+
+def request_window(args, hourly=False):
+    """
+    Plage de lectures dont dépend une réponse.
+
+    Args:
+        args: Paramètres de la requête (start_date, end_date, after)
+        hourly (bool): Réponse calculée par heure entière (statistiques horaires)
+
+    Returns:
+        tuple: (début, fin) en ISO, None pour une borne ouverte
+    """
+    start = parse_date(args.get('start_date'))
+    end = parse_date(args.get('end_date'))
+    # Page suivante: seules les lignes plus anciennes que le curseur comptent
+    cursor = parse_date(args.get('after', '').partition(',')[0])
+    if cursor is not None and (end is None or cursor < end):
+        end = cursor
+    if hourly:
+        if start is not None:
+            start = start.replace(minute=0, second=0, microsecond=0)
+        if end is not None:
+            end = end.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    return (start.isoformat() if start else None, end.isoformat() if end else None)
+
+
+def window_overlaps(window, first, last):
+    """Vrai si des lectures entre first et last (ISO) peuvent modifier une réponse de cette fenêtre."""
+    start, end = window
+    return (start is None or last >= start) and (end is None or first <= end)
+
+
+class MemoryBackend:
+    """Entrées en mémoire du processus, TTL et éviction LRU."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires, entry = item
+            if expires <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry, ttl, generation=None):
+        """Enregistre l'entrée, sauf si la génération a changé (retourne False)."""
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            self._entries[key] = (time.monotonic() + ttl, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def generation(self):
+        with self._lock:
+            return self._generation
+
+    def next_generation(self):
+        with self._lock:
+            self._generation += 1
+
+    def windows(self):
+        """(clé, fenêtre) de toutes les entrées."""
+        with self._lock:
+            return [(key, entry['window']) for key, (_, entry) in self._entries.items()]
+
+    def delete(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+
+class RedisBackend:
+    """
+    Entrées dans un serveur Redis partagé par les workers.
+
+    Chaque entrée est un hash (corps et métadonnées JSON) qui expire avec le
+    TTL. Un hash d'index associe chaque clé à sa fenêtre pour l'invalidation.
+    """
+
+    def __init__(self, url='redis://localhost:6379/0', prefix='road_monitor:cache:'):
+        if redis is None:
+            raise RuntimeError("redis is not installed")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.index = prefix + 'windows'
+        self.generation_key = prefix + 'generation'
+
+    def get(self, key):
+        values = self.client.hgetall(self.prefix + key)
+        if not values:
+            return None
+        entry = json.loads(values[b'meta'])
+        entry['window'] = tuple(entry['window'])
+        entry['body'] = values[b'body']
+        return entry
+
+    def set(self, key, entry, ttl, generation=None):
+        """Enregistre l'entrée, sauf si la génération a changé (retourne False)."""
+        meta = {name: value for name, value in entry.items() if name != 'body'}
+        with self.client.pipeline() as pipe:
+            try:
+                # Transaction annulée si une invalidation incrémente la génération entre-temps
+                pipe.watch(self.generation_key)
+                if generation is not None and int(pipe.get(self.generation_key) or 0) != generation:
+                    return False
+                pipe.multi()
+                pipe.hset(self.prefix + key, mapping={'meta': json.dumps(meta), 'body': entry['body']})
+                pipe.expire(self.prefix + key, ttl)
+                pipe.hset(self.index, key, json.dumps(entry['window']))
+                pipe.execute()
+            except redis.WatchError:
+                return False
+        return True
+
+    def generation(self):
+        return int(self.client.get(self.generation_key) or 0)
+
+    def next_generation(self):
+        self.client.incr(self.generation_key)
+
+    def windows(self):
+        """(clé, fenêtre) des entrées; l'index est purgé des clés expirées."""
+        index = {key.decode('utf-8'): tuple(json.loads(window)) for key, window in self.client.hgetall(self.index).items()}
+        if not index:
+            return []
+        pipe = self.client.pipeline()
+        for key in index:
+            pipe.exists(self.prefix + key)
+        expired = [key for key, exists in zip(index, pipe.execute()) if not exists]
+        if expired:
+            self.client.hdel(self.index, *expired)
+        return [(key, window) for key, window in index.items() if key not in expired]
+
+    def delete(self, keys):
+        if not keys:
+            return
+        pipe = self.client.pipeline()
+        pipe.delete(*(self.prefix + key for key in keys))
+        pipe.hdel(self.index, *keys)
+        pipe.execute()
+
+    def stats(self):
+        return {
+            'backend': 'redis',
+            'entries': self.client.hlen(self.index)
+        }
+
+
+def make_backend(name, max_entries=256, redis_url=None):
+    """Backend de cache d'après la configuration ('memory' ou 'redis')."""
+    if name == 'redis':
+        return RedisBackend(redis_url) if redis_url else RedisBackend()
+    if name == 'memory':
+        return MemoryBackend(max_entries)
+    raise ValueError(f"Unknown cache backend: {name}")
+
+
+class ResponseCache:
+    """Recherche, enregistrement et invalidation des réponses, avec métriques de succès."""
+
+    def __init__(self, backend, ttl=60):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+        # Métriques (par processus)
+        self._hits = 0
+        self._misses = 0
+        self._not_modified = 0
+        self._stored = 0
+        self._invalidated = 0
+        self._stale_fills = 0
+
+    def get(self, key):
+        """Entrée en cache, ou None."""
+        try:
+            entry = self.backend.get(key)
+        except Exception as e:
+            print(f"Error reading response cache: {e}")
+            entry = None
+        with self._lock:
+            if entry is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return entry
+
+    def generation(self):
+        """Génération courante, à relever avant de calculer une réponse à mettre en cache."""
+        try:
+            return self.backend.generation()
+        except Exception as e:
+            print(f"Error reading response cache generation: {e}")
+            return None
+
+    def put(self, key, body, content_type, headers, window, generation=None):
+        """
+        Enregistre une réponse.
+
+        Args:
+            generation: Valeur de generation() avant le calcul de la réponse; si
+                une invalidation a eu lieu depuis, la réponse n'est pas enregistrée
+
+        Returns:
+            dict: Entrée (body, content_type, headers, etag, window)
+        """
+        entry = {
+            'body': body,
+            'content_type': content_type,
+            'headers': headers,
+            'etag': hashlib.blake2b(body, digest_size=16).hexdigest(),
+            'window': window
+        }
+        try:
+            stored = self.backend.set(key, entry, self.ttl, generation)
+        except Exception as e:
+            print(f"Error writing response cache: {e}")
+            stored = False
+        with self._lock:
+            if stored:
+                self._stored += 1
+            elif generation is not None:
+                self._stale_fills += 1
+        return entry
+
+    def record_not_modified(self):
+        with self._lock:
+            self._not_modified += 1
+
+    def invalidate(self, timestamps):
+        """
+        Supprime les entrées dont la fenêtre contient des lectures insérées.
+
+        Args:
+            timestamps: Instants (datetime) des lectures insérées
+
+        Returns:
+            int: Nombre d'entrées supprimées
+        """
+        timestamps = [timestamp.isoformat() for timestamp in timestamps if timestamp is not None]
+        if not timestamps:
+            return 0
+        first, last = min(timestamps), max(timestamps)
+        try:
+            # Avant la suppression: un calcul en cours ne pourra plus enregistrer sa réponse
+            self.backend.next_generation()
+            stale = [key for key, window in self.backend.windows() if window_overlaps(window, first, last)]
+            self.backend.delete(stale)
+        except Exception as e:
+            print(f"Error invalidating response cache: {e}")
+            return 0
+        with self._lock:
+            self._invalidated += len(stale)
+        return len(stale)
+
+    def stats(self):
+        """Métriques pour /api/metrics."""
+        try:
+            backend = self.backend.stats()
+        except Exception as e:
+            backend = {'error': str(e)}
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else None,
+                'not_modified': self._not_modified,
+                'stored': self._stored,
+                'invalidated': self._invalidated,
+                'stale_fills': self._stale_fills,
+                'ttl': self.ttl,
+                'store': backend
+            }
@@ -0,0 +1,89 @@
+"""
+Découpage de la carte en cellules lat/lon pour /api/road-grid.
+
+Chaque lecture géolocalisée est comptée dans une cellule de base de
+GRID_CELL_SIZE degrés (table grille_routiere). Aux niveaux de zoom plus
+faibles, les cellules de base sont regroupées par blocs de 2^k, de sorte
+qu'une carte de toute la ville ne lit que quelques milliers de lignes
+d'agrégat, quel que soit le nombre de lectures brutes.
+"""
+import math
+
+# Taille d'une cellule de base en degrés (~55 m à l'équateur).
+# Ne pas modifier sans reconstruire grille_routiere (rebuild_statistics.py).
+GRID_CELL_SIZE = 0.0005
+
+# Nombre de cellules visées sur la largeur d'une tuile Google Maps de 256 px
+CELLS_PER_TILE = 32
+
+# Zoom à partir duquel les cellules de base sont servies telles quelles
+MAX_GRID_ZOOM = 22
+
+
+def cell_for(latitude, longitude):
+    """Retourne les indices (cell_y, cell_x) de la cellule de base d'un point."""
+    return (
+        math.floor(latitude / GRID_CELL_SIZE),
+        math.floor(longitude / GRID_CELL_SIZE)
+    )
+
+
+def factor_for_zoom(zoom):
+    """
+    Retourne le nombre de cellules de base (puissance de 2) regroupées par côté
+    pour un niveau de zoom Google Maps.
+    """
+    zoom = max(0, min(MAX_GRID_ZOOM, zoom))
+    # Largeur d'une tuile en degrés à ce zoom, divisée en CELLS_PER_TILE cellules
+    wanted = 360.0 / (2 ** zoom) / CELLS_PER_TILE
+    if wanted <= GRID_CELL_SIZE:
+        return 1
+    return 2 ** int(round(math.log2(wanted / GRID_CELL_SIZE)))
+
+
+def bbox_to_cells(south, west, north, east, factor):
+    """Convertit une emprise en plage d'indices de cellules de base alignée sur `factor`."""
+    min_y, min_x = cell_for(south, west)
+    max_y, max_x = cell_for(north, east)
+    # Étendre aux blocs entiers pour ne pas couper les cellules agrégées
+    min_y = (min_y // factor) * factor
+    min_x = (min_x // factor) * factor
+    max_y = (max_y // factor + 1) * factor - 1
+    max_x = (max_x // factor + 1) * factor - 1
+    return min_y, min_x, max_y, max_x
+
+
+def build_cells(rows, factor):
+    """
+    Assemble les lignes (gy, gx, road_condition, count) en cellules prêtes à servir.
+
+    La condition dominante est celle qui a le plus de lectures; en cas
+    d'égalité, la plus dégradée l'emporte.
+    """
+    severity = {'bad': 3, 'fair': 2, 'good': 1}
+    size = GRID_CELL_SIZE * factor
+    cells = {}
+    for gy, gx, road_condition, count in rows:
+        # FLOOR() renvoie un DECIMAL côté MySQL
+        gy, gx = int(gy), int(gx)
+        cell = cells.get((gy, gx))
+        if cell is None:
+            cell = cells[(gy, gx)] = {
+                'south': round(gy * size, 6),
+                'west': round(gx * size, 6),
+                'north': round((gy + 1) * size, 6),
+                'east': round((gx + 1) * size, 6),
+                'counts': {},
+                'total': 0
+            }
+        cell['counts'][road_condition] = cell['counts'].get(road_condition, 0) + int(count)
+        cell['total'] += int(count)
+
+    result = []
+    for cell in cells.values():
+        cell['dominant'] = max(
+            cell['counts'].items(),
+            key=lambda item: (item[1], severity.get(item[0], 0))
+        )[0]
+        result.append(cell)
+    return result
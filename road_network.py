@@ -0,0 +1,308 @@
+"""
+Réseau routier OpenStreetMap en cache local, chargé par mmap.
+
+import_osm() lit une seule fois un extrait OSM (.osm XML) ou une réponse
+Overpass (JSON) et écrit un répertoire de tableaux NumPy:
+
+- lat.npy, lon.npy: coordonnées des nœuds utilisés par les routes (float32)
+- way_offsets.npy, way_nodes.npy: nœuds de chaque route au format CSR (la
+  route i va de way_nodes[way_offsets[i]] à way_nodes[way_offsets[i + 1] - 1])
+- way_type.npy, way_name.npy: indices dans les listes types/names de meta.json
+- cell_keys.npy, cell_offsets.npy, cell_segments.npy: index spatial en grille
+  de NETWORK_CELL_SIZE degrés; un tronçon est identifié par la position k de
+  son premier nœud dans way_nodes (tronçon way_nodes[k] -> way_nodes[k + 1])
+
+RoadNetwork.load() ouvre ces fichiers en lecture seule par mmap: aucun appel
+réseau et quelques millisecondes de chargement, quelle que soit la taille
+du réseau. Les routes ont le même format que insert_data2.recuperer_routes_osm.
+"""
+import json
+import os
+import xml.etree.ElementTree as ET
+from array import array
+import numpy as np
+from road_segments import MAX_MATCH_DISTANCE, METERS_PER_DEGREE, search_rings
+
+# Version du format sur disque
+NETWORK_VERSION = 1
+
+# Taille des cellules de l'index spatial en degrés (~220 m, comme SEGMENT_CELL_SIZE)
+NETWORK_CELL_SIZE = 0.002
+
+# Répertoire par défaut du réseau importé (import_osm.py)
+OSM_NETWORK_DIR = 'osm_network'
+
+# Types de voies retenus (requête Overpass de insert_data2.py)
+HIGHWAY_TYPES = ('primary', 'secondary', 'tertiary', 'residential', 'unclassified', 'trunk', 'service', 'road')
+
+ARRAYS = ('lat', 'lon', 'way_offsets', 'way_nodes', 'way_type', 'way_name',
+          'cell_keys', 'cell_offsets', 'cell_segments')
+
+
+def _read_overpass_json(path):
+    """Retourne (ids des nœuds, lat, lon, routes) d'une réponse Overpass JSON."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    node_ids, lats, lons = array('q'), array('d'), array('d')
+    ways = []
+    for element in data.get('elements', []):
+        if element['type'] == 'node':
+            node_ids.append(element['id'])
+            lats.append(element['lat'])
+            lons.append(element['lon'])
+        elif element['type'] == 'way' and 'nodes' in element:
+            ways.append((element['nodes'], element.get('tags', {})))
+    return node_ids, lats, lons, ways
+
+
+def _read_osm_xml(path):
+    """Retourne (ids des nœuds, lat, lon, routes) d'un extrait .osm, lu en flux."""
+    node_ids, lats, lons = array('q'), array('d'), array('d')
+    ways = []
+    for _, element in ET.iterparse(path, events=('end',)):
+        if element.tag == 'node':
+            node_ids.append(int(element.get('id')))
+            lats.append(float(element.get('lat')))
+            lons.append(float(element.get('lon')))
+            element.clear()
+        elif element.tag == 'way':
+            refs = [int(nd.get('ref')) for nd in element.iter('nd')]
+            tags = {tag.get('k'): tag.get('v') for tag in element.iter('tag')}
+            ways.append((refs, tags))
+            element.clear()
+    return node_ids, lats, lons, ways
+
+
+def _build_cell_index(lat, lon, way_nodes, segments, cell_size):
+    """
+    Range les tronçons dans toutes les cellules couvertes par leur emprise.
+
+    Returns:
+        tuple: (meta de la grille, cell_keys, cell_offsets, cell_segments)
+    """
+    start, end = way_nodes[segments], way_nodes[segments + 1]
+    cy1 = np.floor(lat[start] / cell_size).astype(np.int64)
+    cy2 = np.floor(lat[end] / cell_size).astype(np.int64)
+    cx1 = np.floor(lon[start] / cell_size).astype(np.int64)
+    cx2 = np.floor(lon[end] / cell_size).astype(np.int64)
+    min_y, max_y = np.minimum(cy1, cy2), np.maximum(cy1, cy2)
+    min_x, max_x = np.minimum(cx1, cx2), np.maximum(cx1, cx2)
+
+    # Marge d'une cellule autour des tronçons; candidates() écarte les colonnes hors grille
+    origin_y, origin_x = int(min_y.min()) - 1, int(min_x.min()) - 1
+    width = int(max_x.max()) - origin_x + 2
+
+    # Une entrée par (tronçon, cellule couverte)
+    box_w = max_x - min_x + 1
+    counts = (max_y - min_y + 1) * box_w
+    owner = np.repeat(np.arange(segments.size), counts)
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    cy = min_y[owner] + local // box_w[owner]
+    cx = min_x[owner] + local % box_w[owner]
+    keys = (cy - origin_y) * width + (cx - origin_x)
+
+    order = np.argsort(keys, kind='stable')
+    cell_keys, first = np.unique(keys[order], return_index=True)
+    cell_offsets = np.append(first, order.size).astype(np.int64)
+    grid = {'cell_size': cell_size, 'origin': [origin_y, origin_x], 'width': width}
+    return grid, cell_keys, cell_offsets, segments[owner[order]].astype(np.int32)
+
+
+def import_osm(path, directory, highway_types=HIGHWAY_TYPES, cell_size=NETWORK_CELL_SIZE):
+    """
+    Convertit un extrait OSM (.osm) ou une réponse Overpass (.json) en réseau sur disque.
+
+    Returns:
+        dict: Contenu de meta.json
+    """
+    if path.endswith('.json'):
+        node_ids, lats, lons, ways = _read_overpass_json(path)
+    else:
+        node_ids, lats, lons, ways = _read_osm_xml(path)
+
+    node_ids = np.frombuffer(node_ids, dtype=np.int64)
+    order = np.argsort(node_ids)
+    sorted_ids = node_ids[order]
+
+    types, names = [], []
+    type_index, name_index = {}, {}
+    offsets, refs, way_type, way_name = [0], [], [], []
+    for way_refs, tags in ways:
+        highway = tags.get('highway')
+        if highway not in highway_types:
+            continue
+        way_refs = np.asarray(way_refs, dtype=np.int64)
+        position = np.searchsorted(sorted_ids, way_refs).clip(max=max(sorted_ids.size - 1, 0))
+        found = sorted_ids[position] == way_refs if sorted_ids.size else np.zeros(way_refs.size, bool)
+        # Nœuds absents de l'extrait (route coupée par l'emprise) ignorés, comme dans insert_data2.py
+        way_refs = order[position[found]]
+        if way_refs.size < 2:
+            continue
+        refs.append(way_refs)
+        offsets.append(offsets[-1] + way_refs.size)
+        way_type.append(type_index.setdefault(highway, len(types)))
+        if way_type[-1] == len(types):
+            types.append(highway)
+        name = tags.get('name')
+        if name is None:
+            way_name.append(-1)
+        else:
+            way_name.append(name_index.setdefault(name, len(names)))
+            if way_name[-1] == len(names):
+                names.append(name)
+
+    if not refs:
+        raise ValueError(f"Aucune route {'/'.join(highway_types)} dans {path}")
+
+    # Ne garder que les nœuds utilisés par les routes, renumérotés
+    all_refs = np.concatenate(refs)
+    used, way_nodes = np.unique(all_refs, return_inverse=True)
+    lat = np.frombuffer(lats, dtype=np.float64)[used].astype(np.float32)
+    lon = np.frombuffer(lons, dtype=np.float64)[used].astype(np.float32)
+    way_offsets = np.array(offsets, dtype=np.int64)
+    way_nodes = way_nodes.astype(np.int32)
+
+    # Tronçons: toutes les positions sauf le dernier nœud de chaque route
+    is_segment = np.ones(way_nodes.size, dtype=bool)
+    is_segment[way_offsets[1:] - 1] = False
+    segments = np.flatnonzero(is_segment)
+
+    grid, cell_keys, cell_offsets, cell_segments = _build_cell_index(
+        lat.astype(np.float64), lon.astype(np.float64), way_nodes, segments, cell_size
+    )
+
+    os.makedirs(directory, exist_ok=True)
+    arrays = {
+        'lat': lat, 'lon': lon,
+        'way_offsets': way_offsets, 'way_nodes': way_nodes,
+        'way_type': np.array(way_type, dtype=np.uint8),
+        'way_name': np.array(way_name, dtype=np.int32),
+        'cell_keys': cell_keys, 'cell_offsets': cell_offsets, 'cell_segments': cell_segments
+    }
+    for name, values in arrays.items():
+        np.save(os.path.join(directory, f"{name}.npy"), values)
+
+    meta = {
+        'version': NETWORK_VERSION,
+        'source': os.path.basename(path),
+        'nodes': int(lat.size),
+        'ways': int(way_offsets.size - 1),
+        'segments': int(segments.size),
+        'bbox': [float(lat.min()), float(lon.min()), float(lat.max()), float(lon.max())],
+        'grid': grid,
+        'types': types,
+        'names': names
+    }
+    # meta.json en dernier: un répertoire sans meta.json est un import interrompu
+    with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    return meta
+
+
+class RoadNetwork:
+    """Réseau routier en lecture seule, avec recherche du tronçon le plus proche."""
+
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        grid = meta['grid']
+        self.cell_size = grid['cell_size']
+        self.origin_y, self.origin_x = grid['origin']
+        self.width = grid['width']
+        self.types = meta['types']
+        self.names = meta['names']
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Ouvre un réseau écrit par import_osm (mmap en lecture seule par défaut)."""
+        with open(os.path.join(directory, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != NETWORK_VERSION:
+            raise ValueError(f"Version de réseau {meta.get('version')} non supportée, relancer import_osm.py")
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r' if mmap else None)
+            for name in ARRAYS
+        }
+        return cls(meta, arrays)
+
+    def __len__(self):
+        return self.way_offsets.size - 1
+
+    def way_name_of(self, way):
+        index = int(self.way_name[way])
+        return self.names[index] if index >= 0 else 'Unnamed'
+
+    def way_of(self, segment):
+        """Indice de la route d'un tronçon."""
+        return int(np.searchsorted(self.way_offsets, segment, side='right') - 1)
+
+    def way_points(self, way):
+        """Retourne les coordonnées (lat, lon) d'une route."""
+        nodes = self.way_nodes[self.way_offsets[way]:self.way_offsets[way + 1]]
+        return list(zip(self.lat[nodes].astype(np.float64).round(7).tolist(),
+                        self.lon[nodes].astype(np.float64).round(7).tolist()))
+
+    def routes(self):
+        """Routes au format de insert_data2.recuperer_routes_osm (nom, type, coordinates)."""
+        return [
+            {'nom': self.way_name_of(way), 'type': self.types[self.way_type[way]], 'coordinates': self.way_points(way)}
+            for way in range(len(self))
+        ]
+
+    def candidates(self, lat, lon, max_distance=MAX_MATCH_DISTANCE):
+        """Tronçons rangés dans les cellules à moins de max_distance mètres d'un point."""
+        cy = int(np.floor(lat / self.cell_size)) - self.origin_y
+        cx = int(np.floor(lon / self.cell_size)) - self.origin_x
+        rings_y, rings_x = search_rings(lat, max_distance, self.cell_size)
+        # Les colonnes hors de [0, width - 1] déborderaient sur la ligne voisine
+        x_min, x_max = max(cx - rings_x, 0), min(cx + rings_x, self.width - 1)
+        y_min = max(cy - rings_y, 0)
+        if x_min > x_max or y_min > cy + rings_y:
+            return np.empty(0, dtype=np.int32)
+        keys = np.array([y * self.width + x for y in range(y_min, cy + rings_y + 1)
+                         for x in range(x_min, x_max + 1)])
+        position = np.searchsorted(self.cell_keys, keys).clip(max=self.cell_keys.size - 1)
+        hits = position[self.cell_keys[position] == keys]
+        if not hits.size:
+            return np.empty(0, dtype=np.int32)
+        return np.unique(np.concatenate([
+            self.cell_segments[self.cell_offsets[p]:self.cell_offsets[p + 1]] for p in hits
+        ]))
+
+    def nearest(self, lat, lon, max_distance=MAX_MATCH_DISTANCE):
+        """
+        Tronçon le plus proche d'un point (même projection que point_segment_distance).
+
+        Returns:
+            tuple: (tronçon, distance en mètres), ou None si aucun tronçon
+                   n'est à moins de max_distance mètres
+        """
+        segments = self.candidates(lat, lon, max_distance)
+        if not segments.size:
+            return None
+        start = self.way_nodes[segments]
+        end = self.way_nodes[segments + 1]
+        scale_x = np.cos(np.radians(lat)) * METERS_PER_DEGREE
+        px, py = lon * scale_x, lat * METERS_PER_DEGREE
+        ax, ay = self.lon[start] * scale_x, self.lat[start] * METERS_PER_DEGREE
+        bx, by = self.lon[end] * scale_x, self.lat[end] * METERS_PER_DEGREE
+        dx, dy = bx - ax, by - ay
+        length_sq = dx * dx + dy * dy
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t = np.where(length_sq > 0, ((px - ax) * dx + (py - ay) * dy) / length_sq, 0.0).clip(0.0, 1.0)
+        distance = np.hypot(px - (ax + t * dx), py - (ay + t * dy))
+        best = int(np.argmin(distance))
+        if distance[best] > max_distance:
+            return None
+        return int(segments[best]), float(distance[best])
+
+    def segments(self):
+        """Tronçons au format de road_segments.segments_from_routes (pour Database.save_segments)."""
+        segments = []
+        for way in range(len(self)):
+            name = self.way_name_of(way)
+            points = self.way_points(way)
+            for start, end in zip(points, points[1:]):
+                segments.append({'name': name, 'start': start, 'end': end, 'source': 'osm'})
+        return segments
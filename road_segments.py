@@ -0,0 +1,134 @@
+"""
+Tronçons routiers et rattachement des lectures au tronçon le plus proche.
+
+Un tronçon est un segment [début, fin] d'une route. SegmentIndex range les
+tronçons dans une grille de cellules de SEGMENT_CELL_SIZE degrés: pour une
+lecture, seuls les tronçons des cellules à moins de max_distance mètres sont
+comparés (3x3 près de l'équateur, davantage en longitude aux hautes
+latitudes), ce qui rend le rattachement indépendant du nombre total de
+tronçons.
+"""
+import math
+
+# Taille des cellules de l'index spatial en degrés (~220 m)
+SEGMENT_CELL_SIZE = 0.002
+
+# Distance maximale en mètres entre une lecture et son tronçon
+MAX_MATCH_DISTANCE = 150.0
+
+# Mètres par degré de latitude
+METERS_PER_DEGREE = 111320.0
+
+
+def search_rings(lat, max_distance, cell_size=SEGMENT_CELL_SIZE):
+    """
+    Nombre de cellules à parcourir de part et d'autre d'un point pour couvrir
+    max_distance mètres.
+
+    Une cellule mesure cell_size degrés, soit ~220 m en latitude mais
+    seulement ~220 * cos(latitude) m en longitude: au-delà de ~47° elle fait
+    moins de 150 m et une seule cellule voisine ne suffit plus.
+
+    Returns:
+        tuple: (cellules en latitude, cellules en longitude)
+    """
+    # Plancher sur le cosinus pour rester borné près des pôles
+    scale_x = max(math.cos(math.radians(lat)), 0.01)
+    rings_y = max(1, math.ceil(max_distance / (cell_size * METERS_PER_DEGREE)))
+    rings_x = max(1, math.ceil(max_distance / (cell_size * scale_x * METERS_PER_DEGREE)))
+    return rings_y, rings_x
+
+
+def point_segment_distance(lat, lon, start, end):
+    """
+    Distance approximative en mètres entre un point et un segment.
+
+    Projection équirectangulaire locale, suffisante à l'échelle d'une ville.
+    """
+    scale_x = math.cos(math.radians(lat)) * METERS_PER_DEGREE
+    px, py = lon * scale_x, lat * METERS_PER_DEGREE
+    ax, ay = start[1] * scale_x, start[0] * METERS_PER_DEGREE
+    bx, by = end[1] * scale_x, end[0] * METERS_PER_DEGREE
+
+    dx, dy = bx - ax, by - ay
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        t = 0.0
+    else:
+        t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length_sq))
+    cx, cy = ax + t * dx, ay + t * dy
+    return math.hypot(px - cx, py - cy)
+
+
+def segments_from_routes(routes, source='simulator'):
+    """
+    Découpe des routes au format de insert_data.py (nom, points) ou de
+    insert_data2.py (nom, coordinates) en tronçons.
+
+    Returns:
+        list: Dictionnaires {name, start, end, source}
+    """
+    segments = []
+    for route in routes:
+        points = route.get('points') or route.get('coordinates') or []
+        for start, end in zip(points, points[1:]):
+            segments.append({
+                'name': route.get('nom', 'Unnamed'),
+                'start': tuple(start),
+                'end': tuple(end),
+                'source': source
+            })
+    return segments
+
+
+class SegmentIndex:
+    """Index spatial en grille des tronçons pour le rattachement des lectures."""
+
+    def __init__(self, segments, max_distance=MAX_MATCH_DISTANCE):
+        """
+        Args:
+            segments (list): Dictionnaires {id, start, end, ...}
+            max_distance (float): Distance maximale de rattachement en mètres
+        """
+        self.max_distance = max_distance
+        self.segments = {}
+        self._cells = {}
+        for segment in segments:
+            self.add(segment)
+
+    def __len__(self):
+        return len(self.segments)
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / SEGMENT_CELL_SIZE), math.floor(lon / SEGMENT_CELL_SIZE))
+
+    def add(self, segment):
+        """Ajoute un tronçon dans toutes les cellules couvertes par son emprise."""
+        self.segments[segment['id']] = segment
+        (lat1, lon1), (lat2, lon2) = segment['start'], segment['end']
+        min_y, min_x = self._cell(min(lat1, lat2), min(lon1, lon2))
+        max_y, max_x = self._cell(max(lat1, lat2), max(lon1, lon2))
+        for cy in range(min_y, max_y + 1):
+            for cx in range(min_x, max_x + 1):
+                self._cells.setdefault((cy, cx), []).append(segment['id'])
+
+    def nearest(self, lat, lon):
+        """
+        Retourne l'id du tronçon le plus proche d'un point, ou None si aucun
+        tronçon n'est à moins de max_distance mètres.
+        """
+        cy, cx = self._cell(lat, lon)
+        rings_y, rings_x = search_rings(lat, self.max_distance)
+        best_id, best_distance = None, self.max_distance
+        seen = set()
+        for dy in range(-rings_y, rings_y + 1):
+            for dx in range(-rings_x, rings_x + 1):
+                for segment_id in self._cells.get((cy + dy, cx + dx), ()):
+                    if segment_id in seen:
+                        continue
+                    seen.add(segment_id)
+                    segment = self.segments[segment_id]
+                    distance = point_segment_distance(lat, lon, segment['start'], segment['end'])
+                    if distance <= best_distance:
+                        best_id, best_distance = segment_id, distance
+        return best_id
@@ -0,0 +1,108 @@
+"""Itinéraires simulés (Gare Centrale <-> Aéroport) partagés par le générateur et les tronçons."""
+
+# Itinéraire Aller : Gare Centrale -> Aéroport
+ROUTE_ALLER = [
+    # Boulevard du 30 Juin (Centre-ville)
+    {
+        'nom': 'Boulevard du 30 Juin',
+        'points': [
+            (-4.3250, 15.3100),
+            (-4.3300, 15.3250),
+            (-4.3400, 15.3500)
+        ],
+        'largeur': 0.15,
+        'etat': 'good'
+    },
+    # Boulevard Triomphal (Zone rénovée)
+    {
+        'nom': 'Boulevard Triomphal',
+        'points': [
+            (-4.3400, 15.3500),
+            (-4.3500, 15.3650),
+            (-4.3600, 15.3800)
+        ],
+        'largeur': 0.18,
+        'etat': 'good'
+    },
+    # Boulevard Lumumba (Artère secondaire)
+    {
+        'nom': 'Boulevard Lumumba',
+        'points': [
+            (-4.3600, 15.3800),
+            (-4.3750, 15.4000),
+            (-4.3850, 15.4200)
+        ],
+        'largeur': 0.20,
+        'etat': 'fair'
+    },
+    # Route des Poids Lourds (Zone industrielle)
+    {
+        'nom': 'Route des Poids Lourds',
+        'points': [
+            (-4.3850, 15.4200),
+            (-4.3900, 15.4350),
+            (-4.3833, 15.4417)  # Aéroport
+        ],
+        'largeur': 0.25,
+        'etat': 'fair'
+    }
+]
+
+# Itinéraire Retour : Aéroport -> Gare Centrale
+ROUTE_RETOUR = [
+    # Route de la Libération (ex 24 Novembre)
+    {
+        'nom': 'Route de la Libération',
+        'points': [
+            (-4.3833, 15.4417),
+            (-4.3950, 15.4300),
+            (-4.4050, 15.4100)
+        ],
+        'largeur': 0.22,
+        'etat': 'fair'
+    },
+    # Avenue Kabinda (Zone dégradée)
+    {
+        'nom': 'Avenue Kabinda',
+        'points': [
+            (-4.4050, 15.4100),
+            (-4.4150, 15.3900),
+            (-4.4250, 15.3700)
+        ],
+        'largeur': 0.18,
+        'etat': 'bad'
+    },
+    # Avenue Nyangwe (Prolongement dégradé)
+    {
+        'nom': 'Avenue Nyangwe',
+        'points': [
+            (-4.4250, 15.3700),
+            (-4.4100, 15.3500),
+            (-4.3950, 15.3300)
+        ],
+        'largeur': 0.15,
+        'etat': 'bad'
+    },
+    # Boulevard Sendwe (Artère secondaire)
+    {
+        'nom': 'Boulevard Sendwe',
+        'points': [
+            (-4.3950, 15.3300),
+            (-4.3800, 15.3150),
+            (-4.3650, 15.3000)
+        ],
+        'largeur': 0.16,
+        'etat': 'fair'
+    },
+    # Avenue de la Démocratie (Retour vers centre)
+    {
+        'nom': 'Avenue de la Démocratie',
+        'points': [
+            (-4.3650, 15.3000),
+            (-4.3500, 15.2900),
+            (-4.3250, 15.3100)  # Gare Centrale
+        ],
+        'largeur': 0.14,
+        'etat': 'bad'
+    }
+]
@@ -15,19 +15,38 @@ NC='\033[0m' # No Color
 
 # Nom de l'application
 APP_NAME="sensor_monitor"
-SCRIPT_NAME="Jean.py"
+SCRIPT_NAME="Jean_autostart.py"
+
+# Modules importés par Jean_autostart.py, à placer dans le même répertoire
+PI_MODULES="vibration.py accel_sampler.py local_database.py wire_format.py sync_scheduler.py gps_reader.py"
 
 # Obtenir le chemin absolu du répertoire courant
 CURRENT_DIR=$(pwd)
 SCRIPT_PATH="$CURRENT_DIR/$SCRIPT_NAME"
 
-# Vérifier si le script existe
-if [ ! -f "$SCRIPT_PATH" ]; then
-    echo -e "${RED}Erreur: Le fichier $SCRIPT_NAME n'existe pas dans le répertoire courant.${NC}"
-    echo -e "Veuillez placer ce script d'installation dans le même répertoire que $SCRIPT_NAME."
-    exit 1
+# Répertoire source optionnel (copie du dépôt): les fichiers y sont copiés ici
+# Usage: ./setup_sensor_monitor.sh [/chemin/vers/road-condition-monitor]
+SOURCE_DIR="$1"
+if [ -n "$SOURCE_DIR" ]; then
+    echo -e "${YELLOW}Copie des fichiers depuis $SOURCE_DIR...${NC}"
+    for FILE in $SCRIPT_NAME $PI_MODULES; do
+        if ! cp "$SOURCE_DIR/$FILE" "$CURRENT_DIR/"; then
+            echo -e "${RED}Erreur: Impossible de copier $FILE depuis $SOURCE_DIR.${NC}"
+            exit 1
+        fi
+    done
 fi
 
+# Vérifier si le script et ses modules existent
+for FILE in $SCRIPT_NAME $PI_MODULES; do
+    if [ ! -f "$CURRENT_DIR/$FILE" ]; then
+        echo -e "${RED}Erreur: Le fichier $FILE n'existe pas dans le répertoire courant.${NC}"
+        echo -e "Copiez $SCRIPT_NAME et ses modules ($PI_MODULES) dans ce répertoire,"
+        echo -e "ou indiquez le répertoire du dépôt: ./setup_sensor_monitor.sh /chemin/vers/le/depot"
+        exit 1
+    fi
+done
+
 echo -e "${BLUE}=== Installation du moniteur de capteurs Raspberry Pi ===${NC}"
 echo -e "${YELLOW}Ce script va configurer votre application pour démarrer automatiquement au démarrage.${NC}"
 echo ""
@@ -46,7 +65,7 @@ fi
 
 # Installer les bibliothèques Python nécessaires
 echo -e "${YELLOW}Installation des bibliothèques Python...${NC}"
-pip3 install smbus2 pyserial requests
+pip3 install smbus2 pyserial requests numpy
 
 echo -e "${GREEN}Dépendances installées avec succès.${NC}"
 echo ""
@@ -0,0 +1,70 @@
+"""
+Simulateur de trajets et d'accéléromètre le long des itinéraires de routes.py.
+
+Utilisé par insert_data.py pour générer des données et par les outils de
+test (classification des vibrations, rejeu).
+"""
+import random
+from math import sin, cos, radians, sqrt
+from routes import ROUTE_ALLER, ROUTE_RETOUR
+
+# Paramètres généraux
+PLAGE_ALTITUDE = (275.0, 285.0)
+PLAGE_SATELLITES = (6, 9)
+VARIATION_GPS = 0.0002  # 20m de variation
+DUREE_TRAJET = 45  # Minutes pour un trajet complet
+
+def distance_gps(point1, point2):
+    """Calcule la distance en km entre deux points GPS"""
+    lat1, lon1 = point1
+    lat2, lon2 = point2
+    return sqrt((lat2-lat1)**2 + (lon2-lon1)**2) * 111
+
+def generer_chemin_continu():
+    """Génère un trajet continu avec aller-retour alternés"""
+    while True:
+        # 50% de chances de prendre l'aller ou le retour
+        if random.random() < 0.5:
+            for segment in ROUTE_ALLER:
+                yield from parcourir_segment(segment)
+        else:
+            for segment in ROUTE_RETOUR:
+                yield from parcourir_segment(segment)
+
+def parcourir_segment(segment):
+    """Parcourt un segment routier avec variation réaliste"""
+    points = segment['points']
+    etat = segment['etat']
+    largeur = segment['largeur']
+    
+    for i in range(len(points)-1):
+        a = points[i]
+        b = points[i+1]
+        distance = distance_gps(a, b)
+        steps = int(distance / 0.2)  # 200m entre chaque point
+        
+        for _ in range(steps):
+            t = random.random()
+            lat = a[0] + t*(b[0]-a[0])
+            lon = a[1] + t*(b[1]-a[1])
+            
+            # Variation latérale
+            angle = random.uniform(-90, 90)
+            lat += (largeur/2 * 0.009) * sin(radians(angle)) * random.uniform(-1,1)
+            lon += (largeur/2 * 0.009) * cos(radians(angle)) * random.uniform(-1,1)
+            
+            yield (round(lat,6), round(lon,6)), etat
+
+def accelerometre_realiste(etat):
+    """Simule des données d'accéléromètre selon l'état de la route"""
+    base = {
+        'good': {'x': -1200, 'y': -13800, 'z': -7400},
+        'fair': {'x': -2000, 'y': -14300, 'z': -7700},
+        'bad': {'x': -3200, 'y': -15200, 'z': -8100}
+    }[etat]
+    
+    return {
+        'x': base['x'] + random.randint(-150, 150),
+        'y': base['y'] + random.randint(-200, 200),
+        'z': base['z'] + random.randint(-150, 150)
+    }
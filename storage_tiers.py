@@ -0,0 +1,130 @@
+"""
+Partitionnement de donnees_routieres et choix du niveau de détail.
+
+Les lectures brutes sont rangées dans des partitions RANGE COLUMNS(timestamp)
+de PARTITION_MONTHS mois, nommées pAAAAMM d'après leur premier mois, plus une
+partition p_future (MAXVALUE) qui reçoit tout ce qui dépasse la dernière
+borne. Database.ensure_partitions() crée les partitions à l'avance en
+découpant p_future.
+
+Les lectures sont aussi résumées à la minute par appareil dans
+donnees_minute, à chaque insertion (Database._update_minutes) et par
+Database.rollup_minutes pour les lectures écrites directement en base
+(generate_data.py, imports). Au-delà de RAW_RETENTION_MONTHS,
+apply_retention() résume une dernière fois les partitions brutes puis les
+supprime (DROP PARTITION, instantané quelle que soit leur taille).
+
+Les API d'historique lisent la table brute tant qu'elle couvre la plage
+demandée, et donnees_minute pour les plages qui commencent avant les
+données brutes conservées (choose_tier). Le niveau minute peut aussi être
+demandé explicitement (paramètre tier).
+"""
+from datetime import datetime, timedelta
+
+# Nombre de mois par partition
+PARTITION_MONTHS = 1
+
+# Partitions créées à l'avance au-delà du mois courant
+PARTITION_MONTHS_AHEAD = 3
+
+# Durée de conservation des lectures brutes
+RAW_RETENTION_MONTHS = 6
+
+# Fenêtre recalculée à chaque résumé à la minute (lectures envoyées en retard par le Pi)
+ROLLUP_LOOKBACK = timedelta(days=2)
+
+# Nom de la partition sans borne supérieure
+FUTURE_PARTITION = 'p_future'
+
+# Niveaux de détail
+RAW_TIER = 'raw'
+MINUTE_TIER = 'minute'
+
+
+def month_start(value):
+    """Premier instant du mois de `value`."""
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(value, months):
+    """Ajoute des mois à un premier du mois."""
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(start):
+    """Nom de la partition qui commence à `start`."""
+    return f"p{start:%Y%m}"
+
+
+def parse_bound(description):
+    """
+    Convertit PARTITION_DESCRIPTION (information_schema) en datetime.
+
+    Returns:
+        datetime: Borne supérieure exclue, ou None pour MAXVALUE
+    """
+    description = description.strip().strip("'")
+    if description.upper() == 'MAXVALUE':
+        return None
+    return datetime.fromisoformat(description)
+
+
+def partitions_to_create(last_bound, first_data, now, months=PARTITION_MONTHS, ahead=PARTITION_MONTHS_AHEAD):
+    """
+    Bornes des partitions à ajouter avant p_future.
+
+    Args:
+        last_bound (datetime): Borne de la dernière partition bornée, ou None
+        first_data (datetime): Plus ancienne lecture (pour le premier découpage), ou None
+        now (datetime): Instant courant
+
+    Returns:
+        list: (nom, borne supérieure exclue) dans l'ordre
+    """
+    target = add_months(month_start(now), ahead + 1)
+    if last_bound is None:
+        start = month_start(min(first_data, now) if first_data else now)
+    else:
+        start = last_bound
+    partitions = []
+    while start < target:
+        end = add_months(start, months)
+        partitions.append((partition_name(start), end))
+        start = end
+    return partitions
+
+
+def retention_cutoff(now, retention_months=RAW_RETENTION_MONTHS):
+    """Les partitions dont la borne supérieure est antérieure ou égale sont supprimées."""
+    return add_months(month_start(now), -retention_months)
+
+
+def parse_date(value):
+    """Date ISO d'un paramètre d'API, ou None si absente ou illisible."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def choose_tier(start_date, end_date, raw_since):
+    """
+    Niveau de détail d'une requête d'historique.
+
+    Args:
+        start_date, end_date (str): Bornes ISO de la requête (facultatives)
+        raw_since (datetime): Plus ancienne lecture brute conservée, ou None
+
+    Returns:
+        str: RAW_TIER ou MINUTE_TIER
+    """
+    start = parse_date(start_date)
+    if start is None:
+        # Les dernières lectures: toujours dans la table brute
+        return RAW_TIER
+    if raw_since is not None and start < raw_since:
+        return MINUTE_TIER
+    return RAW_TIER
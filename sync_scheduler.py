@@ -0,0 +1,207 @@
+"""
+Planification de la synchronisation du tampon local vers le serveur.
+
+Une seule session HTTP (connexions keep-alive réutilisées) sert à tous les
+envois. Il n'y a plus de requête de test de connexion: un envoi réussi
+prouve que le serveur est joignable. Tant que le backlog n'est pas vide,
+les lots partent l'un après l'autre sans attente; si le serveur est
+injoignable, l'attente double à chaque échec (backoff exponentiel), avec
+une part aléatoire pour que les appareils ne se synchronisent pas tous au
+même instant au retour du serveur.
+
+Un enregistrement que le serveur déclare invalide reste en tête du
+backlog; après max_rejections refus il est mis de côté
+(LocalDatabase.mark_as_rejected) pour ne pas ralentir indéfiniment la
+vidange du backlog. Les refus temporaires (file d'écriture pleine) et les
+échecs du lot entier ne comptent pas: ils sont simplement réessayés.
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def make_session(pool_size=2):
+    """Crée une session HTTP dont les connexions sont conservées entre les envois."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class SyncScheduler:
+    """
+    Décide quand envoyer le prochain lot et tient les métriques de synchronisation.
+
+    `send_batch(items, session)` doit retourner (IDs acceptés, IDs refusés
+    comme invalides), ou None si le lot n'a pas été traité (erreur réseau,
+    réponse autre que 200), ce qui déclenche le backoff. Les autres
+    enregistrements (refus temporaire) restent dans le backlog.
+    """
+
+    def __init__(self, db, send_batch, batch_size=500, idle_interval=30,
+                 base_backoff=2, max_backoff=300, metrics_path=None, max_rejections=3):
+        """
+        Args:
+            db: LocalDatabase à vider
+            send_batch: Fonction d'envoi d'un lot (voir ci-dessus)
+            batch_size (int): Nombre d'enregistrements par requête
+            idle_interval (float): Attente en secondes quand le backlog est vide
+            base_backoff (float): Première attente après un échec
+            max_backoff (float): Attente maximale entre deux tentatives
+            metrics_path (str): Fichier JSON où écrire les métriques (optionnel)
+            max_rejections (int): Refus pour données invalides avant de mettre un enregistrement de côté
+        """
+        self.db = db
+        self.send_batch = send_batch
+        self.batch_size = batch_size
+        self.idle_interval = idle_interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.metrics_path = metrics_path
+        self.max_rejections = max_rejections
+        self.session = make_session()
+        self._rejections = {}           # id local -> nombre de refus (en mémoire)
+        self._stop = threading.Event()
+
+        self.connected = False
+        self.failures = 0               # Échecs consécutifs
+        self.last_success = None        # time.time() du dernier envoi réussi
+        self.last_attempt = None
+        self.next_delay = 0.0
+        self.records_sent = 0
+        self.batches_sent = 0
+        self.records_rejected = 0
+
+    def backoff_delay(self):
+        """Attente après `failures` échecs consécutifs: exponentielle plafonnée, moitié aléatoire."""
+        delay = min(self.max_backoff, self.base_backoff * (2 ** (self.failures - 1)))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def run_once(self):
+        """
+        Envoie au plus un lot et retourne l'attente avant le prochain.
+
+        Returns:
+            float: Délai en secondes (0 si le backlog doit continuer à être vidé)
+        """
+        items = self.db.get_unsynced_data(limit=self.batch_size)
+        if not items:
+            self.next_delay = self.idle_interval
+            return self.next_delay
+
+        self.last_attempt = time.time()
+        result = self.send_batch(items, self.session)
+
+        if result is None:
+            self.connected = False
+            self.failures += 1
+            self.next_delay = self.backoff_delay()
+            logging.warning(f"Serveur injoignable ({self.failures} échec(s)), nouvel essai dans {self.next_delay:.1f} s")
+            return self.next_delay
+
+        accepted_ids, invalid_ids = result
+        self.connected = True
+        self.failures = 0
+        self.last_success = self.last_attempt
+        self.batches_sent += 1
+        if accepted_ids:
+            self.db.mark_as_synced(accepted_ids)
+            self.records_sent += len(accepted_ids)
+        quarantined = self.record_rejections(accepted_ids, invalid_ids)
+        deferred = len(items) - len(accepted_ids) - len(invalid_ids)
+
+        if quarantined:
+            # La tête du backlog a changé: on continue tout de suite
+            self.next_delay = 0.0
+        elif deferred > 0:
+            # Serveur occupé (file d'écriture pleine): courte attente avant de réessayer
+            self.next_delay = self.base_backoff
+        elif not accepted_ids or len(items) < self.batch_size:
+            # Lot entièrement refusé (on ne boucle pas dessus) ou dernier lot du backlog
+            self.next_delay = self.idle_interval
+        else:
+            self.next_delay = 0.0
+        return self.next_delay
+
+    def record_rejections(self, accepted_ids, invalid_ids):
+        """
+        Compte les refus pour données invalides de chaque enregistrement et
+        met de côté ceux refusés max_rejections fois.
+
+        Returns:
+            list: IDs mis de côté
+        """
+        for record_id in accepted_ids:
+            self._rejections.pop(record_id, None)
+        quarantined = []
+        for record_id in invalid_ids:
+            count = self._rejections.get(record_id, 0) + 1
+            if count >= self.max_rejections:
+                self._rejections.pop(record_id, None)
+                quarantined.append(record_id)
+            else:
+                self._rejections[record_id] = count
+        if quarantined:
+            self.db.mark_as_rejected(quarantined)
+            self.records_rejected += len(quarantined)
+        return quarantined
+
+    def metrics(self):
+        """
+        Returns:
+            dict: Taille du backlog, retard de synchronisation (âge du plus
+                  ancien enregistrement non envoyé) et état de la connexion
+        """
+        backlog, oldest = self.db.get_backlog_stats()
+        lag = None
+        if oldest:
+            try:
+                lag = max(0.0, (datetime.now() - datetime.fromisoformat(oldest)).total_seconds())
+            except ValueError:
+                lag = None
+        return {
+            'backlog': backlog,
+            'sync_lag_seconds': lag,
+            'connected': self.connected,
+            'consecutive_failures': self.failures,
+            'seconds_since_success': time.time() - self.last_success if self.last_success else None,
+            'next_delay_seconds': self.next_delay,
+            'records_sent': self.records_sent,
+            'batches_sent': self.batches_sent,
+            'records_rejected': self.records_rejected
+        }
+
+    def write_metrics(self):
+        """
+        Écrit les métriques dans metrics_path (remplacement atomique).
+
+        Returns:
+            dict: Les métriques écrites
+        """
+        metrics = self.metrics()
+        metrics['updated_at'] = datetime.now().isoformat()
+        if not self.metrics_path:
+            return metrics
+        tmp_path = self.metrics_path + '.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(metrics, f)
+            os.replace(tmp_path, self.metrics_path)
+        except OSError as e:
+            logging.error(f"Erreur lors de l'écriture des métriques de synchronisation: {e}")
+        return metrics
+
+    def wait(self, delay):
+        """Attend `delay` secondes; retourne True si stop() a été appelé entre-temps."""
+        return self._stop.wait(delay)
+
+    def stop(self):
+        self._stop.set()
+        self.session.close()
@@ -0,0 +1,257 @@
+"""
+Classification de l'état de la route à partir des vibrations de l'accéléromètre.
+
+Partagé par le serveur (app.py, database.py) et le Raspberry Pi
+(Jean_autostart.py) pour que les deux appliquent les mêmes règles.
+
+Deux modes:
+- classify_sample: ancien seuil sur une seule valeur |y| (lectures sans fenêtre)
+- WindowedClassifier / window_features: caractéristiques sur une fenêtre
+  glissante d'échantillons (RMS, crête-à-crête, variance, énergie de bande)
+
+La classification par fenêtre porte sur l'écart-type (racine de la
+variance, moyenne retirée) et le crête-à-crête: le RMS brut contient la
+gravité et l'orientation du capteur, pas seulement les vibrations.
+"""
+import math
+from collections import deque
+import numpy as np
+
+# Constantes pour la conversion des valeurs brutes en m/s²
+# Le MPU-6050 a une sensibilité de 16384 LSB/g en mode ±2g
+ACCEL_SCALE_FACTOR = 16384.0  # LSB/g
+GRAVITY = 9.81  # m/s²
+
+# Seuils historiques sur une seule valeur brute |y|
+SAMPLE_FAIR_THRESHOLD = 10000
+SAMPLE_BAD_THRESHOLD = 15000
+
+# Seuils sur l'écart-type de y (unité brute, gravité retirée), d'après les
+# niveaux de confort de l'ISO 2631-1 pour l'accélération efficace ressentie
+# dans un véhicule: 0,8 m/s² "inconfortable", 1,6 m/s² "très inconfortable"
+STD_FAIR_THRESHOLD = 0.8 * ACCEL_SCALE_FACTOR / GRAVITY   # ~1336
+STD_BAD_THRESHOLD = 1.6 * ACCEL_SCALE_FACTOR / GRAVITY    # ~2672
+
+# Seuils sur l'amplitude crête-à-crête de y (unité brute): ~0.25 g et ~0.5 g
+PTP_FAIR_THRESHOLD = 4000
+PTP_BAD_THRESHOLD = 8000
+
+# Taille de fenêtre par défaut (échantillons)
+DEFAULT_WINDOW = 32
+
+
+def convert_to_ms2(raw_value):
+    """Convertit une valeur brute de l'accéléromètre (LSB) en m/s²."""
+    return (raw_value / ACCEL_SCALE_FACTOR) * GRAVITY
+
+
+def to_raw(value):
+    """Ramène une valeur d'accéléromètre en unité brute (LSB) si elle est en m/s²."""
+    if value is None:
+        return None
+    if abs(value) < 100:  # Si la valeur est petite, c'est probablement en m/s²
+        return value * ACCEL_SCALE_FACTOR / GRAVITY
+    return value
+
+
+def classify_sample(y_raw):
+    """Classe une seule valeur brute |y| avec les seuils historiques."""
+    y_accel = abs(y_raw)
+    if y_accel > SAMPLE_BAD_THRESHOLD:
+        return 'bad'
+    elif y_accel > SAMPLE_FAIR_THRESHOLD:
+        return 'fair'
+    return 'good'
+
+
+def classify_features(std, ptp):
+    """Classe une fenêtre à partir de son écart-type (sqrt(variance)) et de son amplitude crête-à-crête."""
+    if std > STD_BAD_THRESHOLD or ptp > PTP_BAD_THRESHOLD:
+        return 'bad'
+    elif std > STD_FAIR_THRESHOLD or ptp > PTP_FAIR_THRESHOLD:
+        return 'fair'
+    return 'good'
+
+
+def classify_reading(data):
+    """
+    Détermine l'état de la route d'une lecture reçue par le serveur.
+
+    Si l'appareil a joint des caractéristiques de fenêtre (clé 'vibration'
+    avec 'variance' et 'ptp'), elles sont utilisées; sinon on retombe sur le
+    seuil historique appliqué à y_raw (ou à y reconverti en unité brute).
+
+    Returns:
+        str: 'good', 'fair', 'bad' ou None si la lecture n'a pas d'accéléromètre
+    """
+    vibration = data.get('vibration')
+    if vibration and vibration.get('variance') is not None and vibration.get('ptp') is not None:
+        return classify_features(math.sqrt(max(vibration['variance'], 0.0)), vibration['ptp'])
+
+    accel = data.get('accelerometer')
+    if not accel:
+        return None
+    if accel.get('y_raw') is not None:
+        y_raw = accel['y_raw']
+    elif accel.get('y') is not None:
+        y_raw = to_raw(accel['y'])
+    else:
+        return None
+    return classify_sample(y_raw)
+
+
+def band_energy(samples, sample_rate, low, high):
+    """
+    Énergie du signal (hors composante continue) dans la bande [low, high] Hz.
+
+    Args:
+        samples: Échantillons de la fenêtre (ordre chronologique)
+        sample_rate (float): Fréquence d'échantillonnage en Hz
+    """
+    samples = np.asarray(samples, dtype=np.float64)
+    if samples.size < 2:
+        return 0.0
+    spectrum = np.fft.rfft(samples - samples.mean())
+    freqs = np.fft.rfftfreq(samples.size, d=1.0 / sample_rate)
+    mask = (freqs >= low) & (freqs <= high)
+    return float(np.sum(np.abs(spectrum[mask]) ** 2) / samples.size)
+
+
+def window_features(samples, window=DEFAULT_WINDOW):
+    """
+    Calcule les caractéristiques de toutes les fenêtres glissantes d'un signal.
+
+    Version vectorisée pour le traitement en masse (rejeu, benchmark): les
+    sommes cumulées donnent moyenne/variance/RMS en O(n), les min/max
+    utilisent une vue glissante sans copie.
+
+    Returns:
+        dict: Tableaux 'mean', 'rms', 'variance', 'ptp' et 'condition' de
+              longueur len(samples) - window + 1
+    """
+    samples = np.asarray(samples, dtype=np.float64)
+    if samples.size < window:
+        empty = np.empty(0)
+        return {'mean': empty, 'rms': empty, 'variance': empty, 'ptp': empty,
+                'condition': np.empty(0, dtype='<U4')}
+
+    cumsum = np.concatenate(([0.0], np.cumsum(samples)))
+    cumsum_sq = np.concatenate(([0.0], np.cumsum(samples * samples)))
+    total = cumsum[window:] - cumsum[:-window]
+    total_sq = cumsum_sq[window:] - cumsum_sq[:-window]
+
+    mean = total / window
+    mean_sq = total_sq / window
+    variance = np.maximum(mean_sq - mean * mean, 0.0)
+    rms = np.sqrt(mean_sq)
+
+    views = np.lib.stride_tricks.sliding_window_view(samples, window)
+    ptp = views.max(axis=1) - views.min(axis=1)
+
+    std = np.sqrt(variance)
+    condition = np.where(
+        (std > STD_BAD_THRESHOLD) | (ptp > PTP_BAD_THRESHOLD), 'bad',
+        np.where((std > STD_FAIR_THRESHOLD) | (ptp > PTP_FAIR_THRESHOLD), 'fair', 'good')
+    )
+    return {'mean': mean, 'rms': rms, 'variance': variance, 'ptp': ptp, 'condition': condition}
+
+
+class WindowedClassifier:
+    """
+    Caractéristiques de vibration sur une fenêtre glissante, mises à jour en O(1).
+
+    Les sommes et sommes des carrés sont tenues à jour à chaque échantillon;
+    le min/max de la fenêtre utilise deux files monotones (O(1) amorti).
+    Les sommes sont recalculées périodiquement pour éviter la dérive des
+    flottants sur de longues acquisitions.
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW, sample_rate=None):
+        """
+        Args:
+            window (int): Nombre d'échantillons de la fenêtre
+            sample_rate (float): Fréquence d'échantillonnage en Hz (requise pour l'énergie de bande)
+        """
+        self.window = window
+        self.sample_rate = sample_rate
+        self._buffer = np.zeros(window, dtype=np.float64)
+        self._count = 0          # Nombre total d'échantillons reçus
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._max = deque()      # (index, valeur) décroissantes
+        self._min = deque()      # (index, valeur) croissantes
+
+    def __len__(self):
+        return min(self._count, self.window)
+
+    def update(self, value):
+        """Ajoute un échantillon (unité brute) à la fenêtre."""
+        value = float(value)
+        index = self._count
+        slot = index % self.window
+
+        if index >= self.window:
+            old = self._buffer[slot]
+            self._sum -= old
+            self._sum_sq -= old * old
+        self._buffer[slot] = value
+        self._sum += value
+        self._sum_sq += value * value
+        self._count += 1
+
+        # Files monotones pour le min/max de la fenêtre
+        start = self._count - self.window
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((index, value))
+        while self._max[0][0] < start:
+            self._max.popleft()
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((index, value))
+        while self._min[0][0] < start:
+            self._min.popleft()
+
+        # Recalcul exact une fois par tour de fenêtre (coût amorti O(1))
+        if slot == self.window - 1:
+            self._sum = float(self._buffer.sum())
+            self._sum_sq = float(np.dot(self._buffer, self._buffer))
+
+    def samples(self):
+        """Retourne les échantillons de la fenêtre dans l'ordre chronologique."""
+        n = len(self)
+        if self._count <= self.window:
+            return self._buffer[:n].copy()
+        slot = self._count % self.window
+        return np.concatenate((self._buffer[slot:], self._buffer[:slot]))
+
+    def features(self, band=None):
+        """
+        Retourne les caractéristiques de la fenêtre courante.
+
+        Args:
+            band (tuple): Bande (basse, haute) en Hz pour l'énergie de bande (optionnel)
+
+        Returns:
+            dict: n, mean, rms, variance, ptp, condition (et band_energy si demandé),
+                  ou None si aucun échantillon n'a été reçu
+        """
+        n = len(self)
+        if n == 0:
+            return None
+        mean = self._sum / n
+        mean_sq = self._sum_sq / n
+        rms = max(mean_sq, 0.0) ** 0.5
+        variance = max(mean_sq - mean * mean, 0.0)
+        ptp = self._max[0][1] - self._min[0][1]
+        result = {
+            'n': n,
+            'mean': mean,
+            'rms': rms,
+            'variance': variance,
+            'ptp': ptp,
+            'condition': classify_features(variance ** 0.5, ptp)
+        }
+        if band is not None and self.sample_rate:
+            result['band_energy'] = band_energy(self.samples(), self.sample_rate, band[0], band[1])
+        return result
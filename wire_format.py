@@ -0,0 +1,391 @@
+"""
+Formats d'envoi des lots de lectures entre le Raspberry Pi et le serveur.
+
+Le format est annoncé par le Content-Type et la compression par le
+Content-Encoding de la requête POST /data/batch:
+
+- application/json: tableau JSON de messages (format historique)
+- application/x-msgpack: MessagePack, une liste de valeurs par lecture (sans clés)
+- application/vnd.road-monitor.packed: enregistrements binaires de taille fixe,
+  temps et position encodés en delta par rapport à la lecture précédente
+
+msgpack et packed ne transmettent que les champs connus (READING_KEYS,
+NESTED_KEYS, appareil compris): encode_batch lève UnrepresentableReading
+pour un lot qui perdrait un champ, à envoyer alors en JSON.
+
+Compression: gzip (bibliothèque standard) ou zstd (paquet zstandard). La
+décompression s'arrête au-delà de MAX_DECODED_SIZE (PayloadTooLarge, 413).
+MessagePack et zstd sont optionnels: encode_batch lève UnsupportedFormat
+s'ils ne sont pas installés, et le serveur répond alors 415.
+"""
+import gzip
+import io
+import json
+import struct
+import zlib
+from datetime import datetime, timedelta
+from vibration import convert_to_ms2
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+JSON = 'application/json'
+MSGPACK = 'application/x-msgpack'
+PACKED = 'application/vnd.road-monitor.packed'
+
+# Formats et compressions connus, utilisables pour la configuration du Pi
+FORMATS = {'json': JSON, 'msgpack': MSGPACK, 'packed': PACKED}
+COMPRESSIONS = ('gzip', 'zstd')
+
+# Taille maximale d'un lot une fois décompressé (protection contre les bombes de décompression)
+MAX_DECODED_SIZE = 8 * 1024 * 1024
+
+# Origine des temps, sans fuseau: les horodatages du Pi sont en heure locale naïve
+EPOCH = datetime(1970, 1, 1)
+
+# En-tête: signature, version, nombre d'enregistrements, temps de référence (s)
+PACKED_MAGIC = b'RMP1'
+PACKED_HEADER = struct.Struct('<4sBId')
+PACKED_VERSION = 3
+# Version 3: l'en-tête est suivi de la table des appareils (longueur uint16
+# puis tableau JSON UTF-8); chaque enregistrement se termine par l'indice de
+# son appareil dans la table (NO_DEVICE si la lecture n'en a pas)
+PACKED_DEVICES = struct.Struct('<H')
+NO_DEVICE = 255
+# Enregistrement (version 3): dt (ms), dlat, dlon (µdeg), altitude (dm),
+# satellites, vitesse (0,01 km/h), cap (0,01°), x, y, z bruts, rms, ptp,
+# variance, n, drapeaux de présence, appareil
+PACKED_RECORD = struct.Struct('<iiihBHHhhhfffHBB')
+# Versions précédentes (appareils pas encore mis à jour): sans appareil, et
+# en version 1 sans vitesse ni cap
+PACKED_RECORD_V2 = struct.Struct('<iiihBHHhhhfffHB')
+PACKED_RECORD_V1 = struct.Struct('<iiihBhhhfffHB')
+
+# Clés représentables par les formats msgpack et packed. L'heure GPS
+# (gps.time) n'est pas transmise: le serveur ne l'utilise pas.
+READING_KEYS = {'timestamp', 'gps', 'accelerometer', 'vibration', 'device'}
+NESTED_KEYS = {
+    'gps': {'latitude', 'longitude', 'altitude', 'satellites', 'speed', 'course', 'time'},
+    'accelerometer': {'x_raw', 'y_raw', 'z_raw', 'x', 'y', 'z'},
+    'vibration': {'n', 'rms', 'ptp', 'variance'}
+}
+
+HAS_GPS = 0x01
+HAS_ACCEL = 0x02
+HAS_VIBRATION = 0x04
+HAS_MOTION = 0x08
+
+
+class UnsupportedFormat(ValueError):
+    """Format ou compression inconnu, ou dépendance optionnelle absente."""
+
+
+class PayloadTooLarge(ValueError):
+    """Corps décompressé plus grand que MAX_DECODED_SIZE."""
+
+
+class UnrepresentableReading(UnsupportedFormat):
+    """Lecture avec des champs que le format compact ne sait pas transmettre (à envoyer en JSON)."""
+
+
+def _to_seconds(timestamp):
+    dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    if dt.tzinfo is not None:
+        dt = dt.astimezone().replace(tzinfo=None)
+    return (dt - EPOCH).total_seconds()
+
+
+def _from_seconds(seconds):
+    return (EPOCH + timedelta(seconds=seconds)).isoformat()
+
+
+def _clamp(value, low, high):
+    return max(low, min(high, int(round(value))))
+
+
+def _check_representable(data):
+    """Lève UnrepresentableReading si un champ du message serait perdu par msgpack/packed."""
+    extra = set(data) - READING_KEYS
+    for key, known in NESTED_KEYS.items():
+        value = data.get(key)
+        if value is not None:
+            if not isinstance(value, dict):
+                extra.add(key)
+            else:
+                extra.update(f"{key}.{name}" for name in set(value) - known)
+    accel = data.get('accelerometer')
+    if accel and accel.get('y_raw') is None:
+        # Seules les valeurs brutes sont transmises (x, y, z en sont recalculés)
+        extra.add('accelerometer')
+    device = data.get('device')
+    if device is not None and not isinstance(device, str):
+        extra.add('device')
+    if extra:
+        raise UnrepresentableReading(f"Fields not representable: {', '.join(sorted(extra))}")
+
+
+def _reading_values(data):
+    """Aplatit un message en valeurs (temps, gps, accéléromètre, vibration, appareil)."""
+    _check_representable(data)
+    gps = data.get('gps') or {}
+    accel = data.get('accelerometer') or {}
+    vibration = data.get('vibration') or {}
+    has_gps = gps.get('latitude') is not None and gps.get('longitude') is not None
+    has_accel = accel.get('y_raw') is not None
+    has_vibration = vibration.get('rms') is not None
+    has_motion = has_gps and gps.get('speed') is not None
+    return (
+        data['timestamp'],
+        gps.get('latitude') if has_gps else None,
+        gps.get('longitude') if has_gps else None,
+        gps.get('altitude') if has_gps else None,
+        gps.get('satellites') if has_gps else None,
+        gps.get('speed') if has_motion else None,
+        gps.get('course') if has_motion else None,
+        accel.get('x_raw') if has_accel else None,
+        accel.get('y_raw') if has_accel else None,
+        accel.get('z_raw') if has_accel else None,
+        vibration.get('rms') if has_vibration else None,
+        vibration.get('ptp') if has_vibration else None,
+        vibration.get('variance') if has_vibration else None,
+        vibration.get('n') if has_vibration else None,
+        data.get('device')
+    )
+
+
+def _reading_from_values(timestamp, lat, lon, alt, satellites, speed, course, x, y, z, rms, ptp, variance, n,
+                         device=None):
+    """Reconstruit un message au format JSON historique."""
+    data = {'timestamp': timestamp, 'gps': None, 'accelerometer': None}
+    if device is not None:
+        data['device'] = device
+    if lat is not None and lon is not None:
+        data['gps'] = {'latitude': lat, 'longitude': lon, 'altitude': alt, 'satellites': satellites}
+        if speed is not None:
+            data['gps']['speed'] = speed
+            data['gps']['course'] = course
+    if y is not None:
+        data['accelerometer'] = {
+            'x_raw': x, 'y_raw': y, 'z_raw': z,
+            'x': convert_to_ms2(x), 'y': convert_to_ms2(y), 'z': convert_to_ms2(z)
+        }
+    if rms is not None:
+        data['vibration'] = {'n': n, 'rms': rms, 'ptp': ptp, 'variance': variance}
+    return data
+
+
+def _pack(readings):
+    """Encode les lectures en enregistrements binaires de taille fixe."""
+    values = [_reading_values(data) for data in readings]
+    base = _to_seconds(values[0][0]) if values else 0.0
+    devices = sorted({row[-1] for row in values if row[-1] is not None})
+    if len(devices) >= NO_DEVICE:
+        raise UnrepresentableReading(f"Too many devices in one batch ({len(devices)})")
+    device_index = {device: index for index, device in enumerate(devices)}
+    device_index[None] = NO_DEVICE
+    table = json.dumps(devices, separators=(',', ':')).encode('utf-8')
+
+    out = bytearray(PACKED_HEADER.pack(PACKED_MAGIC, PACKED_VERSION, len(values), base))
+    out += PACKED_DEVICES.pack(len(table)) + table
+
+    prev_ms = 0
+    prev_lat = prev_lon = 0
+    for timestamp, lat, lon, alt, satellites, speed, course, x, y, z, rms, ptp, variance, n, device in values:
+        ms = int(round((_to_seconds(timestamp) - base) * 1000))
+        flags = 0
+        dlat = dlon = 0
+        if lat is not None:
+            flags |= HAS_GPS
+            ulat, ulon = int(round(lat * 1e6)), int(round(lon * 1e6))
+            dlat, dlon = ulat - prev_lat, ulon - prev_lon
+            prev_lat, prev_lon = ulat, ulon
+        if speed is not None:
+            flags |= HAS_MOTION
+        if y is not None:
+            flags |= HAS_ACCEL
+        if rms is not None:
+            flags |= HAS_VIBRATION
+        out += PACKED_RECORD.pack(
+            ms - prev_ms, dlat, dlon,
+            _clamp((alt or 0) * 10, -32768, 32767), _clamp(satellites or 0, 0, 255),
+            _clamp((speed or 0) * 100, 0, 65535), _clamp((course or 0) * 100, 0, 65535),
+            _clamp(x or 0, -32768, 32767), _clamp(y or 0, -32768, 32767), _clamp(z or 0, -32768, 32767),
+            rms or 0.0, ptp or 0.0, variance or 0.0, _clamp(n or 0, 0, 65535),
+            flags, device_index[device]
+        )
+        prev_ms = ms
+    return bytes(out)
+
+
+def _unpack(body):
+    """
+    Décode les enregistrements binaires produits par _pack.
+
+    Accepte aussi les versions 1 et 2 (sans appareil, et en version 1 sans
+    vitesse ni cap) des appareils pas encore mis à jour. Certains ont envoyé
+    des enregistrements version 2 sous le numéro 1: la taille du corps les
+    distingue.
+    """
+    if len(body) < PACKED_HEADER.size:
+        raise ValueError("Truncated packed payload")
+    magic, version, count, base = PACKED_HEADER.unpack_from(body, 0)
+    if magic != PACKED_MAGIC or version not in (1, 2, PACKED_VERSION):
+        raise ValueError("Unknown packed payload version")
+
+    offset = PACKED_HEADER.size
+    devices = []
+    if version >= 3:
+        if len(body) < offset + PACKED_DEVICES.size:
+            raise ValueError("Truncated packed payload")
+        (length,) = PACKED_DEVICES.unpack_from(body, offset)
+        offset += PACKED_DEVICES.size
+        try:
+            devices = json.loads(body[offset:offset + length])
+        except ValueError as e:
+            raise ValueError(f"Invalid packed device table: {e}")
+        if not isinstance(devices, list):
+            raise ValueError("Invalid packed device table")
+        offset += length
+        record_format = PACKED_RECORD
+    elif version == 2 or len(body) - offset == count * PACKED_RECORD_V2.size:
+        record_format = PACKED_RECORD_V2
+    else:
+        record_format = PACKED_RECORD_V1
+    if len(body) - offset != count * record_format.size:
+        raise ValueError("Packed payload size mismatch")
+
+    readings = []
+    ms = lat = lon = 0
+    for record in record_format.iter_unpack(memoryview(body)[offset:]):
+        if record_format is PACKED_RECORD_V1:
+            record = record[:5] + (0, 0) + record[5:] + (NO_DEVICE,)
+        elif record_format is PACKED_RECORD_V2:
+            record = record + (NO_DEVICE,)
+        dt, dlat, dlon, alt, satellites, speed, course, x, y, z, rms, ptp, variance, n, flags, device = record
+        ms += dt
+        gps_values = (None, None, None, None, None, None)
+        if flags & HAS_GPS:
+            lat += dlat
+            lon += dlon
+            motion = (speed / 100.0, course / 100.0) if flags & HAS_MOTION else (None, None)
+            gps_values = (lat / 1e6, lon / 1e6, alt / 10.0, satellites) + motion
+        accel_values = (x, y, z) if flags & HAS_ACCEL else (None, None, None)
+        vibration_values = (rms, ptp, variance, n) if flags & HAS_VIBRATION else (None, None, None, None)
+        if device != NO_DEVICE and device >= len(devices):
+            raise ValueError("Packed device index out of range")
+        readings.append(_reading_from_values(
+            _from_seconds(base + ms / 1000.0), *gps_values, *accel_values, *vibration_values,
+            devices[device] if device != NO_DEVICE else None
+        ))
+    return readings
+
+
+def _compress(body, encoding):
+    if encoding is None:
+        return body
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=6)
+    if encoding == 'zstd':
+        if zstandard is None:
+            raise UnsupportedFormat("zstandard is not installed")
+        return zstandard.ZstdCompressor(level=3).compress(body)
+    raise UnsupportedFormat(f"Unknown content encoding: {encoding}")
+
+
+def _gunzip(body, limit):
+    """Décompresse un corps gzip (éventuellement en plusieurs membres) sans dépasser limit + 1 octets."""
+    out = bytearray()
+    while body:
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        out += decompressor.decompress(body, limit + 1 - len(out))
+        if len(out) > limit:
+            break
+        if not decompressor.eof:
+            raise ValueError("Truncated gzip payload")
+        body = decompressor.unused_data
+    return bytes(out)
+
+
+def _decompress(body, encoding, limit=MAX_DECODED_SIZE):
+    """
+    Raises:
+        PayloadTooLarge: Le corps décompressé dépasse limit octets
+    """
+    if not encoding or encoding == 'identity':
+        return body
+    if encoding == 'gzip':
+        out = _gunzip(body, limit)
+    elif encoding == 'zstd':
+        if zstandard is None:
+            raise UnsupportedFormat("zstandard is not installed")
+        out = bytearray()
+        with zstandard.ZstdDecompressor().stream_reader(io.BytesIO(body)) as reader:
+            while len(out) <= limit:
+                chunk = reader.read(limit + 1 - len(out))
+                if not chunk:
+                    break
+                out += chunk
+        out = bytes(out)
+    else:
+        raise UnsupportedFormat(f"Unknown content encoding: {encoding}")
+    if len(out) > limit:
+        raise PayloadTooLarge(f"Decompressed payload exceeds {limit} bytes")
+    return out
+
+
+def encode_batch(readings, content_type=JSON, content_encoding=None):
+    """
+    Encode un lot de messages capteur.
+
+    Returns:
+        bytes: Corps de la requête, à envoyer avec les en-têtes Content-Type
+               et (si compression) Content-Encoding correspondants
+    """
+    if content_type == JSON:
+        body = json.dumps(readings, separators=(',', ':')).encode('utf-8')
+    elif content_type == MSGPACK:
+        if msgpack is None:
+            raise UnsupportedFormat("msgpack is not installed")
+        body = msgpack.packb([_reading_values(data) for data in readings])
+    elif content_type == PACKED:
+        body = _pack(readings)
+    else:
+        raise UnsupportedFormat(f"Unknown content type: {content_type}")
+    return _compress(body, content_encoding)
+
+
+def decode_batch(body, content_type=JSON, content_encoding=None):
+    """
+    Décode un corps de requête en liste de messages capteur (format JSON historique).
+
+    Raises:
+        UnsupportedFormat: Format ou compression non pris en charge
+        PayloadTooLarge: Corps décompressé plus grand que MAX_DECODED_SIZE
+        ValueError: Corps illisible
+    """
+    try:
+        body = _decompress(body, content_encoding)
+    except (UnsupportedFormat, PayloadTooLarge):
+        raise
+    except Exception as e:
+        # zlib.error, gzip.BadGzipFile, zstandard.ZstdError...
+        raise ValueError(f"Invalid compressed payload: {e}")
+    if content_type == JSON:
+        return json.loads(body)
+    if content_type == MSGPACK:
+        if msgpack is None:
+            raise UnsupportedFormat("msgpack is not installed")
+        try:
+            return [_reading_from_values(*values) for values in msgpack.unpackb(body)]
+        except (TypeError, msgpack.ExtraData) as e:
+            raise ValueError(f"Invalid msgpack payload: {e}")
+    if content_type == PACKED:
+        return _unpack(body)
+    raise UnsupportedFormat(f"Unknown content type: {content_type}")